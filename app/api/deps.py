@@ -1,18 +1,16 @@
-from collections.abc import Generator
-from typing import Annotated
+from collections.abc import Callable, Generator
+from typing import Annotated, Any, List
 
-import jwt
 from jwt.exceptions import InvalidTokenError
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from sqlmodel import Session
 from pydantic import ValidationError
 from fastapi.security import OAuth2PasswordBearer
 
-from app.core import security
-from app.core.config import settings
-from app.core.db import engine
-from app.models import User
-from app.schemas import TokenPayload
+from app.core import auth_cache, etags, security, serialization
+from app.core.db import get_engine
+from app.models import OrderStatus, User
+from app.schemas import CameraResponse, ClubResponse, DroneResponse, LensResponse, TokenPayload
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"/login/access-token"
@@ -20,7 +18,7 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 
 def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         yield session
 
 
@@ -29,22 +27,27 @@ TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
 def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    if token_data.sub is None:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid token: missing user ID",
-        )
-    user = session.get(User, token_data.sub)
+    # Уже проверенные токены и загруженные пользователи берутся из кэша,
+    # так что обычный запрос проходит аутентификацию без обращения к БД
+    key = auth_cache.token_key(token)
+    user_id = auth_cache.get_token_subject(key)
+    if user_id is None:
+        try:
+            payload = security.decode_token(token)
+            token_data = TokenPayload(**payload)
+        except (InvalidTokenError, ValidationError):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        if token_data.sub is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Invalid token: missing user ID",
+            )
+        user_id = token_data.sub
+        auth_cache.remember_token(key, user_id, payload.get("exp"))
+    user = auth_cache.get_user(session, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -73,3 +76,75 @@ CurrentUser = Annotated[User, Depends(get_current_active_user)]
 
 # Для администраторов
 SuperUser = Annotated[User, Depends(get_current_active_superuser)]
+
+
+# Разреженный набор полей ответа из параметра fields, например
+# fields=id,order.status,drone.model. Без параметра - ответ целиком
+def sparse_fields(projection: serialization.Projection) -> Callable[[str | None], serialization.Projection]:
+    def dependency(fields: str | None = None) -> serialization.Projection:
+        if fields is None:
+            return projection
+        try:
+            return projection.subset(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return dependency
+
+
+FlightTaskFields = Annotated[serialization.Projection, Depends(sparse_fields(serialization.FLIGHT_TASK))]
+OrderFields = Annotated[serialization.Projection, Depends(sparse_fields(serialization.ORDER))]
+OrderWithOperatorFields = Annotated[
+    serialization.Projection, Depends(sparse_fields(serialization.ORDER_WITH_OPERATOR))
+]
+
+
+# Условный GET: ETag из версий коллекций, из которых собран ответ, и соли
+# выпуска (APP_VERSION и схема ответа), ответ 304 на совпавший If-None-Match
+# до чтения данных. С работающим слушателем уведомлений версии берутся из
+# памяти, и 304 обходится без запросов к БД
+def conditional(*collections: str, cache_control: str, content: str = "",
+                schema: Any = None) -> Callable[..., etags.Conditional]:
+    salt = etags.release_salt(*([schema] if schema is not None else []))
+
+    def dependency(request: Request, session: SessionDep, current_user: CurrentUser) -> etags.Conditional:
+        versions = etags.versions(session) if collections else {}
+        tag = etags.make_tag(
+            versions, collections, request.url.path, request.url.query, str(current_user.id), content, salt,
+        )
+        matched = etags.matching(request.headers.get("if-none-match"), tag)
+        if matched is not None:
+            raise HTTPException(status_code=304, headers=etags.not_modified_headers(matched, cache_control))
+        return etags.Conditional(tag, cache_control)
+    return dependency
+
+
+# Условный GET по содержимому: ответ читается как обычно, а ETag считается по
+# его байтам. 304 экономит передачу и сериализацию на клиенте, но не запрос к БД
+def content_conditional(cache_control: str) -> Callable[..., etags.Conditional]:
+    def dependency(request: Request) -> etags.Conditional:
+        return etags.Conditional(None, cache_control, request.headers.get("if-none-match"))
+    return dependency
+
+
+# Справочники меняются редко: клиент показывает их из кэша до 30 с, затем
+# перепроверяет. Задание перепроверяется всегда, статусы меняются только с релизом
+CATALOG_CACHE_CONTROL = "private, max-age=30"
+FLIGHT_TASK_CACHE_CONTROL = "private, no-cache"
+STATIC_CACHE_CONTROL = "private, max-age=86400"
+
+ClubsETag = Annotated[etags.Conditional, Depends(conditional(
+    "clubs", cache_control=CATALOG_CACHE_CONTROL, schema=List[ClubResponse],
+))]
+DronesETag = Annotated[etags.Conditional, Depends(conditional(
+    "drones", cache_control=CATALOG_CACHE_CONTROL, schema=List[DroneResponse],
+))]
+CamerasETag = Annotated[etags.Conditional, Depends(conditional(
+    "cameras", cache_control=CATALOG_CACHE_CONTROL, schema=List[CameraResponse],
+))]
+LensesETag = Annotated[etags.Conditional, Depends(conditional(
+    "lenses", cache_control=CATALOG_CACHE_CONTROL, schema=List[LensResponse],
+))]
+FlightTaskETag = Annotated[etags.Conditional, Depends(content_conditional(FLIGHT_TASK_CACHE_CONTROL))]
+OrderStatusesETag = Annotated[etags.Conditional, Depends(conditional(
+    cache_control=STATIC_CACHE_CONTROL, content=",".join(status.value for status in OrderStatus),
+))]
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
-from app.api.routes import login, users, orders, flight_tasks, drones, clubs, cameras, lenses
+from app.api.routes import login, users, orders, flight_tasks, drones, clubs, cameras, lenses, metrics, debug
+from app.core.config import settings
 
 api_router = APIRouter()
 api_router.include_router(login.router)
@@ -10,4 +11,7 @@ api_router.include_router(flight_tasks.router)
 api_router.include_router(clubs.router)
 api_router.include_router(drones.router)
 api_router.include_router(cameras.router)
-api_router.include_router(lenses.router)
\ No newline at end of file
+api_router.include_router(lenses.router)
+api_router.include_router(debug.router)
+if settings.METRICS_ENABLED:
+    api_router.include_router(metrics.router)
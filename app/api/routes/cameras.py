@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from typing import Annotated, List
 from uuid import UUID
 
 from app import crud
-from app.api.deps import SessionDep, CurrentUser, get_current_active_superuser
+from app.api.deps import SessionDep, CurrentUser, CamerasETag, get_current_active_superuser
 from app.crud import get_all_cameras, get_camera_by_id
-from app.schemas import CameraBase, CameraResponse, Message, CameraUpdate, CameraAdmin
+from app.models import Camera
+from app.schemas import CameraBase, CameraResponse, Message, CameraUpdate, CameraAdmin, CameraBatchUpdate, BatchResult
 
 router = APIRouter(prefix="/cameras", tags=["cameras"])
 
@@ -14,13 +16,46 @@ router = APIRouter(prefix="/cameras", tags=["cameras"])
 async def get_cameras(
     session: SessionDep,
     current_user: CurrentUser,
+    etag: CamerasETag,
     skip: int = 0,
     limit: int = 100,
     club_id: UUID | None = None
 ):
     include_archived = current_user.is_superuser
-    cameras = get_all_cameras(session, include_archived=include_archived, club_id=club_id)
-    return cameras[skip:skip + limit]
+    cameras = get_all_cameras(session, include_archived=include_archived, club_id=club_id, skip=skip, limit=limit)
+    return etag.apply(ORJSONResponse(cameras))
+
+
+@router.post("/batch", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def create_cameras_batch(
+    cameras_in: List[CameraBase],
+    session: SessionDep
+):
+    return crud.create_equipment_batch(session, Camera, cameras_in)
+
+
+@router.patch("/batch", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def update_cameras_batch(
+    cameras_in: List[CameraBatchUpdate],
+    session: SessionDep
+):
+    return crud.update_equipment_batch(session, Camera, cameras_in)
+
+
+@router.post("/batch/archive", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def archive_cameras_batch(
+    camera_ids: Annotated[List[UUID], Body()],
+    session: SessionDep
+):
+    return crud.set_equipment_availability_batch(session, Camera, camera_ids, is_available=False)
+
+
+@router.post("/batch/activate", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def activate_cameras_batch(
+    camera_ids: Annotated[List[UUID], Body()],
+    session: SessionDep
+):
+    return crud.set_equipment_availability_batch(session, Camera, camera_ids, is_available=True)
 
 
 @router.get("/{camera_id}", response_model=CameraResponse)
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from typing import List
 from uuid import UUID
 
 from app import crud
-from app.api.deps import SessionDep, CurrentUser, get_current_active_superuser
+from app.api.deps import SessionDep, CurrentUser, ClubsETag, get_current_active_superuser
 from app.crud import get_all_clubs, get_club_by_id
 from app.schemas import ClubBase, ClubResponse, Message, ClubUpdate, ClubAdmin
 
@@ -13,11 +14,12 @@ router = APIRouter(prefix="/clubs", tags=["clubs"])
 @router.get("/", response_model=List[ClubResponse])
 async def get_clubs(
     session: SessionDep,
-    current_user: CurrentUser
+    current_user: CurrentUser,
+    etag: ClubsETag
 ):
     include_archived = current_user.is_superuser
     clubs = get_all_clubs(session, include_archived=include_archived)
-    return clubs
+    return etag.apply(ORJSONResponse(clubs))
 
 
 @router.get("/{club_id}", response_model=ClubResponse)
@@ -0,0 +1,102 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.api.deps import SuperUser
+from app.core import loop_monitor, memory, profiling
+from app.schemas import LoopBlockingReport, Message, ProfileInfo, MemoryStatus, MemorySnapshotInfo, \
+    AllocationSite, RequestMemoryPeak
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+# Остановки цикла событий дольше LOOP_BLOCKING_THRESHOLD_MS: места вызова по
+# суммарному времени и последние события со стеком
+@router.get("/blocking", response_model=LoopBlockingReport)
+async def get_blocking_report(current_user: SuperUser):
+    return loop_monitor.report()
+
+
+@router.delete("/blocking", response_model=Message)
+async def reset_blocking_report(current_user: SuperUser):
+    loop_monitor.reset()
+    return Message(message="Blocking report reset")
+
+
+# Профили запросов, снятые по заголовку X-Profile или ?profile=1, новые первыми
+@router.get("/profiles", response_model=List[ProfileInfo])
+def list_profiles(current_user: SuperUser, limit: int = 20):
+    return profiling.recent(limit)
+
+
+@router.get("/profiles/{name}")
+def get_profile(name: str, current_user: SuperUser):
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+# Снимки и сравнения tracemalloc считаются в пуле потоков: на больших кучах это
+# сотни миллисекунд, цикл событий на это время не останавливается
+@router.get("/memory", response_model=MemoryStatus)
+def get_memory_status(current_user: SuperUser):
+    return memory.status()
+
+
+@router.post("/memory/start", response_model=Message)
+def start_memory_tracing(current_user: SuperUser, frames: int = Query(default=1, ge=1, le=64)):
+    memory.start(frames)
+    return Message(message=f"Memory tracing started with {frames} frame(s)")
+
+
+@router.post("/memory/stop", response_model=Message)
+def stop_memory_tracing(current_user: SuperUser):
+    memory.stop()
+    return Message(message="Memory tracing stopped")
+
+
+@router.post("/memory/snapshots", response_model=MemorySnapshotInfo)
+def take_memory_snapshot(current_user: SuperUser, name: Optional[str] = None):
+    try:
+        return memory.take_snapshot(name)
+    except memory.NotTracing:
+        raise HTTPException(status_code=409, detail="Memory tracing is not started")
+
+
+@router.get("/memory/top", response_model=List[AllocationSite])
+def get_memory_top(
+    current_user: SuperUser,
+    snapshot: Optional[str] = None,
+    group_by: memory.GroupBy = "module",
+    limit: int = 20,
+):
+    try:
+        return memory.top(snapshot, group_by, limit)
+    except memory.NotTracing:
+        raise HTTPException(status_code=409, detail="Memory tracing is not started")
+    except memory.SnapshotNotFound:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+
+
+# Разница между двумя снимками или между снимком и текущим состоянием памяти
+@router.get("/memory/diff", response_model=List[AllocationSite])
+def get_memory_diff(
+    current_user: SuperUser,
+    before: str,
+    after: Optional[str] = None,
+    group_by: memory.GroupBy = "module",
+    limit: int = 20,
+):
+    try:
+        return memory.diff(before, after, group_by, limit)
+    except memory.NotTracing:
+        raise HTTPException(status_code=409, detail="Memory tracing is not started")
+    except memory.SnapshotNotFound:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+
+
+@router.get("/memory/requests", response_model=List[RequestMemoryPeak])
+def get_request_memory_peaks(current_user: SuperUser):
+    return memory.recent_requests()
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from typing import Annotated, List
 from uuid import UUID
 
 from app import crud
-from app.api.deps import SessionDep, CurrentUser, get_current_active_superuser
+from app.api.deps import SessionDep, CurrentUser, DronesETag, get_current_active_superuser
 from app.crud import get_all_drones, get_drone_by_id
-from app.schemas import DroneBase, DroneResponse, Message, DroneUpdate, DroneAdmin
+from app.models import Drone
+from app.schemas import DroneBase, DroneResponse, Message, DroneUpdate, DroneAdmin, DroneBatchUpdate, BatchResult
 
 router = APIRouter(prefix="/drones", tags=["drones"])
 
@@ -14,13 +16,46 @@ router = APIRouter(prefix="/drones", tags=["drones"])
 async def get_drones(
     session: SessionDep,
     current_user: CurrentUser,
+    etag: DronesETag,
     skip: int = 0,
     limit: int = 100,
     club_id: UUID | None = None
 ):
     include_archived = current_user.is_superuser
-    drones = get_all_drones(session, include_archived=include_archived, club_id=club_id)
-    return drones[skip:skip + limit]
+    drones = get_all_drones(session, include_archived=include_archived, club_id=club_id, skip=skip, limit=limit)
+    return etag.apply(ORJSONResponse(drones))
+
+
+@router.post("/batch", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def create_drones_batch(
+    drones_in: List[DroneBase],
+    session: SessionDep
+):
+    return crud.create_equipment_batch(session, Drone, drones_in)
+
+
+@router.patch("/batch", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def update_drones_batch(
+    drones_in: List[DroneBatchUpdate],
+    session: SessionDep
+):
+    return crud.update_equipment_batch(session, Drone, drones_in)
+
+
+@router.post("/batch/archive", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def archive_drones_batch(
+    drone_ids: Annotated[List[UUID], Body()],
+    session: SessionDep
+):
+    return crud.set_equipment_availability_batch(session, Drone, drone_ids, is_available=False)
+
+
+@router.post("/batch/activate", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def activate_drones_batch(
+    drone_ids: Annotated[List[UUID], Body()],
+    session: SessionDep
+):
+    return crud.set_equipment_availability_batch(session, Drone, drone_ids, is_available=True)
 
 
 @router.get("/{drone_id}", response_model=DroneResponse)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from typing import Annotated, List
 from uuid import UUID
 
 from app import crud
-from app.api.deps import SessionDep, CurrentUser, get_current_active_superuser
+from app.api.deps import SessionDep, CurrentUser, LensesETag, get_current_active_superuser
 from app.crud import get_all_lenses, get_lens_by_id
-from app.schemas import LensBase, LensResponse, Message, LensUpdate, LensAdmin
+from app.models import Lens
+from app.schemas import LensBase, LensResponse, Message, LensUpdate, LensAdmin, LensBatchUpdate, BatchResult
 
 router = APIRouter(prefix="/lenses", tags=["lenses"])
 
@@ -14,13 +16,46 @@ router = APIRouter(prefix="/lenses", tags=["lenses"])
 async def get_lenses(
     session: SessionDep,
     current_user: CurrentUser,
+    etag: LensesETag,
     skip: int = 0,
     limit: int = 100,
     club_id: UUID | None = None
 ):
     include_archived = current_user.is_superuser
-    lenses = get_all_lenses(session, include_archived=include_archived, club_id=club_id)
-    return lenses[skip:skip + limit]
+    lenses = get_all_lenses(session, include_archived=include_archived, club_id=club_id, skip=skip, limit=limit)
+    return etag.apply(ORJSONResponse(lenses))
+
+
+@router.post("/batch", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def create_lenses_batch(
+    lenses_in: List[LensBase],
+    session: SessionDep
+):
+    return crud.create_equipment_batch(session, Lens, lenses_in)
+
+
+@router.patch("/batch", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def update_lenses_batch(
+    lenses_in: List[LensBatchUpdate],
+    session: SessionDep
+):
+    return crud.update_equipment_batch(session, Lens, lenses_in)
+
+
+@router.post("/batch/archive", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def archive_lenses_batch(
+    lens_ids: Annotated[List[UUID], Body()],
+    session: SessionDep
+):
+    return crud.set_equipment_availability_batch(session, Lens, lens_ids, is_available=False)
+
+
+@router.post("/batch/activate", response_model=BatchResult, dependencies=[Depends(get_current_active_superuser)])
+def activate_lenses_batch(
+    lens_ids: Annotated[List[UUID], Body()],
+    session: SessionDep
+):
+    return crud.set_equipment_availability_batch(session, Lens, lens_ids, is_available=True)
 
 
 @router.get("/{lens_id}", response_model=LensResponse)
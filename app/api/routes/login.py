@@ -1,55 +1,74 @@
 from datetime import timedelta
 from typing import Annotated
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlmodel import Session
 
 from app import crud
 from app.api.deps import SessionDep
 from app.core.config import settings
-from app.core import security
-from app.schemas import Token, RefreshTokenRequest
+from app.core import security, token_store
+from app.core.hashing import HashPoolSaturated
+from app.schemas import Token, RefreshTokenRequest, Message
 
 router = APIRouter(tags=["login"])
 
 
 @router.post("/login/access-token")
-def login_access_token(
+async def login_access_token(
         session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ) -> Token:
-    user = crud.authenticate(
-        session=session, email=form_data.username, password=form_data.password
-    )
+    try:
+        user = await crud.authenticate_async(
+            session=session, email=form_data.username, password=form_data.password
+        )
+    except HashPoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many login attempts in progress, try again later",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
 
     return Token(
         access_token=security.create_access_token(
             user.id, expires_delta=access_token_expires
         ),
-        refresh_token=security.create_refresh_token(
-            user.id, expires_delta=refresh_token_expires
-        )
+        refresh_token=await run_in_threadpool(_issue_refresh_token, session, user.id)
     )
 
 
+def _issue_refresh_token(session: Session, user_id: UUID) -> str:
+    refresh_token = token_store.issue(session, user_id)
+    session.commit()
+    return refresh_token
+
+
 @router.post("/login/refresh-token")
 def refresh_access_token(
         session: SessionDep, token_data: RefreshTokenRequest
 ) -> Token:
-    user = security.verify_refresh_token(token_data.refresh_token, session)
+    user_id, refresh_token = token_store.rotate(session, token_data.refresh_token)
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
 
     return Token(
         access_token=security.create_access_token(
-            user.id, expires_delta=access_token_expires
+            user_id, expires_delta=access_token_expires
         ),
-        refresh_token=security.create_refresh_token(
-            user.id, expires_delta=refresh_token_expires
-        )
-    )
\ No newline at end of file
+        refresh_token=refresh_token
+    )
+
+
+@router.post("/login/logout", response_model=Message)
+def logout(
+        session: SessionDep, token_data: RefreshTokenRequest
+) -> Message:
+    token_store.revoke_token(session, token_data.refresh_token)
+    return Message(message="Session revoked successfully")
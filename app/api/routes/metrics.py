@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app.core import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+# Без авторизации: адрес опрашивает Prometheus, закрывается на уровне сети
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
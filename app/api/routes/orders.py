@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile
+from fastapi.responses import ORJSONResponse
 from typing import List
 from uuid import UUID
 
 from app import crud
-from app.api.deps import SessionDep, CurrentUser, get_current_active_superuser, SuperUser
+from app.api.deps import SessionDep, CurrentUser, get_current_active_superuser, SuperUser, OrderFields, \
+    OrderWithOperatorFields, OrderStatusesETag
+from app.core import catalog
+from app.core.export import stream_export
+from app.core.imports import detect_format, is_utf8, iter_records
 from app.crud import get_order_with_club_data
 from app.models import Order, FlightTask, Club
 from app.schemas import OrderWithOperator, OrderResponse, OrderUpdate, OrderStatus, OrderCreate, Message, \
-    OrderStatusUpdate
+    OrderStatusUpdate, ExportFormat, OrderImportReport
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -16,42 +23,69 @@ router = APIRouter(prefix="/orders", tags=["orders"])
 def get_new_orders(
     session: SessionDep,
     current_user: CurrentUser,
+    projection: OrderFields,
     skip: int = 0,
     limit: int = 100
 ):
-    orders = crud.get_new_orders(session=session, skip=skip, limit=limit)
-    return orders
+    orders = crud.get_new_orders(session=session, skip=skip, limit=limit, projection=projection)
+    return ORJSONResponse(orders)
 
 
 @router.get("/assigned", response_model=List[OrderResponse])
 def get_assigned_orders(
     session: SessionDep,
     current_user: CurrentUser,
+    projection: OrderFields,
     skip: int = 0,
     limit: int = 100
 ):
     orders = crud.get_assigned_orders(
-        session=session, operator_id=current_user.id, skip=skip, limit=limit
+        session=session, operator_id=current_user.id, skip=skip, limit=limit, projection=projection
     )
-    return orders
+    return ORJSONResponse(orders)
 
 
 @router.get("/all", response_model=List[OrderWithOperator])
 def get_all_orders(
     session: SessionDep,
     current_user: SuperUser,
+    projection: OrderWithOperatorFields,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    after: UUID | None = None
 ):
-    orders = crud.get_all_orders_with_operators(session=session, skip=skip, limit=limit)
-    return orders
+    orders = crud.get_all_orders_with_operators(
+        session=session, skip=skip, limit=limit, after=after, projection=projection
+    )
+    return ORJSONResponse(orders)
 
 
 @router.get("/statuses", response_model=List[str])
 async def get_order_statuses(
-    current_user: CurrentUser
+    current_user: CurrentUser,
+    etag: OrderStatusesETag
+):
+    return etag.apply(ORJSONResponse([status.value for status in OrderStatus]))
+
+
+@router.get("/export", dependencies=[Depends(get_current_active_superuser)])
+def export_orders(
+    format: ExportFormat = ExportFormat.csv,
+    club_id: UUID | None = None,
+    status: OrderStatus | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None
 ):
-    return [status.value for status in OrderStatus]
+    return stream_export(
+        crud.iter_orders_for_export,
+        crud.ORDER_EXPORT_COLUMNS,
+        format,
+        filename="orders",
+        club_id=club_id,
+        status=status,
+        date_from=date_from,
+        date_to=date_to
+    )
 
 
 @router.get("/{order_id}")
@@ -139,7 +173,7 @@ async def create_order(
     session: SessionDep
 ):
     # Проверка существования клуба
-    club = session.get(Club, order_in.club_id)
+    club = catalog.source(session).get(Club, order_in.club_id)
     if not club:
         raise HTTPException(status_code=404, detail="Club not found")
 
@@ -173,6 +207,18 @@ async def create_order(
     )
 
 
+@router.post("/import", response_model=OrderImportReport, dependencies=[Depends(get_current_active_superuser)])
+def import_orders(
+    file: UploadFile,
+    session: SessionDep,
+    format: ExportFormat | None = None
+):
+    file_format = format or detect_format(file)
+    if not is_utf8(file.file):
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    return crud.import_orders(session, iter_records(file.file, file_format))
+
+
 @router.patch("/admin/{order_id}", response_model=OrderResponse, dependencies=[Depends(get_current_active_superuser)])
 async def update_order(
     order_id: UUID,
@@ -1,7 +1,8 @@
 import uuid
-from typing import Any
+from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlmodel import func, select
 
 from app import crud
@@ -10,8 +11,10 @@ from app.api.deps import (
     SessionDep,
     get_current_active_superuser,
 )
+from app.core import auth_cache, serialization, token_store
 from app.core.security import get_password_hash, verify_password
-from app.schemas import (Message, UpdatePassword, UserCreate, UserPublic, UserRegister, UsersPublic, UserUpdate, UserUpdateMe)
+from app.schemas import (Message, UpdatePassword, UserCreate, UserPublic, UserRegister, UsersPublic, UserUpdate, UserUpdateMe,
+                         BatchResult)
 from app.models import User
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -22,14 +25,17 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(session: SessionDep, skip: int = 0, limit: int = 100, after: uuid.UUID | None = None) -> Any:
     count_statement = select(func.count()).select_from(User)
     count = session.exec(count_statement).one()
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    # after - id последнего пользователя предыдущей страницы
+    statement = serialization.USER.select().order_by(User.id).offset(skip).limit(limit)
+    if after is not None:
+        statement = statement.where(User.id > after)
+    users = serialization.USER.build_all(session.exec(statement).all())
 
-    return UsersPublic(data=users, count=count)
+    return ORJSONResponse({"data": users, "count": count})
 
 
 @router.post(
@@ -47,6 +53,13 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     return user
 
 
+@router.post(
+    "/bulk", dependencies=[Depends(get_current_active_superuser)], response_model=BatchResult
+)
+def create_users_bulk(*, session: SessionDep, users_in: List[UserCreate]) -> Any:
+    return crud.create_users_bulk(session=session, users_create=users_in)
+
+
 @router.patch("/me", response_model=UserPublic)
 def update_user_me(
     *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
@@ -61,6 +74,7 @@ def update_user_me(
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
     session.commit()
+    auth_cache.invalidate_user(current_user.id)
     session.refresh(current_user)
     return current_user
 
@@ -79,6 +93,8 @@ def update_password_me(
     current_user.hashed_password = hashed_password
     session.add(current_user)
     session.commit()
+    auth_cache.invalidate_user(current_user.id)
+    token_store.revoke_user_tokens(session, current_user.id)
     return Message(message="Password updated successfully")
 
 
@@ -100,6 +116,8 @@ def deactivate_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
     current_user.is_available = False
     session.add(current_user)
     session.commit()
+    auth_cache.invalidate_user(current_user.id)
+    token_store.revoke_user_tokens(session, current_user.id)
     return Message(message="User deactivated successfully")
 
 
@@ -156,6 +174,9 @@ def update_user(
             )
 
     db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    # Сброс пароля администратором отзывает все сессии пользователя, как и смена своего пароля
+    if user_in.password:
+        token_store.revoke_user_tokens(session, user_id)
     return db_user
 
 
@@ -177,6 +198,8 @@ def deactivate_user(
     user.is_available = False
     session.add(user)
     session.commit()
+    auth_cache.invalidate_user(user_id)
+    token_store.revoke_user_tokens(session, user_id)
     return Message(message="User deactivated successfully")
 
 
@@ -194,6 +217,7 @@ def activate_user(
     user.is_available = True
     session.add(user)
     session.commit()
+    auth_cache.invalidate_user(user_id)
     return Message(message="User activated successfully")
 
 
@@ -210,4 +234,5 @@ def delete_user(
         )
     session.delete(user)
     session.commit()
+    auth_cache.invalidate_user(user_id)
     return Message(message="User deleted successfully")
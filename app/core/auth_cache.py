@@ -0,0 +1,70 @@
+import hashlib
+import time
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import Session
+
+from app.core import notify
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models import User
+
+CHANNEL = "auth_user_invalidated"
+
+# sha256(токен) -> id пользователя; запись живёт не дольше самого токена
+tokens = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+# id пользователя -> значения колонок User
+users = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def get_token_subject(key: bytes) -> UUID | None:
+    return tokens.get(key)
+
+
+def remember_token(key: bytes, user_id: UUID, expires_at: float | None) -> None:
+    ttl = None if expires_at is None else expires_at - time.time()
+    tokens.set(key, user_id, ttl)
+
+
+def _snapshot(user: User) -> dict[str, Any]:
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+
+def get_user(session: Session, user_id: UUID) -> User | None:
+    snapshot = users.get(user_id)
+    if snapshot is None:
+        user = session.get(User, user_id)
+        if user is not None:
+            users.set(user_id, _snapshot(user))
+        return user
+
+    # Каждый запрос получает собственный экземпляр, привязанный к своей сессии,
+    # без обращения к БД: merge(load=False) только регистрирует его в identity map
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return session.merge(user, load=False)
+
+
+def _drop_user(user_id: UUID) -> None:
+    users.pop(user_id)
+
+
+def invalidate_user(user_id: UUID) -> None:
+    _drop_user(user_id)
+    notify.publish(CHANNEL, str(user_id))
+
+
+def _on_notification(payload: str | None) -> None:
+    if payload is None:
+        users.clear()
+    else:
+        _drop_user(UUID(payload))
+
+
+notify.subscribe(CHANNEL, _on_notification)
@@ -0,0 +1,157 @@
+import threading
+from collections import namedtuple
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlmodel import Session
+
+from app.core import etags, notify, serialization
+from app.core.config import settings
+from app.models import Camera, Club, CollectionVersion, Drone, Lens
+
+COLLECTIONS = {Club: "clubs", Drone: "drones", Camera: "cameras", Lens: "lenses"}
+EQUIPMENT = (Drone, Camera, Lens)
+RESPONSE_FIELDS = {
+    Club: tuple(serialization.CLUB.parts[0].fields),
+    Drone: tuple(serialization.DRONE.parts[0].fields),
+    Camera: tuple(serialization.CAMERA.parts[0].fields),
+    Lens: tuple(serialization.LENS.parts[0].fields),
+}
+
+
+# Неизменяемая копия строки: атрибуты те же, что у модели, поэтому запись
+# подходит и для проверок, и для сериализации, но не привязана к сессии
+def _record_type(model: type) -> type:
+    return namedtuple(f"{model.__name__}Record", [column.key for column in model.__table__.columns])
+
+
+RECORDS = {model: _record_type(model) for model in COLLECTIONS}
+
+
+# Снимок справочников: клубы и оборудование по id и готовые списки ответов по
+# клубу и доступности. versions - версии коллекций (collection_version), на
+# которых снимок прочитан. Снимок не меняется: сброс заменяет его целиком
+class Snapshot:
+    def __init__(self, versions: dict[str, int], rows: dict[type, list[Any]]) -> None:
+        self.versions = versions
+        self.by_id = {model: {row.id: row for row in rows[model]} for model in COLLECTIONS}
+        clubs = sorted(rows[Club], key=lambda club: club.id)
+        self.clubs = {
+            True: [self._response(Club, club) for club in clubs],
+            False: [self._response(Club, club) for club in clubs if club.is_available],
+        }
+        # (модель, club_id или None, с архивными) -> ответ списка. Как и в SQL,
+        # оборудование архивного клуба не показывается никому
+        self.lists: dict[tuple[type, UUID | None, bool], list[dict[str, Any]]] = {}
+        available_clubs = {club.id for club in clubs if club.is_available}
+        for model in EQUIPMENT:
+            for row in sorted(rows[model], key=lambda item: item.id):
+                if row.club_id not in available_clubs:
+                    continue
+                response = self._response(model, row)
+                for include_archived in (True, False) if row.is_available else (True,):
+                    for club_id in (row.club_id, None):
+                        self.lists.setdefault((model, club_id, include_archived), []).append(response)
+
+    @staticmethod
+    def _response(model: type, row: Any) -> dict[str, Any]:
+        return {name: getattr(row, name) for name in RESPONSE_FIELDS[model]}
+
+    # Та же сигнатура, что у Session.get: вызывающий код подставляет снимок вместо сессии
+    def get(self, model: type, id: UUID) -> Any | None:
+        return self.by_id[model].get(id)
+
+    def equipment(self, model: type, club_id: UUID | None, include_archived: bool) -> list[dict[str, Any]]:
+        return self.lists.get((model, club_id, include_archived), [])
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.by_id.values())
+
+
+_lock = threading.Lock()
+_snapshot: Snapshot | None = None
+_hits = 0
+_misses = 0
+
+
+def _load(session: Session) -> Snapshot:
+    versions = dict(session.exec(
+        select(CollectionVersion.name, CollectionVersion.version)
+        .where(CollectionVersion.name.in_(COLLECTIONS.values()))
+    ).all())
+    rows = {
+        model: [RECORDS[model](*row) for row in session.exec(select(*model.__table__.columns))]
+        for model in COLLECTIONS
+    }
+    return Snapshot(versions, rows)
+
+
+# Кэш включён, если сбросы доходят до всех процессов: в PostgreSQL - пока
+# работает слушатель уведомлений, SQLite - локальная база одного процесса.
+# Иначе (скрипты без запуска приложения) crud читает справочники из БД
+def enabled(session: Session) -> bool:
+    if not settings.CATALOG_CACHE_ENABLED:
+        return False
+    return notify.listening() or session.get_bind().dialect.name == "sqlite"
+
+
+def get(session: Session) -> Snapshot | None:
+    global _snapshot, _hits, _misses
+    if not enabled(session):
+        return None
+    snapshot = _snapshot
+    if snapshot is None:
+        # Загружает один поток, остальные ждут его снимок. Сброс ждёт окончания
+        # загрузки, поэтому прочитанный до записи снимок не переживёт её сброса
+        with _lock:
+            snapshot = _snapshot
+            if snapshot is None:
+                _misses += 1
+                snapshot = _snapshot = _load(session)
+    else:
+        _hits += 1
+    if settings.CATALOG_CONSISTENCY_CHECK:
+        check(session, snapshot)
+    return snapshot
+
+
+# Откуда читать клуб или оборудование по id: из снимка, если кэш включён,
+# иначе из сессии. У обоих get(model, id)
+def source(session: Session) -> Snapshot | Session:
+    snapshot = get(session)
+    return session if snapshot is None else snapshot
+
+
+# Режим проверки для тестов: каждое обращение сверяет снимок с базой и падает
+# на первом расхождении, то есть на пути записи без сброса кэша
+def check(session: Session, snapshot: Snapshot) -> None:
+    fresh = _load(session)
+    for model in COLLECTIONS:
+        cached, actual = snapshot.by_id[model], fresh.by_id[model]
+        stale = sorted(
+            str(row_id) for row_id in cached.keys() | actual.keys() if cached.get(row_id) != actual.get(row_id)
+        )
+        if stale:
+            raise RuntimeError(f"Reference catalog is stale for {model.__name__}: {', '.join(stale[:10])}")
+
+
+# Вызывается после фиксации каждой записи клубов и оборудования в app.crud.
+# Другие воркеры сбрасывают кэш по уведомлению триггеров collection_version
+def invalidate() -> None:
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def _on_notification(payload: str | None) -> None:
+    if payload is None or payload in COLLECTIONS.values():
+        invalidate()
+
+
+notify.subscribe(etags.CHANNEL, _on_notification)
+
+
+def stats() -> dict[str, int]:
+    snapshot = _snapshot
+    return {"entries": len(snapshot) if snapshot else 0, "hits": _hits, "misses": _misses}
@@ -0,0 +1,238 @@
+import hashlib
+import time
+import zlib
+from collections.abc import Callable
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# brotli и zstd необязательны: без пакетов ответы сжимаются только gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Уровни подобраны для JSON на лету: почти весь выигрыш в размере при небольшой
+# цене по процессору. Максимальные уровни brotli и zstd в разы медленнее
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+# Тела больше порога сжимаются в пуле потоков: zlib, brotli и zstd отпускают
+# GIL, а цикл событий не стоит, пока сжимается ответ на несколько мегабайт
+THREAD_MIN_SIZE = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+
+class _Encoding:
+    def __init__(self, name: str, compress: Callable[[bytes], bytes], stream: Callable[[], Any]) -> None:
+        self.name = name
+        self.compress = compress
+        self.stream = stream
+
+
+# Потоковый кодировщик: каждый кусок сжимается и сразу сбрасывается клиенту,
+# последний (final) завершает поток
+class _GzipStream:
+    def __init__(self) -> None:
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def __call__(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliStream:
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+
+    def __call__(self, data: bytes, final: bool) -> bytes:
+        chunk = self._compressor.process(data)
+        return chunk + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class _ZstdStream:
+    def __init__(self) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def __call__(self, data: bytes, final: bool) -> bytes:
+        mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+def _gzip(data: bytes) -> bytes:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+# В порядке предпочтения сервера: при равном q клиента выбирается первое
+ENCODINGS: list[_Encoding] = []
+if zstandard is not None:
+    ENCODINGS.append(_Encoding("zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress, _ZstdStream))
+if brotli is not None:
+    ENCODINGS.append(_Encoding(
+        "br", lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY), _BrotliStream,
+    ))
+ENCODINGS.append(_Encoding("gzip", _gzip, _GzipStream))
+
+compression_seconds = metrics.register(metrics.Counter(
+    "http_compression_seconds_total", "CPU time spent compressing response bodies", ("encoding",),
+))
+compression_bytes = metrics.register(metrics.Counter(
+    "http_compression_bytes_total", "Response bytes before and after compression", ("encoding", "stage"),
+))
+compression_responses = metrics.register(metrics.Counter(
+    "http_compression_responses_total", "Compressible responses by outcome", ("encoding", "result"),
+))
+
+# Сжатые тела по содержимому: один и тот же ответ (справочники, история
+# заданий для разных администраторов) не сжимается повторно. Ключ - хеш
+# исходного тела, поэтому запись не может попасть к чужому запросу
+bodies = TTLCache(max_entries=settings.COMPRESSION_CACHE_ENTRIES, ttl=settings.COMPRESSION_CACHE_TTL_SECONDS)
+
+
+def negotiate(accept_encoding: str) -> _Encoding | None:
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    best = None
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding.name, weights.get("*", 0.0))
+        if weight > 0 and (best is None or weight > best[0]):
+            best = (weight, encoding)
+    return best[1] if best else None
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and (content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type)
+    )
+
+
+# Сильный ETag относится к конкретным байтам, поэтому у сжатого представления
+# он свой; app.core.etags узнаёт такие теги в If-None-Match по суффиксу
+def _encode_etag(headers: MutableHeaders, encoding: _Encoding) -> None:
+    tag = headers.get("etag")
+    if tag and not tag.startswith("W/") and tag.endswith('"'):
+        headers["ETag"] = f'{tag[:-1]}-{encoding.name}"'
+
+
+def _timed(encoding: _Encoding, compress: Callable[..., bytes], data: bytes, *args: Any) -> bytes:
+    started = time.thread_time()
+    result = compress(data, *args)
+    compression_seconds.inc((encoding.name,), time.thread_time() - started)
+    compression_bytes.inc((encoding.name, "in"), len(data))
+    compression_bytes.inc((encoding.name, "out"), len(result))
+    return result
+
+
+async def _compress_body(encoding: _Encoding, body: bytes, cacheable: bool) -> bytes:
+    key = None
+    if cacheable:
+        key = (encoding.name, hashlib.blake2b(body, digest_size=16).digest())
+        cached = bodies.get(key)
+        if cached is not None:
+            compression_responses.inc((encoding.name, "cached"))
+            return cached
+    if len(body) >= THREAD_MIN_SIZE:
+        compressed = await run_in_threadpool(_timed, encoding, encoding.compress, body)
+    else:
+        compressed = _timed(encoding, encoding.compress, body)
+    compression_responses.inc((encoding.name, "compressed"))
+    if key is not None and len(compressed) <= settings.COMPRESSION_CACHE_MAX_BODY:
+        bodies.set(key, compressed)
+    return compressed
+
+
+# Согласованное сжатие ответов по Accept-Encoding. Ответ целиком (обычный
+# JSON) сжимается, если он не меньше COMPRESSION_MIN_SIZE; потоковый ответ
+# (выгрузки) сжимается по кускам без буферизации. Ответы на GET без
+# Cache-Control: no-store кэшируются в сжатом виде
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        stream = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, stream
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message["status"] in (204, 304) or not _compressible(headers):
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(scope=start)
+            if stream is None and not more_body:
+                pending, start = start, None
+                headers.add_vary_header("Accept-Encoding")
+                if len(body) < settings.COMPRESSION_MIN_SIZE:
+                    compression_responses.inc((encoding.name, "small"))
+                    await send(pending)
+                    await send(message)
+                    return
+                cacheable = (
+                    scope["method"] == "GET" and pending["status"] == 200
+                    and "no-store" not in headers.get("cache-control", "")
+                )
+                body = await _compress_body(encoding, body, cacheable)
+                headers["Content-Encoding"] = encoding.name
+                _encode_etag(headers, encoding)
+                headers["Content-Length"] = str(len(body))
+                await send(pending)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            if stream is None:
+                stream = encoding.stream()
+                headers.add_vary_header("Accept-Encoding")
+                headers["Content-Encoding"] = encoding.name
+                _encode_etag(headers, encoding)
+                del headers["Content-Length"]
+                compression_responses.inc((encoding.name, "streamed"))
+                await send(start)
+            chunk = _timed(encoding, stream, body, not more_body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
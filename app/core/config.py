@@ -1,4 +1,7 @@
+import os
 import secrets
+import tempfile
+from typing import Literal
 
 from pydantic import EmailStr
 
@@ -7,20 +10,81 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
+    # Ключи подписи JWT по идентификатору (kid), JSON в окружении. Новые токены
+    # подписываются ключом SIGNING_KEY_ID, проверяются любым из перечисленных;
+    # без SIGNING_KEYS используется SECRET_KEY
+    SIGNING_KEYS: dict[str, str] = {}
+    SIGNING_KEY_ID: str = "default"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_TOKEN_SWEEP_MINUTES: int = 60
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
     FIRST_SUPERUSER: EmailStr = "admin@example.com"
     FIRST_SUPERUSER_PASSWORD: str = "adminpassword"
     FIRST_SUPERUSER_NAME: str = "Admin"
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
+    PASSWORD_HASH_QUEUE: int = 64
+    BCRYPT_ROUNDS: int = 12
+    # Схема и первый суперпользователь создаются явно: python -m app.core.migrations.
+    # Для локальной разработки можно выполнять это при старте приложения; под
+    # gunicorn шаг выполняется один раз в мастер-процессе, а не в каждом воркере
+    RUN_DB_INIT_ON_STARTUP: bool = False
+    # Версия UUID для первичных ключей новых строк: 7 - упорядоченные по времени, 4 - случайные
+    UUID_VERSION: Literal[4, 7] = 7
+    # Версия выпуска входит в ETag: после выпуска клиенты со старым If-None-Match
+    # получают тело нового формата, а не 304. Задаётся при развёртывании
+    APP_VERSION: str = ""
+    # Журнал всех SQL-запросов (echo движка) - только для отладки
+    SQL_ECHO: bool = False
+    # Запросы дольше порога пишутся в лог; 0 - не писать
+    SQL_SLOW_QUERY_MS: int = 200
+    # Сколько повторов одного запроса (или выборок по первичному ключу) за запрос считать N+1
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+    # Заголовок Server-Timing с временем БД в ответах API
+    SQL_SERVER_TIMING: bool = True
+    # Адрес /metrics в формате Prometheus (задержки маршрутов, пул БД, bcrypt, кэши)
+    METRICS_ENABLED: bool = True
+    # Наблюдение за циклом событий: задержка сердцебиения и стек обработчика,
+    # если цикл занят одним вызовом дольше порога (отчёт в /debug/blocking)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: int = 50
+    LOOP_BLOCKING_THRESHOLD_MS: int = 100
+    # Профиль отдельного запроса по заголовку X-Profile или ?profile=1 (только для
+    # администратора); хранятся последние PROFILE_KEEP профилей, список в /debug/profiles
+    PROFILING_ENABLED: bool = True
+    PROFILE_DIR: str = os.path.join(tempfile.gettempdir(), "vkr-profiles")
+    PROFILE_INTERVAL_MS: int = 5
+    PROFILE_KEEP: int = 100
+    # Снимки tracemalloc для /debug/memory; каждый держит все трассировки в памяти
+    MEMORY_SNAPSHOTS_KEPT: int = 10
+    # Сжатие ответов по Accept-Encoding (gzip; zstd и br, если установлены пакеты
+    # zstandard и brotli). Ответы меньше порога в байтах не сжимаются. Сжатые
+    # тела ответов на GET кэшируются по содержимому, крупнее MAX_BODY - нет
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_CACHE_ENTRIES: int = 128
+    COMPRESSION_CACHE_TTL_SECONDS: int = 300
+    COMPRESSION_CACHE_MAX_BODY: int = 1024 * 1024
+    # Клубы и оборудование в памяти процесса (app.core.catalog) для списков и
+    # проверок при создании заданий. Режим проверки сверяет кэш с БД при каждом
+    # обращении - только для тестов
+    CATALOG_CACHE_ENABLED: bool = True
+    CATALOG_CONSISTENCY_CHECK: bool = False
 
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "password"
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str = "vkr"
+    # Полный адрес базы вместо POSTGRES_*; например sqlite:///bench.db для
+    # локальных бенчмарков (benchmarks.api_suite)
+    DATABASE_URL: str | None = None
 
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return (
             f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
@@ -1,13 +1,54 @@
+import time
+
+from sqlalchemy import URL, Engine, event, make_url
+from sqlalchemy.pool import QueuePool
 from sqlmodel import Session, create_engine, select
-from sqlmodel import SQLModel
 
 from app import crud
+from app.core import metrics, sql_stats
 from app.core.config import settings
 from app.models import User
 from app.schemas import UserCreate
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, echo=True)
-SQLModel.metadata.create_all(engine)
+_engine: Engine | None = None
+
+
+# Пул, который замеряет ожидание свободного соединения: при исчерпании
+# pool_size + max_overflow запросы стоят здесь, а не в самой БД
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.pool_checkout.observe(time.perf_counter() - started)
+
+
+# Пересчёт статусов заказов - серверная функция PostgreSQL; в SQLite, которая
+# заменяет её в локальных бенчмарках, вызов ничего не делает
+def _register_sqlite_functions(dbapi_connection, connection_record) -> None:
+    dbapi_connection.create_function("update_all_orders_status", 0, lambda: None)
+
+
+def create_app_engine(url: str | URL) -> Engine:
+    url = make_url(url)
+    options = {}
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        options["poolclass"] = TimedQueuePool
+    engine = create_engine(url, echo=settings.SQL_ECHO, **options)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _register_sqlite_functions)
+    sql_stats.instrument(engine)
+    return engine
+
+
+# Движок создаётся при первом обращении: импорт приложения не требует
+# доступной БД, а схема создаётся только миграциями (app.core.migrations)
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        _engine = create_app_engine(settings.SQLALCHEMY_DATABASE_URI)
+    return _engine
 
 
 def init_db(session: Session) -> None:
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import threading
+from typing import Any
+
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+from starlette.responses import Response
+
+from app.core import notify
+from app.core.config import settings
+from app.models import CollectionVersion
+
+CHANNEL = "collection_versions"
+# Суффиксы, которые app.core.compression добавляет к ETag сжатого ответа
+ENCODING_SUFFIXES = ("-gzip", "-br", "-zstd")
+
+# Версии коллекций (таблица collection_version, растут триггерами миграции v0003).
+# Кэшируются, только пока работает слушатель уведомлений: триггеры шлют
+# уведомление после фиксации изменения, и кэш сбрасывается во всех воркерах
+_lock = threading.Lock()
+_versions: dict[str, int] | None = None
+_generation = 0
+
+
+def versions(session: Session) -> dict[str, int]:
+    global _versions
+    cached = _versions
+    if cached is not None:
+        return cached
+    generation = _generation
+    loaded = dict(session.exec(select(CollectionVersion.name, CollectionVersion.version)).all())
+    if notify.listening():
+        with _lock:
+            # Уведомление, пришедшее во время чтения, означает, что прочитанное могло устареть
+            if generation == _generation:
+                _versions = loaded
+    return loaded
+
+
+def _on_notification(payload: str | None) -> None:
+    global _versions, _generation
+    with _lock:
+        _generation += 1
+        _versions = None
+
+
+notify.subscribe(CHANNEL, _on_notification)
+
+
+# Соль выпуска: версия приложения и JSON-схемы ответа. Смена формата ответа
+# меняет теги, даже если данные в коллекциях не менялись
+def release_salt(*schemas: Any) -> str:
+    parts = [settings.APP_VERSION] + [
+        json.dumps(TypeAdapter(schema).json_schema(), sort_keys=True) for schema in schemas
+    ]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+
+# Заголовки ответа 304 - те же, что у 200: тег сжатого представления
+# (app.core.compression) зависит от Accept-Encoding
+def not_modified_headers(tag: str, cache_control: str) -> dict[str, str]:
+    headers = {"ETag": tag, "Cache-Control": cache_control}
+    if settings.COMPRESSION_ENABLED:
+        headers["Vary"] = "Accept-Encoding"
+    return headers
+
+
+# Сильный ETag по байтам ответа - для ответов, собранных из часто меняющихся таблиц
+def content_tag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+# Сильный ETag: версии коллекций, из которых собран ответ, и всё, от чего ответ
+# зависит в самом запросе (путь, параметры, пользователь)
+def make_tag(versions: dict[str, int], collections: tuple[str, ...], *parts: str) -> str:
+    key = "|".join([f"{name}={versions.get(name, 0)}" for name in collections] + list(parts))
+    return f'"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+
+# Тег из If-None-Match, совпавший с текущим (сравнение слабое, как требует
+# RFC 9110 для If-None-Match), или None
+def matching(if_none_match: str | None, tag: str) -> str | None:
+    if not if_none_match:
+        return None
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return tag
+        opaque = candidate.removeprefix("W/")
+        for suffix in ENCODING_SUFFIXES:
+            if opaque.endswith(f'{suffix}"'):
+                opaque = opaque[:-len(suffix) - 1] + '"'
+                break
+        if opaque == tag:
+            return candidate
+    return None
+
+
+# Заголовки условного ответа. Без заранее известного тега (tag=None) тег
+# считается по телу готового ответа, и при совпадении с If-None-Match ответ
+# заменяется на 304
+class Conditional:
+    def __init__(self, tag: str | None, cache_control: str, if_none_match: str | None = None) -> None:
+        self.tag = tag
+        self.cache_control = cache_control
+        self.if_none_match = if_none_match
+
+    def apply(self, response: Response) -> Response:
+        tag = self.tag
+        if tag is None:
+            tag = content_tag(response.body)
+            matched = matching(self.if_none_match, tag)
+            if matched is not None:
+                return Response(status_code=304, headers=not_modified_headers(matched, self.cache_control))
+        response.headers["ETag"] = tag
+        response.headers["Cache-Control"] = self.cache_control
+        return response
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.core.db import get_engine
+from app.schemas import ExportFormat
+
+# Сколько строк накапливать перед отправкой очередного куска ответа
+CHUNK_ROWS = 500
+
+MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv; charset=utf-8",
+    ExportFormat.ndjson: "application/x-ndjson",
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_csv(rows: Iterable[Mapping[str, Any]], columns: list[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_plain(row[column]) for column in columns])
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows: Iterable[Mapping[str, Any]], columns: list[str]) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: _plain(row[column]) for column in columns}, default=_json_default))
+        if len(lines) == CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines.clear()
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def stream_export(
+        query: Callable[..., Iterable[Mapping[str, Any]]],
+        columns: list[str],
+        export_format: ExportFormat,
+        filename: str,
+        **filters: Any
+) -> StreamingResponse:
+    encode = iter_csv if export_format == ExportFormat.csv else iter_ndjson
+
+    # Сессия живёт ровно столько, сколько идёт выгрузка: зависимость get_db
+    # закрывается до начала отправки тела ответа, поэтому её здесь не используем.
+    # Генератор синхронный (драйвер БД синхронный), StreamingResponse сам
+    # прокручивает его в пуле потоков, не блокируя event loop.
+    def body() -> Iterator[str]:
+        with Session(get_engine()) as session:
+            yield from encode(query(session, **filters), columns)
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
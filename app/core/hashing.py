@@ -0,0 +1,104 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any
+
+
+class HashPoolSaturated(Exception):
+    pass
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+# Ограниченный пул процессов для bcrypt: одновременно выполняется не больше
+# workers задач и ещё до max_queue ждут в очереди. Асинхронный run при
+# заполненной очереди сразу отказывает (HashPoolSaturated), синхронные
+# run_sync/map_sync ждут свободного места.
+class HashPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(workers, 1)
+        self.max_pending = self.workers + max(max_queue, 0)
+        self._executor: ProcessPoolExecutor | None = None
+        self._capacity = threading.Condition()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._capacity:
+                if self._executor is None:
+                    # spawn, а не fork: форк процесса с потоками uvicorn небезопасен
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _done(self, future: Future) -> None:
+        with self._capacity:
+            self._pending -= 1
+            self._capacity.notify()
+            if not future.cancelled() and future.exception() is None:
+                elapsed = future.result()[1]
+                self.completed += 1
+                self.hash_seconds += elapsed
+                self.max_hash_seconds = max(self.max_hash_seconds, elapsed)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, block: bool = False) -> Future:
+        executor = self._get_executor()
+        with self._capacity:
+            if self._pending >= self.max_pending:
+                if not block:
+                    self.rejected += 1
+                    raise HashPoolSaturated()
+                self._capacity.wait_for(lambda: self._pending < self.max_pending)
+            self._pending += 1
+        try:
+            future = executor.submit(_timed, fn, *args)
+        except BaseException:
+            with self._capacity:
+                self._pending -= 1
+                self._capacity.notify()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        result, _ = await asyncio.wrap_future(self.submit(fn, *args))
+        return result
+
+    def run_sync(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return self.submit(fn, *args, block=True).result()[0]
+
+    def map_sync(self, fn: Callable[..., Any], items: Iterable[Any]) -> list[Any]:
+        futures = [self.submit(fn, item, block=True) for item in items]
+        return [future.result()[0] for future in futures]
+
+    def stats(self) -> dict[str, float]:
+        with self._capacity:
+            pending = self._pending
+        return {
+            "workers": self.workers,
+            "in_flight": min(pending, self.workers),
+            "queue_depth": max(pending - self.workers, 0),
+            "queue_limit": self.max_pending - self.workers,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_seconds_total": self.hash_seconds,
+            "hash_seconds_max": self.max_hash_seconds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
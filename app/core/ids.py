@@ -0,0 +1,41 @@
+import os
+import threading
+import time
+import uuid
+from uuid import UUID
+
+from app.core.config import settings
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+# UUIDv7 (RFC 9562): 48 бит времени в миллисекундах, 12-битный счётчик внутри
+# миллисекунды и 62 случайных бита. Значения возрастают со временем, поэтому
+# новые строки попадают в правый край B-дерева первичного ключа, а не в
+# случайную страницу, как с uuid4
+def uuid7() -> UUID:
+    global _last_ms, _counter
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            # Случайное начало счётчика с запасом на рост внутри миллисекунды
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            # Та же миллисекунда или часы ушли назад: значения всё равно растут
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        timestamp, counter = _last_ms, _counter
+    random_bits = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    return UUID(int=(timestamp << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | random_bits)
+
+
+# Фабрика первичных ключей всех моделей; версия выбирается настройкой UUID_VERSION
+def new_id() -> UUID:
+    if settings.UUID_VERSION == 7:
+        return uuid7()
+    return uuid.uuid4()
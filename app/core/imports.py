@@ -0,0 +1,76 @@
+import codecs
+import csv
+import io
+import json
+from collections.abc import Iterator
+from typing import Any, BinaryIO
+
+from fastapi import UploadFile
+
+from app.schemas import ExportFormat
+
+# (номер строки данных, запись или None, текст ошибки разбора или None)
+Record = tuple[int, dict[str, Any] | None, str | None]
+
+
+def detect_format(file: UploadFile) -> ExportFormat:
+    filename = (file.filename or "").lower()
+    content_type = (file.content_type or "").lower()
+    if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return ExportFormat.ndjson
+    return ExportFormat.csv
+
+
+# Кодировка проверяется по всему файлу до импорта: строки декодируются лениво,
+# и ошибка посреди файла (CSV из Excel в cp1251) оборвала бы импорт, когда
+# первые пачки уже зафиксированы. Файл читается кусками и перематывается в начало
+def is_utf8(file: BinaryIO, chunk_size: int = 1024 * 1024) -> bool:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        while chunk := file.read(chunk_size):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    finally:
+        file.seek(0)
+    return True
+
+
+def iter_records(file: BinaryIO, file_format: ExportFormat) -> Iterator[Record]:
+    # Файл читается построчно: в памяти держится только текущая строка,
+    # сколько бы строк ни было в загрузке
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == ExportFormat.csv:
+            yield from _iter_csv(text)
+        else:
+            yield from _iter_ndjson(text)
+    finally:
+        text.detach()
+
+
+def _iter_csv(text: io.TextIOWrapper) -> Iterator[Record]:
+    reader = csv.DictReader(text)
+    for row_number, row in enumerate(reader, start=1):
+        if None in row:
+            yield row_number, None, "Too many columns"
+            continue
+        yield row_number, {key: value for key, value in row.items() if value not in ("", None)}, None
+
+
+def _iter_ndjson(text: io.TextIOWrapper) -> Iterator[Record]:
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield row_number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, record, None
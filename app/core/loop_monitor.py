@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 30
+EVENTS_KEPT = 100
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_LIBRARIES = tuple({sysconfig.get_path(name) for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+# Функции FastAPI, из которых вызываются обработчик маршрута и его зависимости
+_DISPATCHERS = {"run_endpoint_function", "solve_dependencies"}
+
+loop_lag = metrics.register(metrics.Histogram(
+    "event_loop_lag_seconds", "Delay of the event loop heartbeat past its schedule", LAG_BUCKETS,
+))
+loop_blocked = metrics.register(metrics.Counter(
+    "event_loop_blocked_total", "Event loop stalls longer than LOOP_BLOCKING_THRESHOLD_MS", ("handler",),
+))
+
+
+class _State:
+    def __init__(self) -> None:
+        self.loop_thread: int | None = None
+        # Когда сердцебиение должно было проснуться; пишет поток цикла, читает сторож
+        self.deadline = 0.0
+        # Стек, снятый сторожем во время текущей остановки цикла
+        self.sample: list[traceback.FrameSummary] | None = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.events: deque[dict[str, Any]] = deque(maxlen=EVENTS_KEPT)
+        self.sites: dict[tuple[str | None, str], dict[str, Any]] = {}
+
+
+_state = _State()
+_stop = threading.Event()
+_watchdog: threading.Thread | None = None
+_heartbeat: asyncio.Task | None = None
+
+
+def _where(frame: traceback.FrameSummary) -> str:
+    return f"{os.path.relpath(frame.filename, _ROOT)}:{frame.lineno} in {frame.name}"
+
+
+# Обработчик - кадр, вызванный FastAPI (маршрут или зависимость), место вызова -
+# самый внутренний кадр кода приложения: дальше блокирует уже библиотека.
+# Без обработчика в стеке (middleware, фоновые задачи) берётся внешний кадр приложения
+def _describe(stack: list[traceback.FrameSummary]) -> tuple[str | None, str]:
+    start = 0
+    for index, frame in enumerate(stack):
+        if frame.name in _DISPATCHERS:
+            start = index + 1
+    own = [frame for frame in stack[start:] if not frame.filename.startswith(_LIBRARIES)]
+    if not own:
+        return None, _where(stack[-1]) if stack else "<unknown>"
+    return _where(own[0]), _where(own[-1])
+
+
+def _record(duration: float, stack: list[traceback.FrameSummary]) -> None:
+    handler, site = _describe(stack)
+    loop_blocked.inc((handler or site,))
+    _state.events.append({
+        "at": datetime.now(timezone.utc),
+        "duration_ms": duration * 1000,
+        "handler": handler,
+        "call_site": site,
+        "stack": [_where(frame) for frame in stack[-STACK_DEPTH:]],
+    })
+    aggregate = _state.sites.setdefault((handler, site), {
+        "handler": handler, "call_site": site, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+    })
+    aggregate["count"] += 1
+    aggregate["total_ms"] += duration * 1000
+    aggregate["max_ms"] = max(aggregate["max_ms"], duration * 1000)
+    logger.warning(
+        "Event loop blocked for %.0f ms in %s at %s",
+        duration * 1000, handler or "<no app frame>", site,
+    )
+
+
+async def _beat(interval: float) -> None:
+    threshold = settings.LOOP_BLOCKING_THRESHOLD_MS / 1000
+    while True:
+        _state.deadline = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lag = max(time.perf_counter() - _state.deadline, 0.0)
+        loop_lag.observe(lag)
+        _state.last_lag = lag
+        _state.max_lag = max(_state.max_lag, lag)
+        sample, _state.sample = _state.sample, None
+        # Сторож мог снять стек на границе интервала, когда цикл уже освободился
+        if sample is not None and lag >= threshold:
+            _record(lag, sample)
+
+
+# Сторож в отдельном потоке: пока цикл стоит, сердцебиение не может о себе
+# сообщить, поэтому стек потока цикла снимается извне через sys._current_frames
+def _watch(interval: float) -> None:
+    threshold = settings.LOOP_BLOCKING_THRESHOLD_MS / 1000
+    while not _stop.wait(interval / 2):
+        if _state.sample is not None or time.perf_counter() - _state.deadline < threshold:
+            continue
+        frame = sys._current_frames().get(_state.loop_thread)
+        if frame is not None:
+            _state.sample = traceback.extract_stack(frame)
+
+
+def start() -> None:
+    global _watchdog, _heartbeat
+    if not settings.LOOP_MONITOR_ENABLED or _heartbeat is not None:
+        return
+    interval = settings.LOOP_MONITOR_INTERVAL_MS / 1000
+    _state.loop_thread = threading.get_ident()
+    _state.deadline = time.perf_counter() + interval
+    _stop.clear()
+    _heartbeat = asyncio.get_running_loop().create_task(_beat(interval), name="loop-monitor")
+    _watchdog = threading.Thread(target=_watch, args=(interval,), name="loop-monitor", daemon=True)
+    _watchdog.start()
+
+
+def stop() -> None:
+    global _watchdog, _heartbeat
+    _stop.set()
+    if _heartbeat is not None:
+        _heartbeat.cancel()
+        _heartbeat = None
+    if _watchdog is not None:
+        _watchdog.join(timeout=1)
+        _watchdog = None
+
+
+def report() -> dict[str, Any]:
+    return {
+        "enabled": _heartbeat is not None,
+        "threshold_ms": settings.LOOP_BLOCKING_THRESHOLD_MS,
+        "last_lag_ms": _state.last_lag * 1000,
+        "max_lag_ms": _state.max_lag * 1000,
+        "sites": sorted(_state.sites.values(), key=lambda site: site["total_ms"], reverse=True),
+        "events": list(reversed(_state.events)),
+    }
+
+
+def reset() -> None:
+    _state.max_lag = 0.0
+    _state.events.clear()
+    _state.sites.clear()
@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import tracemalloc
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Literal
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import profiling
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HEADER = "x-memory-peak"
+QUERY_PARAM = "memory"
+REQUESTS_KEPT = 100
+
+GroupBy = Literal["module", "filename", "lineno"]
+
+# Аллокации самого tracemalloc и загрузчика модулей только мешают при поиске утечек
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+_lock = threading.Lock()
+_snapshots: dict[str, tuple[datetime, tracemalloc.Snapshot]] = {}
+_requests: deque[dict[str, Any]] = deque(maxlen=REQUESTS_KEPT)
+# Запросы с замером пика, ради которых трассировка включена временно
+_peak_requests = 0
+_started_for_requests = False
+
+
+class SnapshotNotFound(Exception):
+    pass
+
+
+class NotTracing(Exception):
+    pass
+
+
+def _rss() -> int | None:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def status() -> dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    with _lock:
+        snapshots = [_snapshot_info(name, *entry) for name, entry in _snapshots.items()]
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        "rss_bytes": _rss(),
+        "snapshots": snapshots,
+    }
+
+
+def start(frames: int) -> None:
+    global _started_for_requests
+    with _lock:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        tracemalloc.start(frames)
+        _started_for_requests = False
+        _snapshots.clear()
+
+
+def stop() -> None:
+    with _lock:
+        tracemalloc.stop()
+        _snapshots.clear()
+
+
+def _acquire_tracing() -> None:
+    global _peak_requests, _started_for_requests
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_for_requests = True
+        _peak_requests += 1
+
+
+def _release_tracing() -> None:
+    global _peak_requests, _started_for_requests
+    with _lock:
+        _peak_requests -= 1
+        if _peak_requests == 0 and _started_for_requests:
+            tracemalloc.stop()
+            _started_for_requests = False
+
+
+def _take() -> tracemalloc.Snapshot:
+    if not tracemalloc.is_tracing():
+        raise NotTracing()
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def _snapshot_info(name: str, taken_at: datetime, snapshot: tracemalloc.Snapshot) -> dict[str, Any]:
+    total = sum(trace.size for trace in snapshot.traces)
+    return {"name": name, "taken_at": taken_at, "traced_bytes": total, "blocks": len(snapshot.traces)}
+
+
+# Снимки держат все трассировки в памяти, поэтому хранятся только последние MEMORY_SNAPSHOTS_KEPT
+def take_snapshot(name: str | None = None) -> dict[str, Any]:
+    snapshot = _take()
+    taken_at = datetime.now(timezone.utc)
+    name = name or f"{taken_at:%Y%m%dT%H%M%S%f}"
+    with _lock:
+        _snapshots.pop(name, None)
+        _snapshots[name] = (taken_at, snapshot)
+        while len(_snapshots) > settings.MEMORY_SNAPSHOTS_KEPT:
+            del _snapshots[next(iter(_snapshots))]
+    return _snapshot_info(name, taken_at, snapshot)
+
+
+def _get(name: str) -> tracemalloc.Snapshot:
+    with _lock:
+        entry = _snapshots.get(name)
+    if entry is None:
+        raise SnapshotNotFound(name)
+    return entry[1]
+
+
+def _module(filename: str) -> str:
+    path = profiling.source_path(filename)
+    if path == filename or not path.endswith(".py"):
+        return path
+    module = path[:-3].replace(os.sep, ".")
+    return module.removesuffix(".__init__")
+
+
+def _key(group_by: GroupBy, frame: tracemalloc.Frame) -> str:
+    if group_by == "module":
+        return _module(frame.filename)
+    if group_by == "filename":
+        return profiling.source_path(frame.filename)
+    return f"{profiling.source_path(frame.filename)}:{frame.lineno}"
+
+
+# tracemalloc группирует по файлу или строке; модули собираются из файлов здесь
+def _group(stats: list[Any], group_by: GroupBy, limit: int) -> list[dict[str, Any]]:
+    groups: dict[str, dict[str, Any]] = {}
+    for stat in stats:
+        site = _key(group_by, stat.traceback[0])
+        group = groups.setdefault(site, {"site": site, "size": 0, "count": 0, "size_diff": 0, "count_diff": 0})
+        group["size"] += stat.size
+        group["count"] += stat.count
+        group["size_diff"] += getattr(stat, "size_diff", 0)
+        group["count_diff"] += getattr(stat, "count_diff", 0)
+    ordered = sorted(groups.values(), key=lambda group: abs(group["size_diff"]) or group["size"], reverse=True)
+    return ordered[:limit]
+
+
+def _key_type(group_by: GroupBy) -> str:
+    return "lineno" if group_by == "lineno" else "filename"
+
+
+def top(name: str | None, group_by: GroupBy, limit: int) -> list[dict[str, Any]]:
+    snapshot = _get(name) if name else _take()
+    return _group(snapshot.statistics(_key_type(group_by)), group_by, limit)
+
+
+# Без after сравнение идёт с текущим состоянием памяти
+def diff(before: str, after: str | None, group_by: GroupBy, limit: int) -> list[dict[str, Any]]:
+    old = _get(before)
+    new = _get(after) if after else _take()
+    return _group(new.compare_to(old, _key_type(group_by)), group_by, limit)
+
+
+def recent_requests() -> list[dict[str, Any]]:
+    return list(reversed(_requests))
+
+
+# Пик аллокаций за время запроса по заголовку X-Memory-Peak или ?memory=1 (только
+# администратор). Если трассировка не была включена, она включается на время
+# запроса. Счётчик пика общий для процесса: параллельные запросы попадают в него же
+class MemoryPeakMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not profiling.flag_requested(scope, HEADER, QUERY_PARAM):
+            await self.app(scope, receive, send)
+            return
+        if not await run_in_threadpool(profiling.is_superuser, Headers(scope=scope).get("authorization")):
+            await self.app(scope, receive, send)
+            return
+
+        _acquire_tracing()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        status_code = 0
+
+        async def send_with_peak(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                current, peak = tracemalloc.get_traced_memory()
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Memory-Peak", str(max(peak - baseline, 0)))
+                headers.append("X-Memory-Retained", str(current - baseline))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_peak)
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            _release_tracing()
+            entry = {
+                "at": datetime.now(timezone.utc),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "peak_bytes": max(peak - baseline, 0),
+                "retained_bytes": current - baseline,
+            }
+            _requests.append(entry)
+            logger.info(
+                "Memory peak %s %s: %.1f KiB, retained %.1f KiB",
+                scope["method"], scope["path"], entry["peak_bytes"] / 1024, entry["retained_bytes"] / 1024,
+            )
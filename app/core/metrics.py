@@ -0,0 +1,307 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+Labels = tuple[str, ...]
+Sample = tuple[str, dict[str, str], float]
+
+
+# Значения накапливаются в отдельном шарде на каждый поток: запись не берёт
+# блокировок и не конкурирует с другими потоками, а при выдаче /metrics шарды
+# суммируются. Номера потоков переиспользуются, поэтому число шардов ограничено
+class _Sharded:
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._shards: dict[int, dict[Labels, list[float]]] = {}
+
+    def _series(self, labels: Labels, size: int) -> list[float]:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            shard = self._shards[ident] = {}
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [0.0] * size
+        return series
+
+    def _merged(self) -> dict[Labels, list[float]]:
+        merged: dict[Labels, list[float]] = {}
+        for shard in list(self._shards.values()):
+            for labels, series in list(shard.items()):
+                total = merged.setdefault(labels, [0.0] * len(series))
+                for index, value in enumerate(series):
+                    total[index] += value
+        return merged
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self._series(labels, 1)[0] += amount
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, (value,) in self._merged().items():
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+# Счётчик, который может уменьшаться (запросы в обработке)
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self._series(labels, 1)[0] -= amount
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple[float, ...], labelnames: Labels = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    # Ряд: число наблюдений в каждом интервале, затем в +Inf, затем сумма
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        series = self._series(labels, len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, series in self._merged().items():
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", {**base, "le": le}, cumulative
+            yield f"{self.name}_count", base, cumulative
+            yield f"{self.name}_sum", base, series[-1]
+
+
+# Метрики, значения которых снимаются в момент выдачи (пул, bcrypt, кэши)
+class Collected:
+    def __init__(self, name: str, kind: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.samples = collect
+
+
+Metric = Counter | Histogram | Collected
+
+_registry: list[Metric] = []
+
+
+def register(metric: Any) -> Any:
+    _registry.append(metric)
+    return metric
+
+
+def collected(name: str, kind: str, documentation: str) -> Callable[[Callable[[], Iterable[Sample]]], Collected]:
+    def decorator(collect: Callable[[], Iterable[Sample]]) -> Collected:
+        return register(Collected(name, kind, documentation, collect))
+    return decorator
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render() -> str:
+    pid = str(os.getpid())
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            # pid различает воркеры gunicorn, которые Prometheus опрашивает по очереди
+            label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in {"pid": pid, **labels}.items())
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+requests_in_flight = register(Gauge(
+    "http_requests_in_flight", "Requests being processed", ("method", "route"),
+))
+request_duration = register(Histogram(
+    "http_request_duration_seconds", "Request latency including middleware",
+    LATENCY_BUCKETS, ("method", "route", "status"),
+))
+pool_checkout = register(Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled database connection", CHECKOUT_BUCKETS,
+))
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_name(scope: Scope) -> str:
+    return getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+
+
+# Задержка считается для всех HTTP-запросов; шаблон маршрута известен после
+# маршрутизации, поэтому метка проставляется по окончании запроса
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_duration.observe(
+                time.perf_counter() - started,
+                (scope["method"], route_name(scope), f"{status // 100}xx"),
+            )
+
+
+# Счётчик запросов в обработке ведёт обёртка вокруг самого маршрута: она
+# вызывается уже после сопоставления пути, без повторной маршрутизации
+def instrument_routes(routes: Iterable[BaseRoute]) -> None:
+    for route in routes:
+        path = getattr(route, "path", None)
+        if path is None or not hasattr(route, "app"):
+            continue
+
+        def wrap(inner: ASGIApp, path: str) -> ASGIApp:
+            async def app(scope: Scope, receive: Receive, send: Send) -> None:
+                labels = (scope["method"], path)
+                requests_in_flight.inc(labels)
+                try:
+                    await inner(scope, receive, send)
+                finally:
+                    requests_in_flight.dec(labels)
+            return app
+
+        route.app = wrap(route.app, path)
+
+
+@collected("db_pool_connections", "gauge", "Connections of the SQLAlchemy pool by state")
+def _pool_connections() -> Iterable[Sample]:
+    from sqlalchemy.pool import QueuePool
+
+    from app.core.db import get_engine
+
+    pool = get_engine().pool
+    if isinstance(pool, QueuePool):
+        yield "db_pool_connections", {"state": "size"}, pool.size()
+        yield "db_pool_connections", {"state": "checked_out"}, pool.checkedout()
+        yield "db_pool_connections", {"state": "checked_in"}, pool.checkedin()
+        yield "db_pool_connections", {"state": "overflow"}, max(pool.overflow(), 0)
+
+
+def _route_labels(name: str) -> dict[str, str]:
+    method, _, route = name.partition(" ")
+    return {"method": method, "route": route}
+
+
+@collected("db_route_seconds_total", "counter", "Time spent in SQL by route")
+def _db_route_seconds() -> Iterable[Sample]:
+    from app.core import sql_stats
+
+    for name, stats in sql_stats.route_stats().items():
+        yield "db_route_seconds_total", _route_labels(name), stats["db_seconds"]
+
+
+@collected("db_route_queries_total", "counter", "SQL statements executed by route")
+def _db_route_queries() -> Iterable[Sample]:
+    from app.core import sql_stats
+
+    for name, stats in sql_stats.route_stats().items():
+        yield "db_route_queries_total", _route_labels(name), stats["queries"]
+
+
+@collected("db_route_n_plus_one_total", "counter", "Requests flagged as possible N+1 by route")
+def _db_route_n_plus_one() -> Iterable[Sample]:
+    from app.core import sql_stats
+
+    for name, stats in sql_stats.route_stats().items():
+        yield "db_route_n_plus_one_total", _route_labels(name), stats["n_plus_one"]
+
+
+@collected("password_hash_pool", "gauge", "bcrypt process pool state")
+def _hash_pool_state() -> Iterable[Sample]:
+    from app.core.security import hash_pool
+
+    stats = hash_pool.stats()
+    for key in ("workers", "in_flight", "queue_depth", "queue_limit", "hash_seconds_max"):
+        yield "password_hash_pool", {"value": key}, stats[key]
+
+
+@collected("password_hash_total", "counter", "bcrypt operations by outcome")
+def _hash_pool_operations() -> Iterable[Sample]:
+    from app.core.security import hash_pool
+
+    stats = hash_pool.stats()
+    yield "password_hash_total", {"outcome": "completed"}, stats["completed"]
+    yield "password_hash_total", {"outcome": "rejected"}, stats["rejected"]
+
+
+@collected("password_hash_seconds_total", "counter", "Time spent hashing and verifying passwords")
+def _hash_pool_seconds() -> Iterable[Sample]:
+    from app.core.security import hash_pool
+
+    yield "password_hash_seconds_total", {}, hash_pool.stats()["hash_seconds_total"]
+
+
+def _caches() -> dict[str, Any]:
+    from app.core import auth_cache, catalog, compression
+
+    return {
+        "auth_tokens": auth_cache.tokens,
+        "auth_users": auth_cache.users,
+        "compressed_bodies": compression.bodies,
+        "catalog": catalog,
+    }
+
+
+@collected("cache_requests_total", "counter", "In-process cache lookups by result")
+def _cache_requests() -> Iterable[Sample]:
+    for name, cache in _caches().items():
+        stats = cache.stats()
+        yield "cache_requests_total", {"cache": name, "result": "hit"}, stats["hits"]
+        yield "cache_requests_total", {"cache": name, "result": "miss"}, stats["misses"]
+
+
+@collected("cache_hit_ratio", "gauge", "Share of in-process cache lookups served from the cache")
+def _cache_hit_ratio() -> Iterable[Sample]:
+    for name, cache in _caches().items():
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        yield "cache_hit_ratio", {"cache": name}, stats["hits"] / lookups if lookups else 0.0
+
+
+@collected("cache_entries", "gauge", "Entries held by in-process caches")
+def _cache_entries() -> Iterable[Sample]:
+    for name, cache in _caches().items():
+        yield "cache_entries", {"cache": name}, cache.stats()["entries"]
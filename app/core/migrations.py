@@ -0,0 +1,141 @@
+# Версионные миграции схемы БД. Запускаются явно до старта API:
+#   python -m app.core.migrations            применить новые миграции и создать суперпользователя
+#   python -m app.core.migrations status     текущая версия и непримененные миграции
+import argparse
+import importlib
+import logging
+import pkgutil
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Connection, DateTime, Engine, Integer, MetaData, String, Table, insert, select, text
+from sqlmodel import Session
+
+from app.core.db import get_engine, init_db
+
+logger = logging.getLogger(__name__)
+
+PACKAGE = "app.migrations"
+# Ключ pg_advisory_lock: одновременно запущенные мигрирующие процессы ждут друг друга
+LOCK_KEY = 7_340_034
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+    # False - миграция выполняется вне транзакции (например, CREATE INDEX CONCURRENTLY)
+    transactional: bool = True
+
+
+# Миграция - модуль app/migrations/v<номер>_<название>.py с функцией upgrade(connection)
+def discover() -> list[Migration]:
+    package = importlib.import_module(PACKAGE)
+    migrations = []
+    for module_info in pkgutil.iter_modules(package.__path__):
+        prefix, _, name = module_info.name.partition("_")
+        if not prefix.startswith("v") or not prefix[1:].isdigit():
+            continue
+        module = importlib.import_module(f"{PACKAGE}.{module_info.name}")
+        migrations.append(Migration(
+            version=int(prefix[1:]),
+            name=name,
+            upgrade=module.upgrade,
+            transactional=getattr(module, "TRANSACTIONAL", True),
+        ))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {PACKAGE}: {versions}")
+    return migrations
+
+
+def _applied_versions(connection: Connection) -> set[int]:
+    schema_version.create(connection, checkfirst=True)
+    versions = set(connection.execute(select(schema_version.c.version)).scalars())
+    connection.commit()
+    return versions
+
+
+def status(engine: Engine | None = None) -> tuple[int, list[Migration]]:
+    with (engine or get_engine()).connect() as connection:
+        applied = _applied_versions(connection)
+    pending = [migration for migration in discover() if migration.version not in applied]
+    return max(applied, default=0), pending
+
+
+def upgrade(engine: Engine | None = None, target: int | None = None) -> list[Migration]:
+    engine = engine or get_engine()
+    locking = engine.dialect.name == "postgresql"
+    applied_now = []
+    with engine.connect() as connection:
+        if locking:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+            connection.commit()
+        try:
+            applied = _applied_versions(connection)
+            for migration in discover():
+                if migration.version in applied or (target is not None and migration.version > target):
+                    continue
+                logger.info("Applying migration v%04d_%s", migration.version, migration.name)
+                if migration.transactional:
+                    # Миграция и запись о ней фиксируются одной транзакцией
+                    migration.upgrade(connection)
+                else:
+                    with engine.connect() as autocommit:
+                        migration.upgrade(autocommit.execution_options(isolation_level="AUTOCOMMIT"))
+                connection.execute(insert(schema_version).values(
+                    version=migration.version,
+                    name=migration.name,
+                    applied_at=datetime.now(timezone.utc).replace(tzinfo=None),
+                ))
+                connection.commit()
+                applied_now.append(migration)
+        finally:
+            connection.rollback()
+            if locking:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+                connection.commit()
+    return applied_now
+
+
+def setup_database(seed: bool = True, target: int | None = None) -> list[Migration]:
+    applied = upgrade(target=target)
+    if seed:
+        with Session(get_engine()) as session:
+            init_db(session)
+    return applied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Versioned database schema migrations")
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+    parser.add_argument("--target", type=int, help="apply migrations up to this version only")
+    parser.add_argument("--no-seed", action="store_true", help="do not create the first superuser")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "status":
+        version, pending = status()
+        print(f"current version: {version}")
+        for migration in pending:
+            print(f"pending: v{migration.version:04d}_{migration.name}")
+        return
+
+    applied = setup_database(seed=not args.no_seed, target=args.target)
+    version, _ = status()
+    print(f"applied {len(applied)} migration(s), current version: {version}")
+
+
+if __name__ == "__main__":
+    main()
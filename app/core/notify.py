@@ -0,0 +1,110 @@
+import logging
+import os
+import select
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Обработчик получает payload уведомления либо None, если уведомления могли
+# быть пропущены (переподключение слушателя) и локальное состояние надо сбросить
+Handler = Callable[[str | None], None]
+
+_handlers: dict[str, list[Handler]] = defaultdict(list)
+_stop = threading.Event()
+_listener: threading.Thread | None = None
+# Канал для пробуждения слушателя из stop_listener, чтобы не ждать таймаута select
+_wakeup: tuple[int, int] | None = None
+
+
+def subscribe(channel: str, handler: Handler) -> None:
+    _handlers[channel].append(handler)
+
+
+# Слушатель запущен: локальное состояние, сбрасываемое уведомлениями, можно кэшировать
+def listening() -> bool:
+    return _listener is not None
+
+
+def _dispatch(channel: str, payload: str | None) -> None:
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception:
+            logger.exception("Notification handler for %s failed", channel)
+
+
+def publish(channel: str, payload: str) -> None:
+    # Межпроцессная рассылка через PostgreSQL NOTIFY; в своём процессе
+    # вызывающий код сбрасывает состояние сам, до отправки уведомления
+    from app.core.db import get_engine
+
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+            connection.commit()
+    except Exception:
+        logger.exception("Failed to publish notification to %s", channel)
+
+
+def _listen(dsn: str, wakeup: int) -> None:
+    import psycopg2
+    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+    while not _stop.is_set():
+        connection = None
+        try:
+            connection = psycopg2.connect(dsn)
+            connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                for channel in _handlers:
+                    cursor.execute(f'LISTEN "{channel}"')
+            # Пока слушателя не было, уведомления терялись
+            for channel in list(_handlers):
+                _dispatch(channel, None)
+
+            while not _stop.is_set():
+                if connection in select.select([connection, wakeup], [], [], 5)[0]:
+                    connection.poll()
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        _dispatch(notification.channel, notification.payload)
+        except Exception:
+            logger.exception("Notification listener failed, reconnecting")
+            _stop.wait(5)
+        finally:
+            if connection is not None:
+                connection.close()
+
+
+def start_listener() -> None:
+    global _listener, _wakeup
+    from app.core.db import get_engine
+
+    engine = get_engine()
+    if engine.dialect.name != "postgresql" or not _handlers or _listener is not None:
+        return
+    # Отдельное соединение вне пула: LISTEN держит его всё время работы процесса
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    _stop.clear()
+    _wakeup = os.pipe()
+    _listener = threading.Thread(target=_listen, args=(dsn, _wakeup[0]), name="pg-notify-listener", daemon=True)
+    _listener.start()
+
+
+def stop_listener() -> None:
+    global _listener, _wakeup
+    _stop.set()
+    if _listener is not None:
+        os.write(_wakeup[1], b"\0")
+        _listener.join(timeout=10)
+        _listener = None
+        for fd in _wakeup:
+            os.close(fd)
+        _wakeup = None
@@ -0,0 +1,264 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+from typing import Any
+from uuid import UUID
+
+from fastapi.routing import APIRoute
+from jwt import InvalidTokenError
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HEADER = "x-profile"
+QUERY_PARAM = "profile"
+NAME = re.compile(r"^[\w.-]+$")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Пути файлов в кадрах укорачиваются относительно проекта и каталогов библиотек
+_PREFIXES = sorted(
+    {_ROOT, *(sysconfig.get_path(name) for name in ("stdlib", "platstdlib", "purelib", "platlib"))},
+    key=len,
+    reverse=True,
+)
+
+_active: ContextVar["Profile | None"] = ContextVar("profile", default=None)
+
+
+def source_path(filename: str) -> str:
+    for prefix in _PREFIXES:
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def _label(frame: FrameType) -> str:
+    # ";" разделяет кадры в формате collapsed stacks
+    return f"{frame.f_code.co_name} ({source_path(frame.f_code.co_filename)}:{frame.f_lineno})".replace(";", ":")
+
+
+def _collapse(thread: str, frame: FrameType) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    labels.append(thread)
+    return ";".join(reversed(labels))
+
+
+# Профиль одного запроса: отдельный поток раз в PROFILE_INTERVAL_MS снимает стеки
+# потока цикла событий (пока выполняется задача этого запроса) и потоков пула,
+# в которых сейчас работают его синхронные обработчики и зависимости
+class Profile:
+    def __init__(self, method: str, path: str) -> None:
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        slug = re.sub(r"\W+", "_", path).strip("_")[:60] or "root"
+        self.name = f"{self.started_at:%Y%m%dT%H%M%S%f}-{method}-{slug}"
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.loop_thread = threading.get_ident()
+        self.threads: set[int] = set()
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self.status = 0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        frame = frames.get(self.loop_thread)
+        if frame is not None and asyncio.current_task(self.loop) is self.task:
+            self.stacks[_collapse("event-loop", frame)] += 1
+        for ident in list(self.threads):
+            frame = frames.get(ident)
+            if frame is not None:
+                self.stacks[_collapse("worker", frame)] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        interval = settings.PROFILE_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+        self.duration = time.perf_counter() - self._started
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration * 1000,
+            "samples": self.samples,
+            "interval_ms": settings.PROFILE_INTERVAL_MS,
+        }
+
+    # Формат collapsed stacks открывают speedscope и flamegraph.pl; описание
+    # запроса лежит рядом в .json
+    def save(self) -> None:
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        lines = "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        (directory / f"{self.name}.collapsed").write_text(lines, encoding="utf-8")
+        (directory / f"{self.name}.json").write_text(json.dumps(self.info()), encoding="utf-8")
+        for stale in sorted(directory.glob("*.json"), reverse=True)[settings.PROFILE_KEEP:]:
+            stale.with_suffix(".collapsed").unlink(missing_ok=True)
+            stale.unlink(missing_ok=True)
+
+
+def recent(limit: int) -> list[dict[str, Any]]:
+    directory = Path(settings.PROFILE_DIR)
+    if not directory.is_dir():
+        return []
+    return [
+        json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted(directory.glob("*.json"), reverse=True)[:limit]
+    ]
+
+
+def profile_path(name: str) -> Path | None:
+    if not NAME.match(name):
+        return None
+    path = Path(settings.PROFILE_DIR) / f"{name}.collapsed"
+    return path if path.is_file() else None
+
+
+# Синхронные обработчики и зависимости FastAPI выполняются в пуле потоков;
+# обёртка сообщает профилю, какой поток сейчас работает на его запрос.
+# Без активного профиля это одно чтение ContextVar
+def _traced(call: Any) -> Any:
+    @functools.wraps(call)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        profile = _active.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        ident = threading.get_ident()
+        profile.threads.add(ident)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile.threads.discard(ident)
+    wrapper.profiled = True
+    return wrapper
+
+
+def _is_plain_sync(call: Any) -> bool:
+    return (
+        inspect.isfunction(call)
+        and not inspect.iscoroutinefunction(call)
+        and not inspect.isgeneratorfunction(call)
+        and not inspect.isasyncgenfunction(call)
+    )
+
+
+def instrument_routes(routes: list[BaseRoute]) -> None:
+    seen: set[int] = set()
+
+    def visit(dependant: Any) -> None:
+        if id(dependant) in seen:
+            return
+        seen.add(id(dependant))
+        if _is_plain_sync(dependant.call) and not getattr(dependant.call, "profiled", False):
+            dependant.call = _traced(dependant.call)
+        for sub_dependant in dependant.dependencies:
+            visit(sub_dependant)
+
+    for route in routes:
+        if isinstance(route, APIRoute):
+            visit(route.dependant)
+
+
+def is_superuser(authorization: str | None) -> bool:
+    from app.core import auth_cache, security
+    from app.core.db import get_engine
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user_id = UUID(security.decode_token(token)["sub"])
+    except (InvalidTokenError, KeyError, ValueError):
+        return False
+    with Session(get_engine()) as session:
+        user = auth_cache.get_user(session, user_id)
+        return bool(user and user.is_superuser)
+
+
+OFF_VALUES = ("", "0", "false")
+
+
+# Флаг запроса в заголовке или параметре строки запроса; значения "", "0" и
+# "false" выключают его и там, и там. Без флага проверка сводится к поиску
+# подстроки и перебору заголовков
+def flag_requested(scope: Scope, header: str, param: str) -> bool:
+    if param.encode() in scope["query_string"]:
+        if QueryParams(scope["query_string"]).get(param, "").lower() not in OFF_VALUES:
+            return True
+    name = header.encode()
+    return any(key == name and value.strip().decode("latin-1").lower() not in OFF_VALUES
+               for key, value in scope["headers"])
+
+
+# Профилирование включается заголовком X-Profile или параметром ?profile=1 и
+# только для администратора; остальные запросы проходят без дополнительной работы
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not flag_requested(scope, HEADER, QUERY_PARAM):
+            await self.app(scope, receive, send)
+            return
+        if not await run_in_threadpool(is_superuser, Headers(scope=scope).get("authorization")):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"])
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Name", profile.name)
+            await send(message)
+
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profile.stop()
+            _active.reset(token)
+            try:
+                await run_in_threadpool(profile.save)
+            except OSError:
+                logger.exception("Failed to save profile %s", profile.name)
@@ -4,52 +4,101 @@ from uuid import UUID
 
 import jwt
 from fastapi import HTTPException
-from jose import JWTError
 from passlib.context import CryptContext
-from sqlmodel import Session
 
 from app.core.config import settings
-from app.models import User
+from app.core.hashing import HashPool
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max совпадают с default: хеш с другой стоимостью считается устаревшим
+# и пересчитывается при следующем успешном входе
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+hash_pool = HashPool(workers=settings.PASSWORD_HASH_WORKERS, max_queue=settings.PASSWORD_HASH_QUEUE)
 
 ALGORITHM = "HS256"
 
+# Все процессы API должны подписывать токены одними и теми же ключами,
+# иначе токен одного воркера отвергается другим. Для ротации новый ключ
+# добавляется в SIGNING_KEYS и назначается SIGNING_KEY_ID, а старый остаётся
+# в списке, пока не истекут подписанные им токены
+SIGNING_KEYS = {settings.SIGNING_KEY_ID: settings.SECRET_KEY, **settings.SIGNING_KEYS}
+
+
+def encode_token(claims: dict[str, Any]) -> str:
+    key_id = settings.SIGNING_KEY_ID
+    return jwt.encode(claims, SIGNING_KEYS[key_id], algorithm=ALGORITHM, headers={"kid": key_id})
+
+
+def decode_token(token: str) -> dict[str, Any]:
+    # Токены без kid выпущены до появления ротации и подписаны текущим ключом
+    key_id = jwt.get_unverified_header(token).get("kid", settings.SIGNING_KEY_ID)
+    key = SIGNING_KEYS.get(key_id)
+    if key is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key {key_id!r}")
+    return jwt.decode(token, key, algorithms=[ALGORITHM])
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return encode_token(to_encode)
 
 
-def create_refresh_token(subject: Any, expires_delta: timedelta) -> str:
-    expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"sub": str(subject), "exp": expire, "type": "refresh"}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+def create_refresh_token(subject: Any, expires_at: datetime, token_id: UUID, family_id: UUID) -> str:
+    to_encode = {
+        "sub": str(subject),
+        "exp": expires_at,
+        "type": "refresh",
+        "jti": str(token_id),
+        "fam": str(family_id),
+    }
+    return encode_token(to_encode)
 
 
-def verify_refresh_token(token: str, session: Session) -> User:
+def decode_refresh_token(token: str) -> tuple[UUID, UUID, UUID]:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") != "refresh":
-            raise HTTPException(status_code=401, detail="Invalid token type")
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid refresh token")
-    except JWTError:
+        payload = decode_token(token)
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if payload.get("type") != "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    try:
+        return UUID(payload["sub"]), UUID(payload["jti"]), UUID(payload["fam"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
 
-    user = session.get(User, UUID(user_id))
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+# Функции _hash/_verify_and_update выполняются в процессах пула
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return hash_pool.run_sync(_verify_and_update, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await hash_pool.run(_verify_and_update, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return hash_pool.run_sync(_hash, password)
+
+
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    return hash_pool.map_sync(_hash, passwords)
+
@@ -0,0 +1,186 @@
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy import Row, Select, select
+
+from app.models import Camera, Club, Drone, FlightTask, Lens, Order, Route, User
+from app.schemas import (
+    CameraResponse, ClubResponse, DroneResponse, LensResponse, OrderResponse, RouteResponse, UserPublic,
+)
+
+
+# Кодировщик строки в словарь с полями схемы ответа в том же порядке. Список
+# полей и attrgetter собираются один раз при импорте, а не на каждую строку.
+# Строки приходят из нашей базы, поэтому повторная валидация pydantic не нужна:
+# UUID, даты, время и перечисления orjson кодирует сам
+class RowEncoder:
+    def __init__(self, schema: type[BaseModel], exclude: tuple[str, ...] = ()) -> None:
+        self.fields = tuple(name for name in schema.model_fields if name not in exclude)
+        self._get = attrgetter(*self.fields)
+
+    def __call__(self, row: Any) -> dict[str, Any]:
+        values = self._get(row)
+        if len(self.fields) == 1:
+            values = (values,)
+        return dict(zip(self.fields, values))
+
+
+encode_order = RowEncoder(OrderResponse, exclude=("club_name", "club_address"))
+encode_user = RowEncoder(UserPublic)
+encode_drone = RowEncoder(DroneResponse)
+encode_camera = RowEncoder(CameraResponse)
+encode_lens = RowEncoder(LensResponse)
+
+
+def route_points(points: str) -> list[dict[str, Any]]:
+    # Точки маршрута хранятся уже сериализованными из RoutePoint
+    return orjson.loads(points)
+
+
+# Строка выборки заданий (FlightTask, Order, User, Route, Drone, Camera, Lens, Club)
+# в форме FlightTaskResponse
+def flight_task(task: Any, order: Any, operator: Any, route: Any, drone: Any, camera: Any, lens: Any,
+                club: Any) -> dict[str, Any]:
+    order_data = encode_order(order)
+    order_data["club_name"] = club.name
+    order_data["club_address"] = club.address
+    return {
+        "id": task.id,
+        "order": order_data,
+        "operator": encode_user(operator),
+        "route": {"club_id": route.club_id, "points": route_points(route.points), "id": route.id},
+        "drone": encode_drone(drone),
+        "camera": encode_camera(camera),
+        "lens": encode_lens(lens) if lens is not None else None,
+    }
+
+
+# Поля схемы ответа и колонки, из которых они читаются, в порядке схемы.
+# По умолчанию поле читается из одноимённой колонки модели
+def schema_columns(schema: type[BaseModel], model: Any, exclude: tuple[str, ...] = (), **columns: Any) -> dict[str, Any]:
+    return {
+        name: columns[name] if name in columns else getattr(model, name)
+        for name in schema.model_fields if name not in exclude
+    }
+
+
+# Часть ответа: поля верхнего уровня (key=None) или вложенный объект. Вложенный
+# объект из outer join (optional) становится None, если его id пуст
+class Part:
+    def __init__(self, key: str | None, fields: dict[str, Any], optional: bool = False,
+                 convert: dict[str, Callable[[Any], Any]] | None = None) -> None:
+        self.key = key
+        self.fields = fields
+        self.optional = optional
+        self.convert = convert or {}
+
+
+# Доверенный путь чтения: выборка только нужных колонок и сборка словарей
+# ответа прямо из кортежей результата, без сущностей ORM и без валидации
+# pydantic - данные пришли из нашей же базы. Валидация остаётся на входе API
+class Projection:
+    def __init__(self, *parts: Part) -> None:
+        self.parts = parts
+        self.columns = []
+        self._layout = []
+        for part in parts:
+            names = tuple(part.fields)
+            start = len(self.columns)
+            self.columns += [
+                column.label(f"{part.key}__{name}" if part.key else name) for name, column in part.fields.items()
+            ]
+            # По id вложенного объекта из outer join видно, нашлась ли строка.
+            # Если id не запрошен, он выбирается отдельной колонкой и в ответ не попадает
+            present = None
+            if part.optional:
+                if "id" in names:
+                    present = start + names.index("id")
+                else:
+                    present = len(self.columns)
+                    self.columns.append(self._model(part).id.label(f"{part.key}__present"))
+            self._layout.append((part.key, names, start, start + len(names), present, tuple(part.convert.items())))
+        self.models = {column.class_ for part in parts for column in part.fields.values()}
+
+    # Выборка строк, а не скаляров, даже из одной колонки, как сделал бы select из sqlmodel
+    def select(self) -> Select:
+        return select(*self.columns)
+
+    @staticmethod
+    def _model(part: Part) -> Any:
+        return next(iter(part.fields.values())).class_
+
+    def build(self, row: Row | tuple) -> dict[str, Any]:
+        values = tuple(row)
+        result: dict[str, Any] = {}
+        for key, names, start, stop, present, converters in self._layout:
+            if present is not None and values[present] is None:
+                item = None
+            else:
+                item = dict(zip(names, values[start:stop]))
+                for name, convert in converters:
+                    item[name] = convert(item[name])
+            if key is None:
+                result.update(item)
+            else:
+                result[key] = item
+        return result
+
+    def build_all(self, rows: Iterable[Row | tuple]) -> list[dict[str, Any]]:
+        return [self.build(row) for row in rows]
+
+    # Разреженный набор полей ответа: "id,order.status,drone" - поле верхнего
+    # уровня, поле вложенного объекта или объект целиком. Колонки, а с ними и
+    # соединения с таблицами, не попавшими в набор, в выборку не входят.
+    # Набор приходит из запроса, поэтому число закэшированных проекций ограничено
+    @lru_cache(maxsize=256)
+    def subset(self, fields: str) -> "Projection":
+        parts = {part.key: part for part in self.parts}
+        selected: dict[str | None, set[str] | None] = {}
+        for field in filter(None, (field.strip() for field in fields.split(","))):
+            key, _, name = field.rpartition(".")
+            if not key and name in parts:
+                selected[name] = None
+                continue
+            part = parts.get(key or None)
+            if part is None or name not in part.fields:
+                raise ValueError(f"Unknown field: {field}")
+            if selected.get(part.key, set()) is not None:
+                selected.setdefault(part.key, set()).add(name)
+        if not selected:
+            raise ValueError("No fields selected")
+        return Projection(*[
+            part if selected[part.key] is None else Part(
+                part.key,
+                {name: column for name, column in part.fields.items() if name in selected[part.key]},
+                optional=part.optional,
+                convert={name: convert for name, convert in part.convert.items() if name in selected[part.key]},
+            )
+            for part in self.parts if part.key in selected
+        ])
+
+
+_ORDER_FIELDS = schema_columns(OrderResponse, Order, club_name=Club.name, club_address=Club.address)
+
+ORDER = Projection(Part(None, _ORDER_FIELDS))
+ORDER_WITH_OPERATOR = Projection(
+    Part(None, _ORDER_FIELDS),
+    Part("operator", schema_columns(UserPublic, User), optional=True),
+)
+FLIGHT_TASK = Projection(
+    Part(None, {"id": FlightTask.id}),
+    Part("order", _ORDER_FIELDS),
+    Part("operator", schema_columns(UserPublic, User)),
+    Part("route", schema_columns(RouteResponse, Route), convert={"points": route_points}),
+    Part("drone", schema_columns(DroneResponse, Drone)),
+    Part("camera", schema_columns(CameraResponse, Camera)),
+    Part("lens", schema_columns(LensResponse, Lens), optional=True),
+)
+USER = Projection(Part(None, schema_columns(UserPublic, User)))
+CLUB = Projection(Part(None, schema_columns(ClubResponse, Club)))
+DRONE = Projection(Part(None, schema_columns(DroneResponse, Drone)))
+CAMERA = Projection(Part(None, schema_columns(CameraResponse, Camera)))
+LENS = Projection(Part(None, schema_columns(LensResponse, Lens)))
@@ -0,0 +1,196 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_KEPT = 3
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Раскрытые списки IN (...) сводятся к одному параметру, чтобы один и тот же
+# запрос с разным числом значений считался одним шаблоном
+_PARAM = r"(?:%\(\w+\)s|\?)(?:::\w+)?"
+_PARAM_LIST = re.compile(rf"{_PARAM}(?:\s*,\s*{_PARAM})+")
+_WHITESPACE = re.compile(r"\s+")
+# Выборка одной строки по первичному ключу - так выглядит session.get и ленивая загрузка связи
+_PK_LOOKUP = re.compile(rf"^SELECT .+ FROM (\"?\w+\"?) WHERE \1\.id = {_PARAM}$", re.DOTALL)
+
+
+def statement_template(statement: str) -> str:
+    return _PARAM_LIST.sub("?", _WHITESPACE.sub(" ", statement.strip()))
+
+
+class RequestStats:
+    def __init__(self, path: str = "") -> None:
+        self.path = path
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.templates: Counter[str] = Counter()
+        self.slowest: list[tuple[float, str]] = []
+
+    def record(self, template: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        self.templates[template] += 1
+        if len(self.slowest) < SLOWEST_KEPT or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, template))
+            self.slowest.sort(reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+
+    # Признаки N+1: один шаблон повторяется много раз или запрос дочитывает
+    # связанные объекты поштучно по первичному ключу
+    def n_plus_one(self) -> list[str]:
+        threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+        if threshold <= 0:
+            return []
+        findings = [
+            f"{count}x {template}" for template, count in self.templates.items() if count >= threshold
+        ]
+        pk_tables = [
+            match.group(1).strip('"')
+            for template, count in self.templates.items()
+            for match in [_PK_LOOKUP.match(template)] if match
+            for _ in range(count)
+        ]
+        if len(pk_tables) >= threshold:
+            findings.append(f"{len(pk_tables)} primary key lookups: {', '.join(pk_tables)}")
+        return findings
+
+
+class RouteStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.max_db_seconds = 0.0
+        self.max_queries = 0
+        self.n_plus_one = 0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = ""
+
+    def add(self, stats: RequestStats, n_plus_one: bool) -> None:
+        self.requests += 1
+        self.queries += stats.queries
+        self.db_seconds += stats.db_seconds
+        self.max_db_seconds = max(self.max_db_seconds, stats.db_seconds)
+        self.max_queries = max(self.max_queries, stats.queries)
+        self.n_plus_one += n_plus_one
+        if stats.slowest and stats.slowest[0][0] > self.slowest_seconds:
+            self.slowest_seconds, self.slowest_statement = stats.slowest[0]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "queries_per_request": self.queries / self.requests if self.requests else 0,
+            "db_seconds": self.db_seconds,
+            "max_db_seconds": self.max_db_seconds,
+            "max_queries": self.max_queries,
+            "n_plus_one": self.n_plus_one,
+            "slowest_seconds": self.slowest_seconds,
+            "slowest_statement": self.slowest_statement,
+        }
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("sql_request_stats", default=None)
+_routes: dict[str, RouteStats] = {}
+_routes_lock = threading.Lock()
+
+
+def current() -> RequestStats | None:
+    return _current.get()
+
+
+def route_stats() -> dict[str, dict[str, Any]]:
+    with _routes_lock:
+        return {route: stats.as_dict() for route, stats in _routes.items()}
+
+
+def reset() -> None:
+    with _routes_lock:
+        _routes.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("sql_stats_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["sql_stats_started"].pop()
+    stats = _current.get()
+    template = None
+    if stats is not None:
+        template = statement_template(statement)
+        stats.record(template, elapsed)
+    if settings.SQL_SLOW_QUERY_MS and elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query %.1f ms%s: %s",
+            elapsed * 1000,
+            f" in {stats.path}" if stats is not None else "",
+            template or statement_template(statement),
+        )
+
+
+def _handle_error(exception_context) -> None:
+    started = exception_context.connection.info.get("sql_stats_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _finish(scope: Scope, stats: RequestStats) -> None:
+    route = scope.get("route")
+    path = getattr(route, "path", UNMATCHED_ROUTE)
+    name = f"{scope['method']} {path}"
+    findings = stats.n_plus_one()
+    for finding in findings:
+        logger.warning("Possible N+1 in %s: %s", name, finding)
+    with _routes_lock:
+        _routes.setdefault(name, RouteStats()).add(stats, bool(findings))
+
+
+# Чистый ASGI-middleware: не буферизует тело ответа и не мешает потоковой выдаче
+class SQLStatsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(f"{scope['method']} {scope['path']}")
+        token = _current.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.SQL_SERVER_TIMING:
+                headers = MutableHeaders(scope=message)
+                slowest = stats.slowest[0][0] if stats.slowest else 0.0
+                headers.append("Server-Timing", ", ".join([
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+                    f"db-max;dur={slowest * 1000:.1f}",
+                    f"app;dur={(time.perf_counter() - stats.started) * 1000:.1f}",
+                ]))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _finish(scope, stats)
@@ -0,0 +1,160 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.core import notify, security
+from app.core.ids import new_id
+from app.core.config import settings
+from app.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "refresh_family_revoked"
+
+# Отозванные цепочки refresh-токенов. Проверка отзыва на горячем пути -
+# один поиск в этом множестве; таблица refresh_token - источник истины
+_revoked_families: set[UUID] = set()
+_sweeper: BackgroundScheduler | None = None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def issue(session: Session, user_id: UUID, family_id: UUID | None = None) -> str:
+    token_id = new_id()
+    family_id = family_id or new_id()
+    expires_at = _utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    session.add(RefreshToken(id=token_id, family_id=family_id, user_id=user_id, expires_at=expires_at))
+    return security.create_refresh_token(
+        user_id, expires_at.replace(tzinfo=timezone.utc), token_id=token_id, family_id=family_id
+    )
+
+
+def rotate(session: Session, token: str) -> tuple[UUID, str]:
+    _, token_id, family_id = security.decode_refresh_token(token)
+    if family_id in _revoked_families:
+        raise HTTPException(status_code=401, detail="Refresh token revoked")
+
+    # Погашение токена и проверка, что он ещё не использован, - один UPDATE
+    redeemed = session.exec(
+        update(RefreshToken)
+        .where(
+            RefreshToken.id == token_id,
+            RefreshToken.used_at == None,
+            RefreshToken.revoked == False,
+        )
+        .values(used_at=_utcnow())
+        .returning(RefreshToken.user_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if redeemed is None:
+        # Повторное предъявление уже использованного токена: цепочка скомпрометирована
+        revoke_family(session, family_id)
+        raise HTTPException(status_code=401, detail="Refresh token reuse detected")
+
+    new_token = issue(session, redeemed.user_id, family_id)
+    session.commit()
+    return redeemed.user_id, new_token
+
+
+def _remember_revoked(family_ids: set[UUID]) -> None:
+    _revoked_families.update(family_ids)
+    for family_id in family_ids:
+        notify.publish(CHANNEL, str(family_id))
+
+
+def revoke_family(session: Session, family_id: UUID) -> None:
+    session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id)
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    _remember_revoked({family_id})
+
+
+def revoke_token(session: Session, token: str) -> None:
+    _, _, family_id = security.decode_refresh_token(token)
+    revoke_family(session, family_id)
+
+
+def revoke_user_tokens(session: Session, user_id: UUID) -> None:
+    family_ids = set(session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked == False)
+        .values(revoked=True)
+        .returning(RefreshToken.family_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all())
+    session.commit()
+    _remember_revoked(family_ids)
+
+
+def load_revoked(session: Session) -> None:
+    family_ids = session.exec(
+        select(RefreshToken.family_id)
+        .where(RefreshToken.revoked == True, RefreshToken.expires_at > _utcnow())
+        .distinct()
+    ).all()
+    _revoked_families.clear()
+    _revoked_families.update(family_ids)
+
+
+def sweep_expired(session: Session) -> int:
+    # Истёкшие токены удаляются одним запросом; их цепочки больше не нужны и в памяти
+    result = session.exec(delete(RefreshToken).where(RefreshToken.expires_at <= _utcnow()))
+    session.commit()
+    load_revoked(session)
+    return result.rowcount
+
+
+def _sweep() -> None:
+    from app.core.db import get_engine
+
+    try:
+        with Session(get_engine()) as session:
+            removed = sweep_expired(session)
+        if removed:
+            logger.info("Removed %s expired refresh tokens", removed)
+    except Exception:
+        logger.exception("Refresh token sweep failed")
+
+
+def _reload() -> None:
+    from app.core.db import get_engine
+
+    with Session(get_engine()) as session:
+        load_revoked(session)
+
+
+def start_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None or settings.REFRESH_TOKEN_SWEEP_MINUTES <= 0:
+        return
+    _sweeper = BackgroundScheduler(daemon=True)
+    _sweeper.add_job(_sweep, "interval", minutes=settings.REFRESH_TOKEN_SWEEP_MINUTES)
+    _sweeper.start()
+
+
+def stop_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.shutdown(wait=False)
+        _sweeper = None
+
+
+def _on_notification(payload: str | None) -> None:
+    if payload is None:
+        _reload()
+    else:
+        _revoked_families.add(UUID(payload))
+
+
+notify.subscribe(CHANNEL, _on_notification)
@@ -1,18 +1,28 @@
 import json
-from typing import Any, List, Tuple
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import date
+from itertools import islice
+from typing import Any, List, Optional, Tuple
 
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 
-from sqlalchemy import text
+from sqlalchemy import insert, text, update
 from sqlmodel import Session, select
 from uuid import UUID
 
-from app.core.security import get_password_hash, verify_password
-from app.models import User, Order, Club, Drone, Camera, Lens, FlightTask, Route
-from app.schemas import UserCreate, UserUpdate, OrderStatus, OrderWithOperator, UserPublic, OrderResponse, RoutePoint, \
+from app.core import auth_cache, catalog, serialization
+from app.core.ids import new_id
+from app.core.imports import Record
+from app.core.security import get_password_hash, get_password_hashes, verify_and_update_password, \
+    verify_and_update_password_async
+from app.models import User, Order, Club, Drone, Camera, Lens, FlightTask, Route, moscow_now
+from app.schemas import UserCreate, UserUpdate, OrderStatus, OrderResponse, RoutePoint, \
     ClubBase, DroneBase, FlightTaskCreate, DroneUpdate, DroneResponse, CameraBase, CameraResponse, CameraUpdate, \
     LensBase, LensResponse, LensUpdate, ClubResponse, ClubUpdate, OrderUpdate, CameraAdmin, ClubAdmin, DroneAdmin, \
-    LensAdmin
+    LensAdmin, OrderCreate, OrderImportReport, ImportRowError, BatchItemError, BatchResult, DroneBatchUpdate, \
+    CameraBatchUpdate, LensBatchUpdate
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -25,6 +35,42 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     return db_obj
 
 
+def create_users_bulk(*, session: Session, users_create: List[UserCreate]) -> BatchResult:
+    emails = [user_create.email for user_create in users_create]
+    taken = set(session.exec(select(User.email).where(User.email.in_(emails))).all())
+
+    errors = []
+    accepted = []
+    seen = set()
+    for index, user_create in enumerate(users_create):
+        if user_create.email in taken:
+            errors.append(BatchItemError(index=index, detail="The user with this email already exists in the system"))
+        elif user_create.email in seen:
+            errors.append(BatchItemError(index=index, detail="Duplicate email in batch"))
+        else:
+            accepted.append(user_create)
+        seen.add(user_create.email)
+
+    hashed_passwords = get_password_hashes([user_create.password for user_create in accepted])
+    values = [
+        {
+            "id": new_id(),
+            "email": user_create.email,
+            "hashed_password": hashed_password,
+            "is_superuser": user_create.is_superuser,
+            "username": user_create.username,
+            "is_available": True,
+            "created_at": moscow_now(),
+            "updated_at": None,
+        }
+        for user_create, hashed_password in zip(accepted, hashed_passwords)
+    ]
+    if values:
+        session.execute(insert(User.__table__), values)
+        session.commit()
+    return BatchResult(processed=[value["id"] for value in values], errors=errors)
+
+
 def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     user_data = user_in.model_dump(exclude_unset=True)
     extra_data = {}
@@ -35,6 +81,7 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
+    auth_cache.invalidate_user(db_user.id)
     session.refresh(db_user)
     return db_user
 
@@ -45,89 +92,196 @@ def get_user_by_email(*, session: Session, email: str) -> User | None:
     return session_user
 
 
+def _rehash_user_password(session: Session, db_user: User, hashed_password: str) -> None:
+    db_user.hashed_password = hashed_password
+    session.add(db_user)
+    session.commit()
+    auth_cache.invalidate_user(db_user.id)
+    session.refresh(db_user)
+
+
 def authenticate(*, session: Session, email: str, password: str) -> User | None:
     db_user = get_user_by_email(session=session, email=email)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    is_valid, new_hash = verify_and_update_password(password, db_user.hashed_password)
+    if not is_valid:
         return None
+    if new_hash:
+        _rehash_user_password(session, db_user, new_hash)
     return db_user
 
 
+async def authenticate_async(*, session: Session, email: str, password: str) -> User | None:
+    # Запросы к БД идут в пуле потоков, bcrypt - в пуле процессов;
+    # при переполненной очереди хеширования поднимается HashPoolSaturated
+    db_user = await run_in_threadpool(get_user_by_email, session=session, email=email)
+    if not db_user:
+        return None
+    is_valid, new_hash = await verify_and_update_password_async(password, db_user.hashed_password)
+    if not is_valid:
+        return None
+    if new_hash:
+        await run_in_threadpool(_rehash_user_password, session, db_user, new_hash)
+    return db_user
+
+
+# Соединяются только таблицы, колонки которых есть в проекции
+def _orders_statement(projection: serialization.Projection):
+    statement = projection.select().select_from(Order)
+    if User in projection.models:
+        statement = statement.outerjoin(User, Order.operator_id == User.id)
+    if Club in projection.models:
+        statement = statement.join(Club, Order.club_id == Club.id)
+    return statement
+
+
 def get_new_orders(
-        session: Session, skip: int = 0, limit: int = 100
-) -> List[OrderResponse]:
+        session: Session, skip: int = 0, limit: int = 100,
+        projection: serialization.Projection = serialization.ORDER
+) -> List[dict[str, Any]]:
     session.execute(text("SELECT update_all_orders_status()"))
     session.commit()
 
     statement = (
-        select(Order, Club.name, Club.address)
-        .join(Club, Order.club_id == Club.id)
+        _orders_statement(projection)
         .where(Order.status == OrderStatus.new, Order.operator_id == None)
         .offset(skip)
         .limit(limit)
     )
-    results = session.exec(statement).all()
-
-    return [
-        OrderResponse(
-            **order.dict(),
-            club_name=club_name,
-            club_address=club_address
-        )
-        for order, club_name, club_address in results
-    ]
+    return projection.build_all(session.exec(statement))
 
 
 def get_assigned_orders(
-        session: Session, operator_id: UUID, skip: int = 0, limit: int = 100
-) -> List[OrderResponse]:
+        session: Session, operator_id: UUID, skip: int = 0, limit: int = 100,
+        projection: serialization.Projection = serialization.ORDER
+) -> List[dict[str, Any]]:
     session.execute(text("SELECT update_all_orders_status()"))
     session.commit()
 
     statement = (
-        select(Order, Club.name, Club.address)
-        .join(Club, Order.club_id == Club.id)
+        _orders_statement(projection)
         .where(Order.operator_id == operator_id)
         .offset(skip)
         .limit(limit)
     )
-    results = session.exec(statement).all()
-
-    return [
-        OrderResponse(
-            **order.dict(),
-            club_name=club_name,
-            club_address=club_address
-        )
-        for order, club_name, club_address in results
-    ]
+    return projection.build_all(session.exec(statement))
 
 
 def get_all_orders_with_operators(
-        session: Session, skip: int = 0, limit: int = 100
-) -> List[OrderWithOperator]:
+        session: Session, skip: int = 0, limit: int = 100, after: UUID | None = None,
+        projection: serialization.Projection = serialization.ORDER_WITH_OPERATOR
+) -> List[dict[str, Any]]:
     session.execute(text("SELECT update_all_orders_status()"))
     session.commit()
 
+    # Постраничный вывод по курсору: after - id последнего заказа предыдущей
+    # страницы. Порядок по первичному ключу читается прямо из его индекса,
+    # а с UUIDv7 совпадает с порядком создания
     statement = (
-        select(Order, User, Club.name, Club.address)
-        .outerjoin(User, Order.operator_id == User.id)
-        .join(Club, Order.club_id == Club.id)
+        _orders_statement(projection)
+        .order_by(Order.id)
         .offset(skip)
         .limit(limit)
     )
-    results = session.exec(statement).all()
-
-    return [
-        OrderWithOperator(
-            **order.dict(),
-            club_name=club_name,
-            club_address=club_address,
-            operator=UserPublic.from_orm(user) if user else None
+    if after is not None:
+        statement = statement.where(Order.id > after)
+    return projection.build_all(session.exec(statement))
+
+
+ORDER_EXPORT_COLUMNS = [
+    "id", "first_name", "last_name", "email", "order_date", "start_time", "end_time", "status",
+    "club_id", "club_name", "club_address", "operator_id", "created_at", "updated_at",
+]
+
+
+def iter_orders_for_export(
+        session: Session,
+        club_id: UUID | None = None,
+        status: OrderStatus | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        batch_size: int = 1000
+) -> Iterator[Mapping[str, Any]]:
+    session.execute(text("SELECT update_all_orders_status()"))
+    session.commit()
+
+    statement = (
+        select(
+            Order.id, Order.first_name, Order.last_name, Order.email, Order.order_date,
+            Order.start_time, Order.end_time, Order.status, Order.club_id,
+            Club.name.label("club_name"), Club.address.label("club_address"),
+            Order.operator_id, Order.created_at, Order.updated_at
         )
-        for order, user, club_name, club_address in results
-    ]
+        .join(Club, Order.club_id == Club.id)
+        .order_by(Order.order_date, Order.start_time)
+        # Серверный курсор: строки читаются порциями, а не целиком в память
+        .execution_options(yield_per=batch_size)
+    )
+    if club_id:
+        statement = statement.where(Order.club_id == club_id)
+    if status:
+        statement = statement.where(Order.status == status)
+    if date_from:
+        statement = statement.where(Order.order_date >= date_from)
+    if date_to:
+        statement = statement.where(Order.order_date <= date_to)
+
+    for row in session.exec(statement):
+        yield row._mapping
+
+
+FLIGHT_TASK_EXPORT_COLUMNS = [
+    "id", "order_id", "order_date", "start_time", "end_time", "status", "club_id", "club_name",
+    "operator_id", "operator_email", "drone_id", "drone_model", "camera_id", "camera_model",
+    "lens_id", "lens_model", "route_id", "route_points", "created_at", "updated_at",
+]
+
+
+def iter_flight_tasks_for_export(
+        session: Session,
+        user_id: UUID | None,
+        is_superuser: bool,
+        club_id: UUID | None = None,
+        status: OrderStatus | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        batch_size: int = 1000
+) -> Iterator[Mapping[str, Any]]:
+    statement = (
+        select(
+            FlightTask.id, FlightTask.order_id, Order.order_date, Order.start_time, Order.end_time,
+            Order.status, Order.club_id, Club.name.label("club_name"),
+            FlightTask.operator_id, User.email.label("operator_email"),
+            FlightTask.drone_id, Drone.model.label("drone_model"),
+            FlightTask.camera_id, Camera.model.label("camera_model"),
+            FlightTask.lens_id, Lens.model.label("lens_model"),
+            FlightTask.route_id, Route.points.label("route_points"),
+            FlightTask.created_at, FlightTask.updated_at
+        )
+        .join(Order, FlightTask.order_id == Order.id)
+        .join(User, FlightTask.operator_id == User.id)
+        .join(Route, FlightTask.route_id == Route.id)
+        .join(Drone, FlightTask.drone_id == Drone.id)
+        .join(Camera, FlightTask.camera_id == Camera.id)
+        .outerjoin(Lens, FlightTask.lens_id == Lens.id)
+        .join(Club, Order.club_id == Club.id)
+        .order_by(Order.order_date, Order.start_time)
+        .execution_options(yield_per=batch_size)
+    )
+    if not is_superuser:
+        statement = statement.where(FlightTask.operator_id == user_id)
+    if club_id:
+        statement = statement.where(Order.club_id == club_id)
+    if status:
+        statement = statement.where(Order.status == status)
+    if date_from:
+        statement = statement.where(Order.order_date >= date_from)
+    if date_to:
+        statement = statement.where(Order.order_date <= date_to)
+
+    for row in session.exec(statement):
+        yield row._mapping
 
 
 def get_order_with_club_data(session: Session, order_id: UUID) -> dict | None:
@@ -179,7 +333,7 @@ def admin_update_order(session: Session, order_id: UUID, order_in: OrderUpdate)
 
     # Проверка существования клуба, если club_id предоставлен
     club_id = order_in.club_id if order_in.club_id is not None else order.club_id
-    club = session.get(Club, club_id)
+    club = catalog.source(session).get(Club, club_id)
     if not club or not club.is_available:
         raise HTTPException(status_code=404, detail="Club not found or archived")
 
@@ -233,16 +387,81 @@ def admin_update_order(session: Session, order_id: UUID, order_in: OrderUpdate)
     )
 
 
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def import_orders(session: Session, records: Iterable[Record], batch_size: int = 1000) -> OrderImportReport:
+    # Клубы проверяются одним запросом на каждый новый club_id, дальше ответ берётся из словаря
+    clubs_available: dict[UUID, bool] = {}
+    errors: List[ImportRowError] = []
+    imported = 0
+
+    for batch in _batched(records, batch_size):
+        valid: List[Tuple[int, OrderCreate]] = []
+        for row_number, record, parse_error in batch:
+            if parse_error:
+                errors.append(ImportRowError(row=row_number, detail=parse_error))
+                continue
+            try:
+                valid.append((row_number, OrderCreate.model_validate(record)))
+            except ValidationError as exc:
+                errors.append(ImportRowError(row=row_number, detail=_validation_detail(exc)))
+
+        unknown_club_ids = {order_in.club_id for _, order_in in valid} - clubs_available.keys()
+        if unknown_club_ids:
+            found = session.exec(
+                select(Club.id, Club.is_available).where(Club.id.in_(unknown_club_ids))
+            ).all()
+            clubs_available.update({club_id: False for club_id in unknown_club_ids})
+            clubs_available.update({club_id: is_available for club_id, is_available in found})
+
+        values = []
+        for row_number, order_in in valid:
+            if not clubs_available[order_in.club_id]:
+                errors.append(ImportRowError(row=row_number, detail="Club not found or archived"))
+                continue
+            values.append({
+                **order_in.model_dump(),
+                "id": new_id(),
+                "status": OrderStatus.new,
+                "operator_id": None,
+                "created_at": moscow_now(),
+                "updated_at": None,
+            })
+
+        if values:
+            # Один executemany на пачку: драйвер собирает его в многострочный INSERT
+            session.execute(insert(Order.__table__), values)
+            session.commit()
+            imported += len(values)
+
+    errors.sort(key=lambda error: error.row)
+    return OrderImportReport(imported=imported, errors=errors)
+
+
+# Маршрут записывается в текущую транзакцию без фиксации: фиксирует вызывающий
 def create_route(session: Session, club_id: UUID, points: List[RoutePoint]) -> Route:
     points_json = json.dumps([point.model_dump() for point in points])
     route = Route(club_id=club_id, points=points_json)
     session.add(route)
-    session.commit()
-    session.refresh(route)
+    session.flush()
     return route
 
 
-def create_flight_task(session: Session, flight_task_in: FlightTaskCreate, operator_id: UUID) -> Tuple[FlightTask, Order, User, Route, Drone, Camera, Lens, Club]:
+# Задание со всеми связанными строками; объектива у задания может не быть
+FlightTaskRow = Tuple[FlightTask, Order, User, Route, Drone, Camera, Optional[Lens], Club]
+
+
+def create_flight_task(session: Session, flight_task_in: FlightTaskCreate, operator_id: UUID) -> FlightTaskRow:
     # Проверяем, не существует ли уже flight_task для данного order_id
     existing_task = session.exec(
         select(FlightTask).where(FlightTask.order_id == flight_task_in.order_id)
@@ -254,21 +473,23 @@ def create_flight_task(session: Session, flight_task_in: FlightTaskCreate, opera
     if not order or order.status != OrderStatus.new or order.operator_id is not None:
         raise HTTPException(status_code=400, detail="Order is not available")
 
-    drone = session.get(Drone, flight_task_in.drone_id)
+    # Клуб и оборудование проверяются по справочнику в памяти, без запросов
+    reference = catalog.source(session)
+    drone = reference.get(Drone, flight_task_in.drone_id)
     if not drone or not drone.is_available or drone.club_id != order.club_id:
         raise HTTPException(status_code=400, detail="Drone not found, not available, or does not belong to the club")
 
-    camera = session.get(Camera, flight_task_in.camera_id)
+    camera = reference.get(Camera, flight_task_in.camera_id)
     if not camera or not camera.is_available or camera.club_id != order.club_id:
         raise HTTPException(status_code=400, detail="Camera not found, not available, or does not belong to the club")
 
     lens = None
     if flight_task_in.lens_id:
-        lens = session.get(Lens, flight_task_in.lens_id)
+        lens = reference.get(Lens, flight_task_in.lens_id)
         if not lens or not lens.is_available or lens.club_id != order.club_id:
             raise HTTPException(status_code=400, detail="Lens not found, not available, or does not belong to the club")
 
-    club = session.get(Club, order.club_id)
+    club = reference.get(Club, order.club_id)
     if not club or not club.is_available:
         raise HTTPException(status_code=400, detail="Club not found or not available")
 
@@ -278,7 +499,9 @@ def create_flight_task(session: Session, flight_task_in: FlightTaskCreate, opera
     if points_list[0].latitude != points_list[-1].latitude or points_list[0].longitude != points_list[-1].longitude:
         raise HTTPException(status_code=400, detail="First and last points must be the same")
 
-    route = create_route(session, club_id=order.club_id, points=points_list)
+    # Маршрут, задание и заказ сохраняются одной транзакцией; маршрут
+    # записывается первым, на него ссылается внешний ключ задания
+    route = create_route(session, order.club_id, points_list)
 
     flight_task = FlightTask(
         order_id=flight_task_in.order_id,
@@ -298,98 +521,77 @@ def create_flight_task(session: Session, flight_task_in: FlightTaskCreate, opera
     if not operator:
         raise HTTPException(status_code=404, detail="Operator not found")
 
-    session.commit()
-    session.refresh(flight_task)
+    # Все поля ответа уже в памяти: без истечения объектов после commit
+    # их не приходится перечитывать из базы по одному
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = True
     return flight_task, order, operator, route, drone, camera, lens, club
 
 
+# Соединяются только таблицы, колонки которых есть в проекции, и заказ для
+# фильтра по статусу. Внешние ключи задания обязательны, поэтому пропущенный
+# inner join не меняет набор строк
+def _flight_tasks_statement(projection: serialization.Projection, status_filter: OrderStatus | None = None):
+    statement = projection.select().select_from(FlightTask)
+    if status_filter or projection.models & {Order, Club}:
+        statement = statement.join(Order, FlightTask.order_id == Order.id)
+    for model, foreign_key in [
+        (User, FlightTask.operator_id), (Route, FlightTask.route_id),
+        (Drone, FlightTask.drone_id), (Camera, FlightTask.camera_id),
+    ]:
+        if model in projection.models:
+            statement = statement.join(model, foreign_key == model.id)
+    if Lens in projection.models:
+        statement = statement.outerjoin(Lens, FlightTask.lens_id == Lens.id)
+    if Club in projection.models:
+        statement = statement.join(Club, Order.club_id == Club.id)
+    if status_filter:
+        statement = statement.where(Order.status == status_filter)
+    return statement
+
+
 def get_all_flight_tasks(
         session: Session,
         user_id: UUID | None,
         is_superuser: bool,
-        status_filter: OrderStatus | None = None
-) -> List[dict]:
-    statement = (
-        select(FlightTask, Order, User, Route, Drone, Camera, Lens, Club)
-        .join(Order, FlightTask.order_id == Order.id)
-        .join(User, FlightTask.operator_id == User.id)
-        .join(Route, FlightTask.route_id == Route.id)
-        .join(Drone, FlightTask.drone_id == Drone.id)
-        .join(Camera, FlightTask.camera_id == Camera.id)
-        .join(Lens, FlightTask.lens_id == Lens.id)
-        .join(Club, Order.club_id == Club.id)
-    )
+        status_filter: OrderStatus | None = None,
+        projection: serialization.Projection = serialization.FLIGHT_TASK
+) -> List[dict[str, Any]]:
+    statement = _flight_tasks_statement(projection, status_filter)
     if not is_superuser:
         statement = statement.where(FlightTask.operator_id == user_id)
-    if status_filter:
-        statement = statement.where(Order.status == status_filter)
 
-    results = session.exec(statement).all()
-    return [
-        {
-            "flight_task": task,
-            "order": order,
-            "operator": operator,
-            "route": {
-                "id": route.id,
-                "club_id": route.club_id,
-                "points": [RoutePoint(**point) for point in json.loads(route.points)]
-            },
-            "drone": drone,
-            "camera": camera,
-            "lens": lens,
-            "club": club
-        }
-        for task, order, operator, route, drone, camera, lens, club in results
-    ]
+    return projection.build_all(session.exec(statement))
 
 
 def get_flight_task_by_id(
         session: Session,
         flight_task_id: UUID,
         user_id: UUID,
-        is_superuser: bool
-) -> dict:
-    statement = (
-        select(FlightTask, Order, User, Route, Drone, Camera, Lens, Club)
-        .join(Order, FlightTask.order_id == Order.id)
-        .join(User, FlightTask.operator_id == User.id)
-        .join(Route, FlightTask.route_id == Route.id)
-        .join(Drone, FlightTask.drone_id == Drone.id)
-        .join(Camera, FlightTask.camera_id == Camera.id)
-        .join(Lens, FlightTask.lens_id == Lens.id)
-        .join(Club, Order.club_id == Club.id)
-        .where(FlightTask.id == flight_task_id)
-    )
+        is_superuser: bool,
+        projection: serialization.Projection = serialization.FLIGHT_TASK
+) -> dict[str, Any]:
+    statement = _flight_tasks_statement(projection).where(FlightTask.id == flight_task_id)
     if not is_superuser:
         statement = statement.where(FlightTask.operator_id == user_id)
 
     result = session.exec(statement).first()
     if not result:
         raise HTTPException(status_code=404, detail="Flight task not found or not authorized")
-
-    task, order, operator, route, drone, camera, lens, club = result
-    return {
-        "flight_task": task,
-        "order": order,
-        "operator": operator,
-        "route": {
-            "id": route.id,
-            "club_id": route.club_id,
-            "points": [RoutePoint(**point) for point in json.loads(route.points)]
-        },
-        "drone": drone,
-        "camera": camera,
-        "lens": lens,
-        "club": club
-    }
+    return projection.build(result)
 
 
-def get_all_clubs(session: Session, include_archived: bool = False) -> List[Club]:
-    statement = select(Club)
+def get_all_clubs(session: Session, include_archived: bool = False) -> List[dict[str, Any]]:
+    snapshot = catalog.get(session)
+    if snapshot is not None:
+        return list(snapshot.clubs[include_archived])
+    statement = serialization.CLUB.select()
     if not include_archived:
         statement = statement.where(Club.is_available == True)
-    return session.exec(statement).all()
+    return serialization.CLUB.build_all(session.exec(statement))
 
 
 def get_club_by_id(session: Session, club_id: UUID) -> Club | None:
@@ -406,6 +608,7 @@ def create_club(session: Session, club_in: ClubBase) -> ClubResponse:
     )
     session.add(club)
     session.commit()
+    catalog.invalidate()
     session.refresh(club)
     return ClubResponse(
         id=club.id,
@@ -432,6 +635,7 @@ def update_club(session: Session, club_id: UUID, club_in: ClubUpdate) -> ClubAdm
 
     session.add(club)
     session.commit()
+    catalog.invalidate()
     session.refresh(club)
 
     return ClubAdmin(
@@ -461,6 +665,7 @@ def archive_club(session: Session, club_id: UUID) -> None:
 
     session.add(club)
     session.commit()
+    catalog.invalidate()
 
 
 def activate_club(session: Session, club_id: UUID) -> None:
@@ -474,6 +679,7 @@ def activate_club(session: Session, club_id: UUID) -> None:
 
     session.add(club)
     session.commit()
+    catalog.invalidate()
 
 
 def delete_club(session: Session, club_id: UUID) -> None:
@@ -495,15 +701,29 @@ def delete_club(session: Session, club_id: UUID) -> None:
 
     session.delete(club)
     session.commit()
-
-
-def get_all_drones(session: Session, include_archived: bool = False, club_id: UUID | None = None) -> List[Drone]:
-    statement = select(Drone).join(Club).where(Club.is_available == True)
+    catalog.invalidate()
+
+
+def get_all_drones(
+    session: Session,
+    include_archived: bool = False,
+    club_id: UUID | None = None,
+    skip: int = 0,
+    limit: int | None = None
+) -> List[dict[str, Any]]:
+    snapshot = catalog.get(session)
+    if snapshot is not None:
+        return snapshot.equipment(Drone, club_id, include_archived)[skip:None if limit is None else skip + limit]
+    statement = (
+        serialization.DRONE.select()
+        .join(Club, Drone.club_id == Club.id)
+        .where(Club.is_available == True)
+    )
     if not include_archived:
         statement = statement.where(Drone.is_available == True)
     if club_id:
         statement = statement.where(Drone.club_id == club_id)
-    return session.exec(statement).all()
+    return serialization.DRONE.build_all(session.exec(statement.offset(skip).limit(limit)))
 
 
 def get_drone_by_id(session: Session, drone_id: UUID) -> Drone | None:
@@ -536,6 +756,7 @@ def create_drone(session: Session, drone_in: DroneBase) -> DroneResponse:
     )
     session.add(drone)
     session.commit()
+    catalog.invalidate()
     session.refresh(drone)
     return drone
 
@@ -558,6 +779,7 @@ def update_drone(session: Session, drone_id: UUID, drone_in: DroneUpdate) -> Dro
 
     session.add(drone)
     session.commit()
+    catalog.invalidate()
     session.refresh(drone)
 
     return DroneAdmin(
@@ -583,6 +805,7 @@ def archive_drone(session: Session, drone_id: UUID) -> None:
     drone.is_available = False
     session.add(drone)
     session.commit()
+    catalog.invalidate()
 
 
 def activate_drone(session: Session, drone_id: UUID) -> None:
@@ -595,6 +818,7 @@ def activate_drone(session: Session, drone_id: UUID) -> None:
     drone.is_available = True
     session.add(drone)
     session.commit()
+    catalog.invalidate()
 
 
 def delete_drone(session: Session, drone_id: UUID) -> None:
@@ -608,15 +832,29 @@ def delete_drone(session: Session, drone_id: UUID) -> None:
 
     session.delete(drone)
     session.commit()
-
-
-def get_all_cameras(session: Session, include_archived: bool = False, club_id: UUID | None = None) -> List[Camera]:
-    statement = select(Camera).join(Club).where(Club.is_available == True)
+    catalog.invalidate()
+
+
+def get_all_cameras(
+    session: Session,
+    include_archived: bool = False,
+    club_id: UUID | None = None,
+    skip: int = 0,
+    limit: int | None = None
+) -> List[dict[str, Any]]:
+    snapshot = catalog.get(session)
+    if snapshot is not None:
+        return snapshot.equipment(Camera, club_id, include_archived)[skip:None if limit is None else skip + limit]
+    statement = (
+        serialization.CAMERA.select()
+        .join(Club, Camera.club_id == Club.id)
+        .where(Club.is_available == True)
+    )
     if not include_archived:
         statement = statement.where(Camera.is_available == True)
     if club_id:
         statement = statement.where(Camera.club_id == club_id)
-    return session.exec(statement).all()
+    return serialization.CAMERA.build_all(session.exec(statement.offset(skip).limit(limit)))
 
 
 def get_camera_by_id(session: Session, camera_id: UUID) -> Camera | None:
@@ -651,6 +889,7 @@ def create_camera(session: Session, camera_in: CameraBase) -> CameraResponse:
     )
     session.add(camera)
     session.commit()
+    catalog.invalidate()
     session.refresh(camera)
 
     return CameraResponse(
@@ -685,6 +924,7 @@ def update_camera(session: Session, camera_id: UUID, camera_in: CameraUpdate) ->
 
     session.add(camera)
     session.commit()
+    catalog.invalidate()
     session.refresh(camera)
 
     return CameraAdmin(
@@ -712,6 +952,7 @@ def archive_camera(session: Session, camera_id: UUID) -> None:
     camera.is_available = False
     session.add(camera)
     session.commit()
+    catalog.invalidate()
 
 
 def activate_camera(session: Session, camera_id: UUID) -> None:
@@ -724,6 +965,7 @@ def activate_camera(session: Session, camera_id: UUID) -> None:
     camera.is_available = True
     session.add(camera)
     session.commit()
+    catalog.invalidate()
 
 
 def delete_camera(session: Session, camera_id: UUID) -> None:
@@ -737,15 +979,29 @@ def delete_camera(session: Session, camera_id: UUID) -> None:
 
     session.delete(camera)
     session.commit()
-
-
-def get_all_lenses(session: Session, include_archived: bool = False, club_id: UUID | None = None) -> List[Lens]:
-    statement = select(Lens).join(Club).where(Club.is_available == True)
+    catalog.invalidate()
+
+
+def get_all_lenses(
+    session: Session,
+    include_archived: bool = False,
+    club_id: UUID | None = None,
+    skip: int = 0,
+    limit: int | None = None
+) -> List[dict[str, Any]]:
+    snapshot = catalog.get(session)
+    if snapshot is not None:
+        return snapshot.equipment(Lens, club_id, include_archived)[skip:None if limit is None else skip + limit]
+    statement = (
+        serialization.LENS.select()
+        .join(Club, Lens.club_id == Club.id)
+        .where(Club.is_available == True)
+    )
     if not include_archived:
         statement = statement.where(Lens.is_available == True)
     if club_id:
         statement = statement.where(Lens.club_id == club_id)
-    return session.exec(statement).all()
+    return serialization.LENS.build_all(session.exec(statement.offset(skip).limit(limit)))
 
 
 def get_lens_by_id(session: Session, lens_id: UUID) -> Lens | None:
@@ -780,6 +1036,7 @@ def create_lens(session: Session, lens_in: LensBase) -> LensResponse:
     )
     session.add(lens)
     session.commit()
+    catalog.invalidate()
     session.refresh(lens)
 
     return LensResponse(
@@ -814,6 +1071,7 @@ def update_lens(session: Session, lens_id: UUID, lens_in: LensUpdate) -> LensAdm
 
     session.add(lens)
     session.commit()
+    catalog.invalidate()
     session.refresh(lens)
 
     return LensAdmin(
@@ -841,6 +1099,7 @@ def archive_lens(session: Session, lens_id: UUID) -> None:
     lens.is_available = False
     session.add(lens)
     session.commit()
+    catalog.invalidate()
 
 
 def activate_lens(session: Session, lens_id: UUID) -> None:
@@ -853,6 +1112,7 @@ def activate_lens(session: Session, lens_id: UUID) -> None:
     lens.is_available = True
     session.add(lens)
     session.commit()
+    catalog.invalidate()
 
 
 def delete_lens(session: Session, lens_id: UUID) -> None:
@@ -866,3 +1126,139 @@ def delete_lens(session: Session, lens_id: UUID) -> None:
 
     session.delete(lens)
     session.commit()
+    catalog.invalidate()
+
+
+# Пакетные операции над оборудованием клубов (дроны, камеры, объективы).
+# Каждая операция проверяет все элементы парой запросов и применяет изменения
+# одним многострочным запросом в одной транзакции; ошибки возвращаются по элементам.
+
+EQUIPMENT_TASK_COLUMNS = {
+    Drone: FlightTask.drone_id,
+    Camera: FlightTask.camera_id,
+    Lens: FlightTask.lens_id,
+}
+
+
+def _available_club_ids(session: Session, club_ids: set[UUID]) -> set[UUID]:
+    if not club_ids:
+        return set()
+    statement = select(Club.id).where(Club.id.in_(club_ids), Club.is_available == True)
+    return set(session.exec(statement).all())
+
+
+def _existing_equipment(session: Session, model: type[Drone | Camera | Lens], ids: List[UUID]) -> dict[UUID, bool]:
+    if not ids:
+        return {}
+    statement = select(model.id, model.is_available).where(model.id.in_(ids))
+    return {equipment_id: is_available for equipment_id, is_available in session.exec(statement).all()}
+
+
+def _duplicate_errors(ids: List[UUID], errors: List[BatchItemError]) -> set[int]:
+    seen = set()
+    skipped = set()
+    for index, item_id in enumerate(ids):
+        if item_id in seen:
+            errors.append(BatchItemError(index=index, id=item_id, detail="Duplicate id in batch"))
+            skipped.add(index)
+        seen.add(item_id)
+    return skipped
+
+
+def create_equipment_batch(
+        session: Session, model: type[Drone | Camera | Lens], items: List[DroneBase | CameraBase | LensBase]
+) -> BatchResult:
+    clubs = _available_club_ids(session, {item.club_id for item in items})
+    errors = []
+    values = []
+    for index, item in enumerate(items):
+        if item.club_id not in clubs:
+            errors.append(BatchItemError(index=index, detail="Club not found or archived"))
+            continue
+        values.append({
+            **item.model_dump(),
+            "id": new_id(),
+            "is_available": True,
+            "created_at": moscow_now(),
+            "updated_at": None,
+        })
+
+    if values:
+        session.execute(insert(model.__table__), values)
+        session.commit()
+        catalog.invalidate()
+    return BatchResult(processed=[value["id"] for value in values], errors=errors)
+
+
+def update_equipment_batch(
+        session: Session,
+        model: type[Drone | Camera | Lens],
+        items: List[DroneBatchUpdate | CameraBatchUpdate | LensBatchUpdate]
+) -> BatchResult:
+    ids = [item.id for item in items]
+    errors = []
+    skipped = _duplicate_errors(ids, errors)
+    existing = _existing_equipment(session, model, ids)
+    clubs = _available_club_ids(session, {item.club_id for item in items if item.club_id is not None})
+
+    rows = []
+    for index, item in enumerate(items):
+        if index in skipped:
+            continue
+        if item.id not in existing:
+            errors.append(BatchItemError(index=index, id=item.id, detail=f"{model.__name__} not found"))
+            continue
+        if item.club_id is not None and item.club_id not in clubs:
+            errors.append(BatchItemError(index=index, id=item.id, detail="Club not found or archived"))
+            continue
+        # null в поле означает "не менять", как в одиночных update_*
+        changes = item.model_dump(exclude_unset=True, exclude_none=True, exclude={"id"})
+        if changes:
+            rows.append({"id": item.id, **changes})
+
+    if rows:
+        # ORM bulk UPDATE по первичному ключу: executemany, сгруппированный по набору полей
+        session.execute(update(model), rows)
+        session.commit()
+        catalog.invalidate()
+    errors.sort(key=lambda error: error.index)
+    return BatchResult(processed=[row["id"] for row in rows], errors=errors)
+
+
+def set_equipment_availability_batch(
+        session: Session, model: type[Drone | Camera | Lens], ids: List[UUID], is_available: bool
+) -> BatchResult:
+    name = model.__name__
+    errors = []
+    skipped = _duplicate_errors(ids, errors)
+    existing = _existing_equipment(session, model, ids)
+
+    with_tasks = set()
+    if not is_available and existing:
+        task_column = EQUIPMENT_TASK_COLUMNS[model]
+        with_tasks = set(session.exec(
+            select(task_column).where(task_column.in_(existing.keys())).distinct()
+        ).all())
+
+    processed = []
+    for index, item_id in enumerate(ids):
+        if index in skipped:
+            continue
+        if item_id not in existing:
+            errors.append(BatchItemError(index=index, id=item_id, detail=f"{name} not found"))
+        elif existing[item_id] == is_available:
+            state = "available" if is_available else "archived"
+            errors.append(BatchItemError(index=index, id=item_id, detail=f"{name} is already {state}"))
+        elif item_id in with_tasks:
+            errors.append(BatchItemError(
+                index=index, id=item_id, detail=f"Cannot archive {name.lower()} with flight tasks"
+            ))
+        else:
+            processed.append(item_id)
+
+    if processed:
+        session.execute(update(model).where(model.id.in_(processed)).values(is_available=is_available))
+        session.commit()
+        catalog.invalidate()
+    errors.sort(key=lambda error: error.index)
+    return BatchResult(processed=processed, errors=errors)
@@ -1,14 +1,46 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from sqlmodel import Session
-from app.core.db import engine, init_db
+from app.core import loop_monitor, notify, token_store
+from app.core.config import settings
+from app.core import migrations
+from app.core.db import get_engine
+from app.core import compression, memory, metrics, profiling
+from app.core.sql_stats import SQLStatsMiddleware
+from app.core.security import hash_pool
 from app.api.main import api_router
 
-app = FastAPI()
+# Ответы кодируются orjson: быстрее json из стандартной библиотеки и сразу в байты
+app = FastAPI(default_response_class=ORJSONResponse)
 
+# Сжатие - самый внутренний слой: его время входит в задержку и профиль запроса
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(compression.CompressionMiddleware)
+app.add_middleware(SQLStatsMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+    app.add_middleware(memory.MemoryPeakMiddleware)
 app.include_router(api_router)
+metrics.instrument_routes(app.routes)
+if settings.PROFILING_ENABLED:
+    profiling.instrument_routes(app.routes)
 
 
 @app.on_event("startup")
 def on_startup():
-    with Session(engine) as session:
-        init_db(session)
+    if settings.RUN_DB_INIT_ON_STARTUP:
+        migrations.setup_database()
+    with Session(get_engine()) as session:
+        token_store.load_revoked(session)
+    notify.start_listener()
+    token_store.start_sweeper()
+    loop_monitor.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    loop_monitor.stop()
+    token_store.stop_sweeper()
+    notify.stop_listener()
+    hash_pool.shutdown()
@@ -0,0 +1,11 @@
+from sqlalchemy import Connection
+from sqlmodel import SQLModel
+
+# Импорт моделей регистрирует таблицы в SQLModel.metadata
+from app import models
+
+
+# Базовая схема. checkfirst: в уже существующей базе, созданной раньше через
+# create_all, миграция только фиксирует исходную версию
+def upgrade(connection: Connection) -> None:
+    SQLModel.metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,46 @@
+from sqlalchemy import Connection, text
+from sqlmodel import SQLModel
+
+# Импорт моделей регистрирует таблицы в SQLModel.metadata
+from app import models
+
+# Индексы по внешним ключам и горячим фильтрам (объявлены в app.models).
+# В базе, созданной v0001 уже с ними, миграция ничего не меняет
+INDEXES = {
+    "order": [
+        "ix_order_club_id",
+        "ix_order_operator_id",
+        "ix_order_status_order_date",
+        "ix_order_order_date_start_time",
+        "ix_order_new_unassigned",
+    ],
+    "flight_task": [
+        "ix_flight_task_order_id",
+        "ix_flight_task_operator_id",
+        "ix_flight_task_route_id",
+        "ix_flight_task_drone_id",
+        "ix_flight_task_camera_id",
+        "ix_flight_task_lens_id",
+    ],
+    "route": ["ix_route_club_id"],
+    "drone": ["ix_drone_club_id_is_available"],
+    "camera": ["ix_camera_club_id_is_available"],
+    "lens": ["ix_lens_club_id_is_available"],
+}
+
+
+def upgrade(connection: Connection) -> None:
+    # Уникальный индекс не построится, если на заказ уже заведено несколько заданий
+    duplicates = connection.execute(text(
+        "SELECT order_id FROM flight_task GROUP BY order_id HAVING count(*) > 1 LIMIT 10"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"flight_task has several tasks for orders {[str(order_id) for order_id in duplicates]}; "
+            "remove the duplicates before applying this migration"
+        )
+
+    for table_name, index_names in INDEXES.items():
+        indexes = {index.name: index for index in SQLModel.metadata.tables[table_name].indexes}
+        for name in index_names:
+            indexes[name].create(connection, checkfirst=True)
@@ -0,0 +1,83 @@
+from sqlalchemy import Connection, insert, select, text
+from sqlmodel import SQLModel
+
+# Импорт моделей регистрирует таблицы в SQLModel.metadata
+from app import models
+
+# Канал уведомлений app.core.etags
+CHANNEL = "collection_versions"
+# Коллекции ответов и таблицы, изменения которых их меняют. Списки оборудования
+# зависят от клуба (скрываются вместе с архивным клубом). Счётчиков на заказах,
+# пользователях и заданиях нет: запись в них частая, а строка счётчика
+# блокируется до конца транзакции и выстроила бы все такие записи в очередь.
+# ETag задания считается по содержимому ответа (app.api.deps.FlightTaskETag)
+COLLECTIONS = {
+    "clubs": ["club"],
+    "drones": ["drone", "club"],
+    "cameras": ["camera", "club"],
+    "lenses": ["lens", "club"],
+}
+TABLES: dict[str, list[str]] = {}
+for collection, table_names in COLLECTIONS.items():
+    for table_name in table_names:
+        TABLES.setdefault(table_name, []).append(collection)
+
+# Триггер уровня оператора срабатывает и на UPDATE без затронутых строк (пересчёт
+# статусов заказов при каждом чтении списка), поэтому версия растёт, только если
+# таблица переходов не пуста. pg_notify доставляется после фиксации транзакции
+POSTGRES_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION bump_collection_version() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    collection text;
+BEGIN
+    IF EXISTS (SELECT 1 FROM changed) THEN
+        UPDATE collection_version SET version = version + 1 WHERE name = ANY(TG_ARGV);
+        FOREACH collection IN ARRAY TG_ARGV LOOP
+            PERFORM pg_notify('{CHANNEL}', collection);
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def _postgres_triggers(connection: Connection, table_name: str, collections: list[str]) -> None:
+    arguments = ", ".join(f"'{collection}'" for collection in collections)
+    for event, transition in [("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")]:
+        name = f"{table_name}_{event.lower()}_collection_version"
+        connection.execute(text(f'DROP TRIGGER IF EXISTS {name} ON "{table_name}"'))
+        connection.execute(text(
+            f'CREATE TRIGGER {name} AFTER {event} ON "{table_name}" '
+            f"REFERENCING {transition} TABLE AS changed FOR EACH STATEMENT "
+            f"EXECUTE FUNCTION bump_collection_version({arguments})"
+        ))
+
+
+# В SQLite (локальные бенчмарки) триггеры только построчные, уведомлений нет
+def _sqlite_triggers(connection: Connection, table_name: str, collections: list[str]) -> None:
+    names = ", ".join(f"'{collection}'" for collection in collections)
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        name = f"{table_name}_{event.lower()}_collection_version"
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        connection.execute(text(
+            f'CREATE TRIGGER {name} AFTER {event} ON "{table_name}" BEGIN '
+            f"UPDATE collection_version SET version = version + 1 WHERE name IN ({names}); END"
+        ))
+
+
+def upgrade(connection: Connection) -> None:
+    table = SQLModel.metadata.tables["collection_version"]
+    table.create(connection, checkfirst=True)
+    existing = set(connection.execute(select(table.c.name)).scalars())
+    missing = [{"name": name, "version": 0} for name in COLLECTIONS if name not in existing]
+    if missing:
+        connection.execute(insert(table), missing)
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(POSTGRES_FUNCTION))
+        create_triggers = _postgres_triggers
+    else:
+        create_triggers = _sqlite_triggers
+    for table_name, collections in TABLES.items():
+        create_triggers(connection, table_name, collections)
@@ -0,0 +1,21 @@
+from sqlalchemy import Connection, text
+
+from app.migrations import v0003_collection_versions
+
+# Первая редакция v0003 вела счётчик flight_tasks на заказах, пользователях,
+# маршрутах и заданиях. В базах, где она уже применена, триггеры этих таблиц
+# удаляются, а триггеры клубов и оборудования пересоздаются без flight_tasks.
+# В базе, созданной текущей v0003, миграция ничего не меняет
+TABLES = ["order", "user", "route", "flight_task"]
+
+
+def upgrade(connection: Connection) -> None:
+    for table_name in TABLES:
+        for event in ("insert", "update", "delete"):
+            name = f"{table_name}_{event}_collection_version"
+            if connection.dialect.name == "postgresql":
+                connection.execute(text(f'DROP TRIGGER IF EXISTS {name} ON "{table_name}"'))
+            else:
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    connection.execute(text("DELETE FROM collection_version WHERE name = 'flight_tasks'"))
+    v0003_collection_versions.upgrade(connection)
@@ -1,12 +1,14 @@
-import uuid
 from datetime import date, time, datetime
 from typing import Optional
 from pydantic import EmailStr
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel
 from uuid import UUID
 from enum import Enum as PyEnum
 import pytz
 
+from app.core.ids import new_id
+
 
 def moscow_now():
     return datetime.now(pytz.timezone('Europe/Moscow'))
@@ -21,7 +23,7 @@ class OrderStatus(str, PyEnum):
 
 
 class User(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: UUID = Field(default_factory=new_id, primary_key=True)
     email: EmailStr = Field(unique=True, index=True, max_length=255)
     hashed_password: str
     is_superuser: bool = False
@@ -32,7 +34,7 @@ class User(SQLModel, table=True):
 
 
 class Club(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: UUID = Field(default_factory=new_id, primary_key=True)
     name: str = Field(max_length=255)
     address: str = Field(max_length=255)
     latitude: float
@@ -43,7 +45,9 @@ class Club(SQLModel, table=True):
 
 
 class Camera(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Списки оборудования клуба и проверки перед архивированием/удалением клуба
+    __table_args__ = (Index("ix_camera_club_id_is_available", "club_id", "is_available"),)
+    id: UUID = Field(default_factory=new_id, primary_key=True)
     model: str = Field(max_length=255)
     width_px: int
     height_px: int
@@ -55,7 +59,9 @@ class Camera(SQLModel, table=True):
 
 
 class Lens(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Списки оборудования клуба и проверки перед архивированием/удалением клуба
+    __table_args__ = (Index("ix_lens_club_id_is_available", "club_id", "is_available"),)
+    id: UUID = Field(default_factory=new_id, primary_key=True)
     model: str = Field(max_length=255)
     min_focal_length: float
     max_focal_length: float
@@ -67,7 +73,9 @@ class Lens(SQLModel, table=True):
 
 
 class Drone(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Списки оборудования клуба и проверки перед архивированием/удалением клуба
+    __table_args__ = (Index("ix_drone_club_id_is_available", "club_id", "is_available"),)
+    id: UUID = Field(default_factory=new_id, primary_key=True)
     model: str = Field(max_length=255)
     club_id: UUID = Field(foreign_key="club.id")
     battery_charge: int
@@ -77,36 +85,67 @@ class Drone(SQLModel, table=True):
 
 
 class Route(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    club_id: UUID = Field(foreign_key="club.id")
+    id: UUID = Field(default_factory=new_id, primary_key=True)
+    club_id: UUID = Field(foreign_key="club.id", index=True)
     points: str  # JSON-строка с координатами
     created_at: datetime = Field(default_factory=moscow_now)
     updated_at: Optional[datetime] = None
 
 
 class Order(SQLModel, table=True):
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        # Выгрузка и фильтры по статусу за период
+        Index("ix_order_status_order_date", "status", "order_date"),
+        Index("ix_order_order_date_start_time", "order_date", "start_time"),
+        # Новые заказы без оператора (GET /orders/new) - малая часть таблицы
+        Index(
+            "ix_order_new_unassigned",
+            "order_date",
+            "start_time",
+            postgresql_where=text("status = 'new' AND operator_id IS NULL"),
+            sqlite_where=text("status = 'new' AND operator_id IS NULL"),
+        ),
+    )
+    id: UUID = Field(default_factory=new_id, primary_key=True)
     first_name: str = Field(max_length=255)
     last_name: str = Field(max_length=255)
     email: EmailStr = Field(max_length=255)
     order_date: date
     start_time: time
     end_time: time
-    club_id: UUID = Field(foreign_key="club.id")
+    club_id: UUID = Field(foreign_key="club.id", index=True)
     status: OrderStatus = OrderStatus.new
-    operator_id: Optional[UUID] = Field(default=None, foreign_key="user.id")
+    operator_id: Optional[UUID] = Field(default=None, foreign_key="user.id", index=True)
     created_at: datetime = Field(default_factory=moscow_now)
     updated_at: Optional[datetime] = None
 
 
 class FlightTask(SQLModel, table=True):
     __tablename__ = "flight_task"
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    order_id: UUID = Field(foreign_key="order.id")
-    operator_id: UUID = Field(foreign_key="user.id")
-    route_id: UUID = Field(foreign_key="route.id")
-    drone_id: UUID = Field(foreign_key="drone.id")
-    camera_id: UUID = Field(foreign_key="camera.id")
-    lens_id: Optional[UUID] = Field(foreign_key="lens.id", default=None)
+    id: UUID = Field(default_factory=new_id, primary_key=True)
+    order_id: UUID = Field(foreign_key="order.id", unique=True, index=True)  # одно задание на заказ
+    operator_id: UUID = Field(foreign_key="user.id", index=True)
+    route_id: UUID = Field(foreign_key="route.id", index=True)
+    drone_id: UUID = Field(foreign_key="drone.id", index=True)
+    camera_id: UUID = Field(foreign_key="camera.id", index=True)
+    lens_id: Optional[UUID] = Field(foreign_key="lens.id", default=None, index=True)
     created_at: datetime = Field(default_factory=moscow_now)
-    updated_at: Optional[datetime] = None
\ No newline at end of file
+    updated_at: Optional[datetime] = None
+
+
+class RefreshToken(SQLModel, table=True):
+    __tablename__ = "refresh_token"
+    id: UUID = Field(primary_key=True)  # jti выданного токена
+    family_id: UUID = Field(index=True)  # все токены одной цепочки ротации
+    user_id: UUID = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
+    expires_at: datetime = Field(index=True)  # UTC без часового пояса
+    used_at: Optional[datetime] = None
+    revoked: bool = Field(default=False)
+
+
+# Версия коллекции для ETag: увеличивается триггерами на таблицах, из которых
+# собираются ответы коллекции (миграция v0003)
+class CollectionVersion(SQLModel, table=True):
+    __tablename__ = "collection_version"
+    name: str = Field(primary_key=True, max_length=64)
+    version: int = Field(default=0)
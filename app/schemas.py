@@ -14,6 +14,11 @@ class OrderStatus(str, PyEnum):
     cancelled = "cancelled"
 
 
+class ExportFormat(str, PyEnum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
 class UserBase(SQLModel):
     email: EmailStr = Field(max_length=255)
     is_superuser: bool = False
@@ -144,6 +149,16 @@ class OrderWithOperator(OrderResponse):
     operator: Optional[UserPublic]
 
 
+class ImportRowError(SQLModel):
+    row: int
+    detail: str
+
+
+class OrderImportReport(SQLModel):
+    imported: int
+    errors: List[ImportRowError]
+
+
 class OrderStatusUpdate(BaseModel):
     status: Optional[OrderStatus] = None
 
@@ -224,6 +239,7 @@ class LensUpdate(SQLModel):
     model: Optional[str] = Field(default=None, max_length=255)
     min_focal_length: Optional[float] = None
     max_focal_length: Optional[float] = None
+    zoom_ratio: Optional[float] = None
     club_id: Optional[UUID] = None
 
 
@@ -255,6 +271,29 @@ class DroneAdmin(DroneResponse):
     is_available: bool
 
 
+class DroneBatchUpdate(DroneUpdate):
+    id: UUID
+
+
+class CameraBatchUpdate(CameraUpdate):
+    id: UUID
+
+
+class LensBatchUpdate(LensUpdate):
+    id: UUID
+
+
+class BatchItemError(SQLModel):
+    index: int
+    id: Optional[UUID] = None
+    detail: str
+
+
+class BatchResult(SQLModel):
+    processed: List[UUID]
+    errors: List[BatchItemError]
+
+
 class FlightTaskCreate(BaseModel):
     order_id: UUID
     drone_id: UUID
@@ -278,3 +317,73 @@ class FlightTaskResponse(BaseModel):
     drone: DroneResponse
     camera: CameraResponse
     lens: Optional[LensResponse]
+
+
+class BlockingSite(BaseModel):
+    handler: Optional[str]
+    call_site: str
+    count: int
+    total_ms: float
+    max_ms: float
+
+
+class BlockingEvent(BaseModel):
+    at: datetime
+    duration_ms: float
+    handler: Optional[str]
+    call_site: str
+    stack: List[str]
+
+
+class LoopBlockingReport(BaseModel):
+    enabled: bool
+    threshold_ms: int
+    last_lag_ms: float
+    max_lag_ms: float
+    sites: List[BlockingSite]
+    events: List[BlockingEvent]
+
+
+class ProfileInfo(BaseModel):
+    name: str
+    method: str
+    path: str
+    status: int
+    started_at: datetime
+    duration_ms: float
+    samples: int
+    interval_ms: int
+
+
+class MemorySnapshotInfo(BaseModel):
+    name: str
+    taken_at: datetime
+    traced_bytes: int
+    blocks: int
+
+
+class MemoryStatus(BaseModel):
+    tracing: bool
+    frames: int
+    traced_bytes: int
+    traced_peak_bytes: int
+    tracemalloc_overhead_bytes: int
+    rss_bytes: Optional[int]
+    snapshots: List[MemorySnapshotInfo]
+
+
+class AllocationSite(BaseModel):
+    site: str
+    size: int
+    count: int
+    size_diff: int
+    count_diff: int
+
+
+class RequestMemoryPeak(BaseModel):
+    at: datetime
+    method: str
+    path: str
+    status: int
+    peak_bytes: int
+    retained_bytes: int
@@ -0,0 +1,322 @@
+"""Пропускная способность и перцентили задержки всех роутеров API на синтетических данных.
+
+Поднимает одноразовую базу (--db sqlite - временный файл, postgres - временная
+база на сервере из настроек POSTGRES_*, либо готовый URL), заполняет её
+benchmarks.datagen и прогоняет сценарии по роутерам login, users, orders,
+flight_tasks, clubs, drones, cameras, lenses через httpx.ASGITransport - в
+одном процессе, без сети и сервера. Каждый сценарий выполняется --requests раз
+(тяжёлые - реже, см. Scenario.share) при --concurrency одновременных клиентах.
+Печатает req/s и p50/p90/p99 по сценариям, сохраняет результат в JSON
+(--output), --compare печатает разницу с сохранённым ранее прогоном.
+
+В SQLite серверная функция update_all_orders_status ничего не делает, в
+временной базе PostgreSQL она заменена пустой; числа сравнимы только между
+прогонами на одной и той же базе.
+
+    python -m benchmarks.api_suite --db sqlite --orders 100000 --output results.json
+    python -m benchmarks.api_suite --db postgres --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from itertools import count
+from typing import Any
+
+import httpx
+from sqlalchemy import create_engine, make_url, text
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.main import app
+from benchmarks.datagen import (
+    PASSWORD, Dataset, add_arguments, dataset_from, equipment_number, generate, make_id, new_order_numbers, points,
+)
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class Scenario:
+    name: str
+    role: str  # admin, operator или anonymous
+    request: Callable[[int], dict[str, Any]]
+    share: float = 1.0  # доля от --requests для тяжёлых сценариев
+
+
+def scenarios(dataset: Dataset) -> list[Scenario]:
+    rng = random.Random(dataset.seed)
+    new_orders = new_order_numbers(dataset)
+    # Задания оператора 0 - каждое dataset.users-е
+    own_tasks = max(dataset.tasks // dataset.users, 1)
+
+    def get(path: str, **params: Any) -> dict[str, Any]:
+        return {"method": "GET", "url": path, "params": params}
+
+    def create_task(_: int) -> dict[str, Any]:
+        number = next(new_orders)
+        club = number % dataset.clubs
+        item = equipment_number(club, number, dataset)
+        return {"method": "POST", "url": "/flight-tasks/", "json": {
+            "order_id": str(make_id("order", number)),
+            "drone_id": str(make_id("drone", item)),
+            "camera_id": str(make_id("camera", item)),
+            "lens_id": str(make_id("lens", item)),
+            "points": points(rng, 55.0, 37.0, dataset.waypoints),
+        }}
+
+    def create_order(index: int) -> dict[str, Any]:
+        return {"method": "POST", "url": "/orders", "json": {
+            "first_name": "Bench", "last_name": f"Client{index}", "email": f"bench{index}@bench.example.com",
+            "order_date": "2026-06-01", "start_time": "10:00", "end_time": "11:00",
+            "club_id": str(make_id("club", index % dataset.clubs)),
+        }}
+
+    equipment = dataset.clubs * dataset.equipment
+    result = [
+        Scenario("POST /login/access-token", "anonymous", lambda i: {
+            "method": "POST", "url": "/login/access-token",
+            "data": {"username": f"operator{i % dataset.users}@bench.example.com", "password": PASSWORD},
+        }, share=0.1),
+        Scenario("GET /users/me", "operator", lambda i: get("/users/me")),
+        Scenario("GET /users/", "admin", lambda i: get("/users/")),
+        Scenario("GET /users/{id}", "admin", lambda i: get(f"/users/{make_id('user', i % dataset.users)}")),
+        Scenario("GET /orders/statuses", "operator", lambda i: get("/orders/statuses")),
+        Scenario("GET /orders/new", "operator", lambda i: get("/orders/new")),
+        Scenario("GET /orders/assigned", "operator", lambda i: get("/orders/assigned")),
+        Scenario("GET /orders/all", "admin", lambda i: get("/orders/all")),
+        Scenario("GET /orders/{id}", "admin", lambda i: get(f"/orders/{make_id('order', i % dataset.orders)}")),
+        Scenario("POST /orders", "admin", create_order),
+        Scenario("GET /orders/export", "admin", lambda i: get(
+            "/orders/export", club_id=str(make_id("club", i % dataset.clubs)),
+            date_from="2024-01-01", date_to="2024-03-01",
+        ), share=0.25),
+        Scenario("GET /flight-tasks/", "operator", lambda i: get("/flight-tasks/"), share=0.25),
+        Scenario("GET /flight-tasks/active", "operator", lambda i: get("/flight-tasks/active"), share=0.25),
+        Scenario("GET /flight-tasks/history", "admin", lambda i: get("/flight-tasks/history"), share=0.05),
+        Scenario("GET /flight-tasks/{id}", "operator", lambda i: get(
+            f"/flight-tasks/{make_id('task', i % own_tasks * dataset.users)}"
+        )),
+        Scenario("POST /flight-tasks/", "operator", create_task, share=0.25),
+        Scenario("GET /clubs/", "operator", lambda i: get("/clubs/")),
+        Scenario("GET /clubs/{id}", "operator", lambda i: get(f"/clubs/{make_id('club', i % dataset.clubs)}")),
+        Scenario("PATCH /clubs/{id}", "admin", lambda i: {
+            "method": "PATCH", "url": f"/clubs/{make_id('club', i % dataset.clubs)}", "json": {"name": f"Club {i}"},
+        }),
+    ]
+    for kind, prefix, update in [
+        ("drone", "/drones", {"battery_charge": 80}),
+        ("camera", "/cameras", {"fps": 30}),
+        ("lens", "/lenses", {"zoom_ratio": 4.0}),
+    ]:
+        result += [
+            Scenario(f"GET {prefix}/?club_id", "operator", lambda i, prefix=prefix: get(
+                f"{prefix}/", club_id=str(make_id("club", i % dataset.clubs))
+            )),
+            Scenario(f"GET {prefix}/{{id}}", "operator", lambda i, kind=kind, prefix=prefix: get(
+                f"{prefix}/{make_id(kind, i % equipment)}"
+            )),
+            Scenario(f"PATCH {prefix}/{{id}}", "admin", lambda i, kind=kind, prefix=prefix, update=update: {
+                "method": "PATCH", "url": f"{prefix}/{make_id(kind, i % equipment)}", "json": update,
+            }),
+        ]
+    return result
+
+
+def percentile(ordered: list[float], value: float) -> float:
+    # Ближайший ранг: перцентиль - одно из измеренных значений
+    rank = max(int(round(value / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies: list[float], errors: int, wall: float) -> dict[str, Any]:
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / wall if wall else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+    summary.update({f"p{value}_ms": percentile(ordered, value) * 1000 for value in PERCENTILES})
+    return summary
+
+
+async def run_scenario(client: Any, scenario: Scenario, headers: dict[str, str], requests: int, concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    numbers = count()
+    first_error: str | None = None
+
+    async def worker() -> None:
+        nonlocal errors, first_error
+        while (index := next(numbers)) < requests:
+            request = scenario.request(index)
+            started = time.perf_counter()
+            response = await client.request(**request, headers=headers)
+            await response.aread()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+                first_error = first_error or f"{response.status_code} {response.text[:200]}"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    summary = summarize(latencies, errors, time.perf_counter() - started)
+    if first_error:
+        summary["first_error"] = first_error
+    return summary
+
+
+async def run(args: argparse.Namespace, dataset: Dataset) -> dict[str, Any]:
+    await app.router.startup()
+    try:
+        # Ошибки приложения считаются ответами 500, а не прерывают прогон
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def token(email: str, password: str) -> str:
+                response = await client.post("/login/access-token", data={"username": email, "password": password})
+                response.raise_for_status()
+                return response.json()["access_token"]
+
+            headers = {
+                "anonymous": {},
+                "admin": {"Authorization": f"Bearer {await token(settings.FIRST_SUPERUSER, settings.FIRST_SUPERUSER_PASSWORD)}"},
+                "operator": {"Authorization": f"Bearer {await token('operator0@bench.example.com', PASSWORD)}"},
+            }
+            results = {}
+            selected = [scenario for scenario in scenarios(dataset) if not args.only or any(
+                part in scenario.name for part in args.only
+            )]
+            print(f"{'scenario':<32} {'req':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8}")
+            for scenario in selected:
+                requests = max(int(args.requests * scenario.share), 5)
+                # Прогрев: первый запрос сценария платит за ленивые импорты и кэши
+                await client.request(**scenario.request(requests), headers=headers[scenario.role])
+                summary = await run_scenario(client, scenario, headers[scenario.role], requests, args.concurrency)
+                results[scenario.name] = summary
+                print(
+                    f"{scenario.name:<32} {summary['requests']:>6} {summary['errors']:>5} {summary['rps']:>8.1f} "
+                    f"{summary['p50_ms']:>8.1f} {summary['p90_ms']:>8.1f} {summary['p99_ms']:>8.1f}"
+                )
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path: str, results: dict[str, Any]) -> None:
+    with open(previous_path, encoding="utf-8") as file:
+        previous = json.load(file)["results"]
+    print(f"\n{'scenario':<32} {'p50 before':>10} {'p50 now':>8} {'p99 before':>10} {'p99 now':>8} {'req/s':>8}")
+    for name, now in results.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        change = (now["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0.0
+        print(
+            f"{name:<32} {before['p50_ms']:>10.1f} {now['p50_ms']:>8.1f} "
+            f"{before['p99_ms']:>10.1f} {now['p99_ms']:>8.1f} {change:>+7.0f}%"
+        )
+
+
+# Временная база на сервере PostgreSQL из настроек; функция пересчёта статусов
+# заказов в ней пустая, как в benchmarks.query_plans
+def create_postgres_database() -> tuple[str, Callable[[], None]]:
+    base = make_url(settings.SQLALCHEMY_DATABASE_URI)
+    name = f"vkr_bench_{os.getpid()}"
+    admin = create_engine(base, isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        connection.execute(text(f'CREATE DATABASE "{name}"'))
+    url = base.set(database=name)
+    bench = create_engine(url)
+    with bench.begin() as connection:
+        connection.execute(text("CREATE FUNCTION update_all_orders_status() RETURNS void LANGUAGE sql AS $$ $$"))
+    bench.dispose()
+
+    def drop() -> None:
+        with admin.connect() as connection:
+            connection.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+        admin.dispose()
+
+    return url.render_as_string(hide_password=False), drop
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite", help="sqlite, postgres or a database URL")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", nargs="+", help="run scenarios whose name contains any of these")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="previous JSON results to compare with")
+    parser.add_argument("--reuse", action="store_true", help="skip seeding, the URL database is already filled")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary database")
+    add_arguments(parser)
+    args = parser.parse_args()
+    dataset = dataset_from(args)
+
+    cleanup: Callable[[], None] = lambda: None
+    if args.db == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(prefix="vkr-bench-"), "bench.db")
+        url = f"sqlite:///{path}"
+        if not args.keep:
+            cleanup = lambda: os.remove(path)
+    elif args.db == "postgres":
+        url, drop = create_postgres_database()
+        if not args.keep:
+            cleanup = drop
+    else:
+        url = args.db
+    # Движок создаётся при первом обращении, так что достаточно подменить адрес в настройках
+    settings.DATABASE_URL = url
+    settings.RUN_DB_INIT_ON_STARTUP = False
+    try:
+        if not args.reuse:
+            generate(get_engine(), dataset)
+        results = asyncio.run(run(args, dataset))
+    finally:
+        get_engine().dispose()
+        cleanup()
+
+    if args.compare:
+        compare(args.compare, results)
+    if args.output:
+        report = {
+            "meta": {
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "database": make_url(url).get_backend_name(),
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "dataset": asdict(dataset),
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nresults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
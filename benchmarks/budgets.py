@@ -0,0 +1,247 @@
+"""Бюджеты числа SQL-запросов и задержки эндпоинтов как регрессионная проверка.
+
+Для каждого эндпоинта из BUDGETS объявлены максимум SQL-запросов на один
+запрос к API и бюджет p95 задержки на наборе данных FIXTURE. Проверка
+поднимает одноразовую базу (--db, как в benchmarks.api_suite), заполняет её
+benchmarks.datagen и выполняет сценарии api_suite по одному запросу за раз
+через httpx.ASGITransport. Запросы к базе считаются обработчиком события
+before_cursor_execute движка SQLAlchemy. Если эндпоинт превысил бюджет,
+печатаются выполненные им запросы и код возврата 1 - как у упавших тестов.
+
+Бюджет запросов не зависит от машины и базы; бюджет задержки записан для
+SQLite на ноутбуке разработчика, на медленной машине его можно растянуть
+(--latency-scale) или не проверять (--latency-scale 0).
+
+    python -m benchmarks.budgets
+    python -m benchmarks.budgets --db postgres --only flight-tasks --latency-scale 2
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.sql_stats import statement_template
+from app.main import app
+from benchmarks.api_suite import Scenario, create_postgres_database, percentile, scenarios
+from benchmarks.datagen import PASSWORD, Dataset, equipment_number, generate, make_id, points
+
+FIXTURE = Dataset(clubs=10, users=20, equipment=10, orders=2000)
+# На 20 замерах p95 - фактически максимум, и одна пауза сборщика мусора
+# роняла проверку. На 100 замерах p95 отбрасывает пять худших
+REQUESTS = 100
+
+
+@dataclass
+class Budget:
+    scenario: str
+    queries: int  # SQL-запросов на один запрос к API
+    p95_ms: float
+
+
+# Число запросов - ровно замеренное на FIXTURE, любой лишний запрос - регрессия.
+# Задержка - с запасом в два-три раза от замеров. Эндпоинты с ETag читают версии
+# коллекций: в SQLite нет уведомлений, и это отдельный запрос на каждый вызов,
+# в PostgreSQL версии берутся из памяти. Списки клубов и оборудования и проверки
+# при создании заказов и заданий читают справочник app.core.catalog без запросов
+BUDGETS = [
+    Budget("GET /users/me", 1, 15),
+    Budget("GET /users/", 2, 60),
+    Budget("GET /users/{id}", 1, 20),
+    Budget("GET /orders/statuses", 0, 10),
+    Budget("GET /orders/new", 2, 200),
+    Budget("GET /orders/assigned", 2, 30),
+    Budget("GET /orders/all", 2, 150),
+    Budget("GET /orders/{id}", 2, 20),
+    Budget("POST /orders", 2, 30),
+    Budget("GET /orders/export", 2, 30),
+    Budget("GET /flight-tasks/", 1, 150),
+    Budget("GET /flight-tasks/active", 1, 200),
+    Budget("GET /flight-tasks/history", 1, 1000),
+    Budget("GET /flight-tasks/history?fields", 1, 50),
+    Budget("GET /flight-tasks/{id}", 1, 20),
+    Budget("POST /flight-tasks/", 5, 30),
+    Budget("PATCH /flight-tasks/{id}", 5, 30),
+    Budget("PATCH /drones/batch", 2, 30),
+    Budget("GET /clubs/", 1, 15),
+    Budget("GET /clubs/{id}", 1, 15),
+    Budget("PATCH /clubs/{id}", 3, 25),
+    Budget("GET /drones/?club_id", 1, 15),
+    Budget("GET /drones/{id}", 1, 15),
+    Budget("PATCH /drones/{id}", 3, 25),
+    Budget("GET /cameras/?club_id", 1, 15),
+    Budget("GET /cameras/{id}", 1, 15),
+    Budget("PATCH /cameras/{id}", 3, 25),
+    Budget("GET /lenses/?club_id", 1, 15),
+    Budget("GET /lenses/{id}", 1, 15),
+    Budget("PATCH /lenses/{id}", 3, 25),
+]
+
+
+# Сценарии, которых нет в api_suite: они меняют задания и нужны только для бюджетов
+def extra_scenarios(dataset: Dataset) -> list[Scenario]:
+    def update_task(index: int) -> dict[str, Any]:
+        # Каждое пятое задание в работе, его заказ можно редактировать
+        number = index * 5 % dataset.tasks
+        item = equipment_number(number % dataset.clubs, index, dataset)
+        return {"method": "PATCH", "url": f"/flight-tasks/{make_id('task', number)}", "json": {
+            "drone_id": str(make_id("drone", item)),
+            "points": points(random.Random(index), 55.0, 37.0, dataset.waypoints),
+        }}
+
+    # Список для экрана оператора: без маршрутов и лишних соединений
+    def sparse_history(index: int) -> dict[str, Any]:
+        return {"method": "GET", "url": "/flight-tasks/history", "params": {"fields": "id,order.status,drone.model"}}
+
+    # null в пакетном обновлении значит "не менять": поле пропускается, а не
+    # записывается в NOT NULL колонку
+    def update_drones(index: int) -> dict[str, Any]:
+        return {"method": "PATCH", "url": "/drones/batch", "json": [
+            {"id": str(make_id("drone", index % dataset.clubs)), "model": None, "battery_charge": 90},
+            {"id": str(make_id("drone", (index + 1) % dataset.clubs)), "club_id": None},
+        ]}
+
+    return [
+        Scenario("PATCH /flight-tasks/{id}", "admin", update_task),
+        Scenario("PATCH /drones/batch", "admin", update_drones),
+        Scenario("GET /flight-tasks/history?fields", "admin", sparse_history),
+    ]
+
+
+class QueryCapture:
+    def __init__(self) -> None:
+        self.statements: list[str] | None = None
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def start(self) -> None:
+        self.statements = []
+
+    def stop(self) -> list[str]:
+        statements, self.statements = self.statements or [], None
+        return statements
+
+
+def offending(statements: list[str]) -> list[str]:
+    counts = Counter(statement_template(statement) for statement in statements)
+    return [f"{count}x {template}" if count > 1 else template for template, count in counts.items()]
+
+
+async def check(client: Any, budget: Budget, scenario: Scenario, headers: dict[str, str], capture: QueryCapture,
+                requests: int, latency_scale: float) -> list[str]:
+    # Прогрев: первый запрос платит за ленивые импорты и пустые кэши аутентификации
+    await client.request(**scenario.request(requests), headers=headers)
+    # Мусор предыдущих сценариев собирается до замера, а не посреди него
+    gc.collect()
+    latencies: list[float] = []
+    worst: list[str] = []
+    errors: list[str] = []
+    for index in range(requests):
+        request = scenario.request(index)
+        capture.start()
+        started = time.perf_counter()
+        response = await client.request(**request, headers=headers)
+        await response.aread()
+        latencies.append(time.perf_counter() - started)
+        statements = capture.stop()
+        if len(statements) > len(worst):
+            worst = statements
+        if response.status_code >= 400 and not errors:
+            errors.append(f"{response.status_code} {response.text[:200]}")
+
+    p95 = percentile(sorted(latencies), 95) * 1000
+    failures = [f"error response: {error}" for error in errors]
+    if len(worst) > budget.queries:
+        failures.append(f"{len(worst)} queries, budget {budget.queries}:")
+        failures += [f"    {line}" for line in offending(worst)]
+    if latency_scale and p95 > budget.p95_ms * latency_scale:
+        failures.append(f"p95 {p95:.1f} ms, budget {budget.p95_ms * latency_scale:.1f} ms")
+    status = "FAIL" if failures else "ok"
+    print(f"{status:>6}  {budget.scenario:<32} {len(worst):>3}/{budget.queries:<3} queries  "
+          f"p95 {p95:>8.1f}/{budget.p95_ms * (latency_scale or 1):<6.0f} ms")
+    for line in failures:
+        print(f"        {line}")
+    return failures
+
+
+async def run(args: argparse.Namespace, dataset: Dataset) -> int:
+    by_name = {scenario.name: scenario for scenario in scenarios(dataset) + extra_scenarios(dataset)}
+    selected = [budget for budget in BUDGETS if not args.only or any(part in budget.scenario for part in args.only)]
+    capture = QueryCapture()
+    event.listen(get_engine(), "before_cursor_execute", capture)
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://budget", timeout=None) as client:
+            async def token(email: str, password: str) -> str:
+                response = await client.post("/login/access-token", data={"username": email, "password": password})
+                response.raise_for_status()
+                return response.json()["access_token"]
+
+            headers = {
+                "anonymous": {},
+                "admin": {"Authorization": f"Bearer {await token(settings.FIRST_SUPERUSER, settings.FIRST_SUPERUSER_PASSWORD)}"},
+                "operator": {"Authorization": f"Bearer {await token('operator0@bench.example.com', PASSWORD)}"},
+            }
+            failed = 0
+            for budget in selected:
+                scenario = by_name[budget.scenario]
+                failures = await check(
+                    client, budget, scenario, headers[scenario.role], capture, args.requests, args.latency_scale,
+                )
+                failed += bool(failures)
+    finally:
+        await app.router.shutdown()
+        event.remove(get_engine(), "before_cursor_execute", capture)
+    print(f"\n{len(selected) - failed} passed, {failed} failed")
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite", help="sqlite, postgres or a database URL")
+    parser.add_argument("--requests", type=int, default=REQUESTS, help="requests per endpoint")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply latency budgets, 0 to skip them")
+    parser.add_argument("--only", nargs="+", help="check endpoints whose name contains any of these")
+    args = parser.parse_args()
+
+    cleanup: Callable[[], None] = lambda: None
+    if args.db == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(prefix="vkr-budgets-"), "budgets.db")
+        url = f"sqlite:///{path}"
+        cleanup = lambda: os.remove(path)
+    elif args.db == "postgres":
+        url, cleanup = create_postgres_database()
+    else:
+        url = args.db
+    settings.DATABASE_URL = url
+    settings.RUN_DB_INIT_ON_STARTUP = False
+    # Предупреждения о медленных запросах, N+1 и остановках цикла дублировали бы отчёт проверки
+    settings.SQL_SLOW_QUERY_MS = 0
+    settings.SQL_N_PLUS_ONE_THRESHOLD = 0
+    settings.LOOP_MONITOR_ENABLED = False
+    try:
+        generate(get_engine(), FIXTURE, verbose=False)
+        failed = asyncio.run(run(args, FIXTURE))
+    finally:
+        get_engine().dispose()
+        cleanup()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
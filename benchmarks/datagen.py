@@ -0,0 +1,233 @@
+"""Синтетические данные для бенчмарков: клубы, оборудование, пользователи, заказы, маршруты.
+
+Заполняет базу по --database-url (по умолчанию - из настроек) после миграций:
+--clubs клубов с --equipment дронами, камерами и объективами в каждом,
+--users операторов с паролем PASSWORD, --orders заказов и задания с маршрутами
+из --waypoints точек для доли --task-ratio заказов. Идентификаторы выводятся
+из вида записи и её номера (make_id), поэтому сценарии бенчмарка обращаются к
+конкретным записям без выборок, а одинаковые параметры дают одинаковые данные.
+
+    python -m benchmarks.datagen --database-url sqlite:///bench.db --orders 1000000 --waypoints 50
+"""
+import argparse
+import json
+import random
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from datetime import time as day_time
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import Engine, Table
+from sqlmodel import Session
+
+from app.core import migrations
+from app.core.config import settings
+from app.core.db import create_app_engine, init_db
+from app.core.security import pwd_context
+from app.models import Camera, Club, Drone, FlightTask, Lens, Order, OrderStatus, Route, User
+
+PASSWORD = "benchpassword"
+BATCH = 5000
+FIRST_DAY = date(2024, 1, 1)
+DAYS = 730
+
+KINDS = {"club": 1, "user": 2, "drone": 3, "camera": 4, "lens": 5, "order": 6, "route": 7, "task": 8}
+
+
+@dataclass
+class Dataset:
+    clubs: int = 20
+    users: int = 50
+    equipment: int = 20
+    orders: int = 20_000
+    task_ratio: float = 0.25
+    waypoints: int = 20
+    seed: int = 42
+
+    @property
+    def tasks(self) -> int:
+        return int(self.orders * self.task_ratio)
+
+
+# UUID с версией 7 и номером записи в младших битах: значения возрастают в
+# порядке вставки, как у настоящих первичных ключей приложения
+def make_id(kind: str, number: int) -> UUID:
+    return UUID(f"{KINDS[kind]:08x}-0000-7000-8000-{number:012x}")
+
+
+def equipment_number(club: int, index: int, dataset: Dataset) -> int:
+    return club * dataset.equipment + index % dataset.equipment
+
+
+# Заказы с заданиями идут первыми: каждый пятый ещё в работе, остальные
+# выполнены. Среди заказов без задания чётные новые и без оператора, нечётные отменены
+def order_status(number: int, dataset: Dataset) -> OrderStatus:
+    if number < dataset.tasks:
+        return OrderStatus.in_processing if number % 5 == 0 else OrderStatus.completed
+    return OrderStatus.new if number % 2 == 0 else OrderStatus.cancelled
+
+
+def new_order_numbers(dataset: Dataset) -> Iterator[int]:
+    first = dataset.tasks + dataset.tasks % 2
+    return iter(range(first, dataset.orders, 2))
+
+
+def points(rng: random.Random, latitude: float, longitude: float, count: int) -> list[dict[str, Any]]:
+    route = [
+        {
+            "sequence_number": index + 1,
+            "latitude": round(latitude + rng.uniform(-0.01, 0.01), 6),
+            "longitude": round(longitude + rng.uniform(-0.01, 0.01), 6),
+            "altitude": round(rng.uniform(20, 120), 1),
+            "color": "#ff0000",
+        }
+        for index in range(max(count, 3) - 1)
+    ]
+    # Маршрут замкнут: последняя точка совпадает с первой
+    return route + [{**route[0], "sequence_number": len(route) + 1}]
+
+
+def club_position(club: int) -> tuple[float, float]:
+    return 55.0 + club % 50 * 0.05, 37.0 + club // 50 * 0.05
+
+
+def rows(dataset: Dataset, now: datetime) -> dict[Table, Callable[[], Iterator[dict[str, Any]]]]:
+    rng = random.Random(dataset.seed)
+    hashed_password = pwd_context.hash(PASSWORD)
+    equipment = dataset.clubs * dataset.equipment
+
+    def clubs() -> Iterator[dict[str, Any]]:
+        for number in range(dataset.clubs):
+            latitude, longitude = club_position(number)
+            yield {
+                "id": make_id("club", number), "name": f"Club {number}", "address": f"Street {number}",
+                "latitude": latitude, "longitude": longitude, "is_available": True, "created_at": now,
+            }
+
+    def users() -> Iterator[dict[str, Any]]:
+        for number in range(dataset.users):
+            yield {
+                "id": make_id("user", number), "email": f"operator{number}@bench.example.com",
+                "hashed_password": hashed_password, "is_superuser": False, "username": f"Operator {number}",
+                "is_available": True, "created_at": now,
+            }
+
+    def drones() -> Iterator[dict[str, Any]]:
+        for number in range(equipment):
+            yield {
+                "id": make_id("drone", number), "model": f"Drone {number % 7}",
+                "club_id": make_id("club", number // dataset.equipment),
+                "battery_charge": 50 + number % 50, "is_available": True, "created_at": now,
+            }
+
+    def cameras() -> Iterator[dict[str, Any]]:
+        for number in range(equipment):
+            yield {
+                "id": make_id("camera", number), "model": f"Camera {number % 5}",
+                "width_px": 1920, "height_px": 1080, "fps": 60,
+                "club_id": make_id("club", number // dataset.equipment), "is_available": True, "created_at": now,
+            }
+
+    def lenses() -> Iterator[dict[str, Any]]:
+        for number in range(equipment):
+            yield {
+                "id": make_id("lens", number), "model": f"Lens {number % 4}",
+                "min_focal_length": 12.0, "max_focal_length": 60.0, "zoom_ratio": 5.0,
+                "club_id": make_id("club", number // dataset.equipment), "is_available": True, "created_at": now,
+            }
+
+    def orders() -> Iterator[dict[str, Any]]:
+        for number in range(dataset.orders):
+            status = order_status(number, dataset)
+            hour = 8 + number % 10
+            yield {
+                "id": make_id("order", number), "first_name": f"First{number}", "last_name": f"Last{number}",
+                "email": f"client{number}@bench.example.com",
+                "order_date": FIRST_DAY + timedelta(days=number % DAYS),
+                "start_time": day_time(hour), "end_time": day_time(hour + 1),
+                "club_id": make_id("club", number % dataset.clubs), "status": status,
+                "operator_id": make_id("user", number % dataset.users) if number < dataset.tasks else None,
+                "created_at": now,
+            }
+
+    def routes() -> Iterator[dict[str, Any]]:
+        for number in range(dataset.tasks):
+            club = number % dataset.clubs
+            yield {
+                "id": make_id("route", number), "club_id": make_id("club", club),
+                "points": json.dumps(points(rng, *club_position(club), dataset.waypoints)), "created_at": now,
+            }
+
+    def tasks() -> Iterator[dict[str, Any]]:
+        for number in range(dataset.tasks):
+            item = equipment_number(number % dataset.clubs, number // dataset.clubs, dataset)
+            yield {
+                "id": make_id("task", number), "order_id": make_id("order", number),
+                "operator_id": make_id("user", number % dataset.users), "route_id": make_id("route", number),
+                "drone_id": make_id("drone", item), "camera_id": make_id("camera", item),
+                "lens_id": make_id("lens", item), "created_at": now,
+            }
+
+    return {
+        Club.__table__: clubs, User.__table__: users, Drone.__table__: drones, Camera.__table__: cameras,
+        Lens.__table__: lenses, Order.__table__: orders, Route.__table__: routes, FlightTask.__table__: tasks,
+    }
+
+
+def generate(engine: Engine, dataset: Dataset, verbose: bool = True) -> None:
+    migrations.upgrade(engine)
+    with Session(engine) as session:
+        init_db(session)
+    now = datetime.now()
+    for table, produce in rows(dataset, now).items():
+        started = time.perf_counter()
+        count = 0
+        batch: list[dict[str, Any]] = []
+        with engine.begin() as connection:
+            for row in produce():
+                batch.append(row)
+                if len(batch) == BATCH:
+                    connection.execute(table.insert(), batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                connection.execute(table.insert(), batch)
+                count += len(batch)
+        if verbose:
+            elapsed = time.perf_counter() - started
+            print(f"{table.name:>12} {count:>10} rows {elapsed:>8.1f}s {count / max(elapsed, 1e-9):>10.0f} rows/s")
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = Dataset()
+    parser.add_argument("--clubs", type=int, default=defaults.clubs)
+    parser.add_argument("--users", type=int, default=defaults.users, help="operators")
+    parser.add_argument("--equipment", type=int, default=defaults.equipment, help="drones, cameras and lenses per club")
+    parser.add_argument("--orders", type=int, default=defaults.orders)
+    parser.add_argument("--task-ratio", type=float, default=defaults.task_ratio, help="share of orders with a flight task")
+    parser.add_argument("--waypoints", type=int, default=defaults.waypoints, help="points per route")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def dataset_from(args: argparse.Namespace) -> Dataset:
+    return Dataset(**{field: getattr(args, field) for field in asdict(Dataset())})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to the application settings")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    engine = create_app_engine(args.database_url or settings.SQLALCHEMY_DATABASE_URI)
+    try:
+        generate(engine, dataset_from(args))
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
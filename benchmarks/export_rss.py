@@ -0,0 +1,88 @@
+"""Выгрузка большого числа заказов с замером RSS процесса.
+
+Заполняет базу из настроек (POSTGRES_*) синтетическими заказами и прогоняет
+потоковую выгрузку CSV/NDJSON, печатая RSS каждые --every строк. При
+серверном курсоре RSS должен оставаться ровным независимо от --rows.
+
+    python -m benchmarks.export_rss --rows 5000000 --seed
+"""
+import argparse
+import resource
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app import crud
+from app.core import migrations
+from app.core.db import get_engine
+from app.core.export import iter_csv, iter_ndjson
+from app.schemas import ExportFormat
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(rows: int) -> None:
+    with Session(get_engine()) as session:
+        club_id = session.execute(text(
+            "INSERT INTO club (id, name, address, latitude, longitude, is_available, created_at) "
+            "VALUES (gen_random_uuid(), 'bench', 'bench', 55.75, 37.61, true, now()) RETURNING id"
+        )).scalar_one()
+        session.execute(text(
+            'INSERT INTO "order" (id, first_name, last_name, email, order_date, start_time, end_time, '
+            "club_id, status, created_at) "
+            "SELECT gen_random_uuid(), 'First' || i, 'Last' || i, 'user' || i || '@example.com', "
+            "date '2020-01-01' + (i % 2000), time '10:00', time '11:00', :club_id, "
+            "'completed', now() FROM generate_series(1, :rows) AS i"
+        ), {"club_id": club_id, "rows": rows})
+        session.commit()
+
+
+def run(export_format: ExportFormat, every: int) -> None:
+    encode = iter_csv if export_format == ExportFormat.csv else iter_ndjson
+    rows = 0
+    size = 0
+    started = time.perf_counter()
+    print(f"{'rows':>10} {'rss, MB':>10} {'MB sent':>10} {'s':>8}")
+    print(f"{rows:>10} {rss_mb():>10.1f} {0:>10.1f} {0:>8.1f}")
+
+    def counted(source):
+        nonlocal rows
+        for row in source:
+            rows += 1
+            if rows % every == 0:
+                print(f"{rows:>10} {rss_mb():>10.1f} {size / 2 ** 20:>10.1f} "
+                      f"{time.perf_counter() - started:>8.1f}")
+            yield row
+
+    with Session(get_engine()) as session:
+        for chunk in encode(counted(crud.iter_orders_for_export(session)), crud.ORDER_EXPORT_COLUMNS):
+            size += len(chunk.encode())
+
+    elapsed = time.perf_counter() - started
+    print(f"{rows} rows, {size / 2 ** 20:.1f} MB in {elapsed:.1f}s, "
+          f"{rows / elapsed:.0f} rows/s, final rss {rss_mb():.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--seed", action="store_true", help="insert --rows synthetic orders first")
+    parser.add_argument("--format", type=ExportFormat, default=ExportFormat.csv)
+    parser.add_argument("--every", type=int, default=250_000)
+    args = parser.parse_args()
+
+    migrations.upgrade()
+    if args.seed:
+        seed(args.rows)
+    run(args.format, args.every)
+
+
+if __name__ == "__main__":
+    main()
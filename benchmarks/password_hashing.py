@@ -0,0 +1,49 @@
+"""Скорость хеширования паролей bcrypt в зависимости от числа процессов.
+
+Хеширует --count паролей пулом из 1, 2, 4, ... процессов (до числа ядер)
+и печатает время и ускорение относительно одного процесса.
+
+    python -m benchmarks.password_hashing --count 64
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.security import get_password_hash
+
+
+def worker_counts(limit: int) -> list[int]:
+    counts = []
+    workers = 1
+    while workers < limit:
+        counts.append(workers)
+        workers *= 2
+    counts.append(limit)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    passwords = [f"password-{index:06d}" for index in range(args.count)]
+    context = multiprocessing.get_context("spawn")
+    baseline = None
+    print(f"{'workers':>8} {'s':>8} {'hash/s':>8} {'speedup':>8}")
+    for workers in worker_counts(args.max_workers):
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            # Прогрев: запуск процессов не должен попадать в замер
+            list(pool.map(get_password_hash, passwords[:workers]))
+            started = time.perf_counter()
+            list(pool.map(get_password_hash, passwords))
+            elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>8.2f} {args.count / elapsed:>8.1f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Проверка планов запросов горячих эндпоинтов на большом наборе данных.
+
+В отдельной схеме PostgreSQL (--schema, по умолчанию plan_check) базы из
+настроек применяет миграции, заполняет таблицы синтетическими данными
+(--orders заказов, остальное пропорционально) и выполняет функции crud,
+которые стоят за горячими эндпоинтами. Каждый выполненный ими SELECT
+прогоняется через EXPLAIN; если в плане есть Seq Scan по большой таблице,
+проверка не пройдена и код возврата 1. Схема удаляется после проверки,
+если не указан --keep.
+
+    python -m benchmarks.query_plans --orders 200000
+"""
+import argparse
+import json
+import sys
+from collections.abc import Callable
+from datetime import date
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import Engine, create_engine, event, text
+from sqlmodel import Session
+
+from app import crud
+from app.core import migrations
+from app.core.config import settings
+from app.models import OrderStatus
+from app.schemas import FlightTaskCreate
+
+LARGE_TABLES = {"order", "flight_task", "route", "drone", "camera", "lens"}
+CLUBS = 200
+USERS = 1000
+EQUIPMENT_PER_CLUB = 100
+
+
+def fixture_statements(orders: int) -> list[str]:
+    tasks = orders // 4
+    # id вычисляются из номера строки (md5 -> uuid), так что внешние ключи
+    # связываются без промежуточных выборок
+    return [
+        f"""INSERT INTO club (id, name, address, latitude, longitude, is_available, created_at)
+        SELECT md5('club' || i)::uuid, 'Club ' || i, 'Address ' || i, 55.75, 37.61, true, now()
+        FROM generate_series(0, {CLUBS - 1}) AS i""",
+        f"""INSERT INTO "user" (id, email, hashed_password, is_superuser, username, is_available, created_at)
+        SELECT md5('user' || i)::uuid, 'operator' || i || '@example.com', 'x', false, 'Operator ' || i, true, now()
+        FROM generate_series(0, {USERS - 1}) AS i""",
+        *(
+            f"""INSERT INTO {table} (id, model, club_id, {columns}, is_available, created_at)
+            SELECT md5('{table}' || i)::uuid, 'Model ' || i, md5('club' || (i % {CLUBS}))::uuid,
+                {values}, i % 10 <> 0, now()
+            FROM generate_series(0, {CLUBS * EQUIPMENT_PER_CLUB - 1}) AS i"""
+            for table, columns, values in [
+                ("drone", "battery_charge", "i % 100"),
+                ("camera", "width_px, height_px, fps", "1920, 1080, 60"),
+                ("lens", "min_focal_length, max_focal_length", "10, 50"),
+            ]
+        ),
+        # Первая четверть заказов взята в работу и имеет задания; среди остальных
+        # 1% новых без оператора, прочие выполнены
+        f"""INSERT INTO "order" (id, first_name, last_name, email, order_date, start_time, end_time,
+            club_id, status, operator_id, created_at)
+        SELECT md5('order' || i)::uuid, 'First' || i, 'Last' || i, 'client' || i || '@example.com',
+            date '2020-01-01' + (i % 2000), time '10:00', time '11:00', md5('club' || (i % {CLUBS}))::uuid,
+            CASE WHEN i < {tasks} THEN 'in_processing' WHEN i % 100 = 0 THEN 'new' ELSE 'completed' END::orderstatus,
+            CASE WHEN i >= {tasks} AND i % 100 = 0 THEN NULL ELSE md5('user' || (i % {USERS}))::uuid END,
+            now()
+        FROM generate_series(0, {orders - 1}) AS i""",
+        f"""INSERT INTO route (id, club_id, points, created_at)
+        SELECT md5('route' || i)::uuid, md5('club' || (i % {CLUBS}))::uuid, '[]', now()
+        FROM generate_series(0, {tasks - 1}) AS i""",
+        f"""INSERT INTO flight_task (id, order_id, operator_id, route_id, drone_id, camera_id, lens_id, created_at)
+        SELECT md5('task' || i)::uuid, md5('order' || i)::uuid, md5('user' || (i % {USERS}))::uuid,
+            md5('route' || i)::uuid,
+            md5('drone' || (i % {CLUBS * EQUIPMENT_PER_CLUB}))::uuid,
+            md5('camera' || (i % {CLUBS * EQUIPMENT_PER_CLUB}))::uuid,
+            md5('lens' || (i % {CLUBS * EQUIPMENT_PER_CLUB}))::uuid,
+            now()
+        FROM generate_series(0, {tasks - 1}) AS i""",
+    ]
+
+
+def prepare(engine: Engine, schema: str, orders: int) -> None:
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+        connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+        # Настоящая функция живёт только в рабочей базе
+        connection.execute(text(
+            f'CREATE FUNCTION "{schema}".update_all_orders_status() RETURNS void LANGUAGE sql AS $$ $$'
+        ))
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        for statement in fixture_statements(orders):
+            connection.execute(text(statement))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE"))
+
+
+def uuid_of(kind: str, number: int) -> str:
+    return f"md5('{kind}' || {number})::uuid"
+
+
+def hot_paths(session: Session) -> dict[str, Callable[[], Any]]:
+    def ids(*pairs: tuple[str, int]) -> list[Any]:
+        return list(session.execute(text("SELECT " + ", ".join(uuid_of(*pair) for pair in pairs))).one())
+
+    club_id, operator_id, order_id, task_id, drone_id, camera_id, lens_id = ids(
+        ("club", 1), ("user", 1), ("order", 1), ("task", 1), ("drone", 1), ("camera", 1), ("lens", 1)
+    )
+
+    def expect_http_error(call: Callable[[], Any]) -> Callable[[], None]:
+        def run() -> None:
+            try:
+                call()
+            except HTTPException:
+                pass
+        return run
+
+    return {
+        "GET /orders/new": lambda: crud.get_new_orders(session),
+        "GET /orders/assigned": lambda: crud.get_assigned_orders(session, operator_id),
+        "GET /orders/{id}": lambda: crud.get_order_with_club_data(session, order_id),
+        "GET /orders/export?club_id": lambda: list(crud.iter_orders_for_export(
+            session, club_id=club_id, date_from=date(2021, 1, 1), date_to=date(2021, 3, 1)
+        )),
+        "GET /orders/export?status": lambda: list(crud.iter_orders_for_export(
+            session, status=OrderStatus.new, date_from=date(2021, 1, 1), date_to=date(2021, 3, 1)
+        )),
+        "GET /flight-tasks (operator)": lambda: crud.get_all_flight_tasks(session, operator_id, is_superuser=False),
+        "GET /flight-tasks/{id}": lambda: crud.get_flight_task_by_id(session, task_id, operator_id, is_superuser=True),
+        "POST /flight-tasks (existing task check)": expect_http_error(lambda: crud.create_flight_task(
+            session, FlightTaskCreate.model_construct(order_id=order_id), operator_id
+        )),
+        "GET /drones?club_id": lambda: crud.get_all_drones(session, club_id=club_id),
+        "GET /cameras?club_id": lambda: crud.get_all_cameras(session, club_id=club_id),
+        "GET /lenses?club_id": lambda: crud.get_all_lenses(session, club_id=club_id),
+        "POST /drones/{id}/archive": expect_http_error(lambda: crud.archive_drone(session, drone_id)),
+        "POST /cameras/{id}/archive": expect_http_error(lambda: crud.archive_camera(session, camera_id)),
+        "POST /lenses/{id}/archive": expect_http_error(lambda: crud.archive_lens(session, lens_id)),
+        "DELETE /clubs/{id}": expect_http_error(lambda: crud.delete_club(session, club_id)),
+    }
+
+
+def seq_scans(plan: dict[str, Any]) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in LARGE_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--schema", default="plan_check")
+    parser.add_argument("--keep", action="store_true", help="keep the schema with the fixture")
+    parser.add_argument("--reuse", action="store_true", help="skip seeding, reuse a kept schema")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    engine = create_engine(
+        settings.SQLALCHEMY_DATABASE_URI,
+        connect_args={"options": f"-c search_path={args.schema}"},
+    )
+    if not args.reuse:
+        prepare(engine, args.schema, args.orders)
+
+    captured: list[tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "update_all_orders_status" not in statement:
+            captured.append((statement, parameters))
+
+    failures = 0
+    try:
+        with Session(engine) as session:
+            for name, call in hot_paths(session).items():
+                captured.clear()
+                event.listen(engine, "before_cursor_execute", capture)
+                try:
+                    call()
+                finally:
+                    event.remove(engine, "before_cursor_execute", capture)
+                    session.rollback()
+
+                scans = []
+                with engine.connect() as connection:
+                    for statement, parameters in captured:
+                        plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+                        plan = plan if isinstance(plan, list) else json.loads(plan)
+                        scans.extend(seq_scans(plan[0]["Plan"]))
+                        if args.verbose:
+                            print(json.dumps(plan[0]["Plan"], indent=1))
+                if not captured:
+                    print(f"{'NO SQL':>6}  {name}")
+                    failures += 1
+                elif scans:
+                    print(f"{'FAIL':>6}  {name}: seq scan on {', '.join(sorted(set(scans)))}")
+                    failures += 1
+                else:
+                    print(f"{'ok':>6}  {name} ({len(captured)} queries)")
+    finally:
+        if not args.keep:
+            with engine.begin() as connection:
+                connection.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+        engine.dispose()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+"""Запись формы трафика из журналов доступа и её воспроизведение на локальном экземпляре.
+
+record читает журналы доступа nginx или gunicorn в формате combined либо
+JSON по строке на запрос и сохраняет в компактный файл (JSON lines в gzip)
+только форму трафика: метод, шаблон маршрута приложения, параметры строки
+запроса без идентификаторов, размеры тел и интервалы между запросами.
+Идентификаторы, адреса и тела в файл не попадают.
+
+replay воспроизводит запись с ускорением --speedup и не более --concurrency
+запросов одновременно - в процессе на одноразовой базе с данными
+benchmarks.datagen (--db, как в benchmarks.api_suite) или на запущенном
+экземпляре (--url), заполненном тем же benchmarks.datagen. Идентификаторы в
+путях заменяются синтетическими, тела запросов на запись строятся сценариями
+api_suite. Печатает распределение задержки по маршрутам и отставание от
+расписания записи.
+
+Combined дополняется длиной запроса и временем ответа, тогда они тоже попадают
+в запись:
+
+    log_format replay '$remote_addr - $remote_user [$time_local] "$request" $status '
+                      '$body_bytes_sent "$http_referer" "$http_user_agent" $request_length $request_time';
+
+В формате combined время записано с точностью до секунды, запросы одной
+секунды распределяются внутри неё равномерно. В JSON точное время берётся из
+поля msec (или time - число секунд либо ISO 8601).
+
+    python -m benchmarks.replay record /var/log/nginx/access.log* --output traffic.jsonl.gz
+    python -m benchmarks.replay replay traffic.jsonl.gz --speedup 10 --concurrency 32
+    python -m benchmarks.replay replay traffic.jsonl.gz --url http://localhost:8000 --speedup 2
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+from uuid import UUID
+
+import httpx
+from starlette.routing import Match, Route
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.main import app
+from benchmarks.api_suite import PERCENTILES, Scenario, create_postgres_database, percentile, scenarios
+from benchmarks.budgets import extra_scenarios
+from benchmarks.datagen import PASSWORD, Dataset, add_arguments, dataset_from, generate, make_id
+
+FORMAT_VERSION = 1
+UNMATCHED = "<unmatched>"
+ID_PLACEHOLDER = "{uuid}"
+
+_COMBINED = re.compile(
+    r'^\S+ \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+)[^"]*" (?P<status>\d{3}) '
+    r'(?P<bytes>\d+|-)(?: "[^"]*" "[^"]*")?(?: (?P<request_length>\d+) (?P<request_time>[\d.]+))?'
+)
+_PATH_PARAM = re.compile(r"\{[^}]+\}")
+
+# Вид синтетической записи для параметра пути по первому сегменту маршрута
+_PATH_KINDS = {
+    "users": "user", "orders": "order", "flight-tasks": "task", "clubs": "club",
+    "drones": "drone", "cameras": "camera", "lenses": "lens",
+}
+# ...и для параметра строки запроса по его имени
+_QUERY_KINDS = {
+    "club_id": "club", "user_id": "user", "operator_id": "user", "order_id": "order",
+    "drone_id": "drone", "camera_id": "camera", "lens_id": "lens",
+}
+
+
+@dataclass
+class Entry:
+    at: float
+    method: str
+    route: str
+    query: dict[str, str]
+    status: int
+    request_bytes: int | None
+    response_bytes: int | None
+    duration_ms: float | None
+
+
+def _number(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _integer(value: Any) -> int | None:
+    number = _number(value)
+    return int(number) if number is not None else None
+
+
+def _parse_time(value: Any) -> float | None:
+    number = _number(value)
+    if number is not None:
+        return number
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+# Строка журнала -> (время, метод, путь с запросом, статус, байты запроса, байты ответа, время ответа в мс)
+def parse_line(line: str) -> tuple[float, str, str, int, int | None, int | None, float | None] | None:
+    line = line.strip()
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        method = record.get("method")
+        target = record.get("request_uri") or record.get("uri") or record.get("path")
+        if record.get("request") and not (method and target):
+            method, _, rest = record["request"].partition(" ")
+            target = rest.split(" ")[0]
+        at = _parse_time(record.get("msec", record.get("time")))
+        if not method or not target or at is None:
+            return None
+        request_time = _number(record.get("request_time"))
+        return (
+            at, method.upper(), target, _integer(record.get("status")) or 0,
+            _integer(record.get("request_length")),
+            _integer(record.get("body_bytes_sent", record.get("bytes_sent", record.get("bytes")))),
+            request_time * 1000 if request_time is not None else None,
+        )
+
+    match = _COMBINED.match(line)
+    if not match:
+        return None
+    try:
+        at = datetime.strptime(match["time"], "%d/%b/%Y:%H:%M:%S %z").timestamp()
+    except ValueError:
+        return None
+    request_time = _number(match["request_time"])
+    return (
+        at, match["method"], match["target"], int(match["status"]),
+        _integer(match["request_length"]), _integer(match["bytes"]),
+        request_time * 1000 if request_time is not None else None,
+    )
+
+
+def route_template(method: str, path: str) -> str:
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    partial = None
+    for route in app.routes:
+        if not isinstance(route, Route):
+            continue
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+def shape_query(query: str) -> dict[str, str]:
+    return {key: ID_PLACEHOLDER if _is_uuid(value) else value for key, value in parse_qsl(query)}
+
+
+def read_logs(paths: Iterable[str]) -> tuple[list[Entry], int]:
+    entries: list[Entry] = []
+    skipped = 0
+    templates: dict[tuple[str, str], str] = {}
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as file:
+            for line in file:
+                parsed = parse_line(line)
+                if parsed is None:
+                    skipped += 1
+                    continue
+                at, method, target, status, request_bytes, response_bytes, duration_ms = parsed
+                url = urlsplit(target)
+                key = (method, url.path)
+                if key not in templates:
+                    templates[key] = route_template(method, url.path)
+                entries.append(Entry(
+                    at, method, templates[key], shape_query(url.query), status,
+                    request_bytes, response_bytes, duration_ms,
+                ))
+    entries.sort(key=lambda entry: entry.at)
+    spread_seconds(entries)
+    return entries, skipped
+
+
+# Запросы с одинаковым целым временем (combined пишет секунды) равномерно
+# распределяются внутри секунды, иначе при воспроизведении они уходили бы пачками
+def spread_seconds(entries: list[Entry]) -> None:
+    start = 0
+    while start < len(entries):
+        end = start
+        while end < len(entries) and entries[end].at == entries[start].at:
+            end += 1
+        if entries[start].at.is_integer() and end - start > 1:
+            for offset, entry in enumerate(entries[start:end]):
+                entry.at += offset / (end - start)
+        start = end
+
+
+def write_recording(path: str, entries: list[Entry], sources: list[str]) -> None:
+    header = {
+        "version": FORMAT_VERSION,
+        "sources": [os.path.basename(source) for source in sources],
+        "requests": len(entries),
+        "duration_s": entries[-1].at - entries[0].at if entries else 0.0,
+    }
+    previous = entries[0].at if entries else 0.0
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write(json.dumps(header) + "\n")
+        for entry in entries:
+            # Интервал от предыдущего запроса в мс вместо абсолютного времени
+            file.write(json.dumps([
+                round((entry.at - previous) * 1000, 1), entry.method, entry.route, entry.query or None,
+                entry.status, entry.request_bytes, entry.response_bytes, entry.duration_ms,
+            ], separators=(",", ":")) + "\n")
+            previous = entry.at
+
+
+def read_recording(path: str) -> tuple[dict[str, Any], list[Entry]]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+        if header.get("version") != FORMAT_VERSION:
+            raise SystemExit(f"{path}: unsupported recording version {header.get('version')}")
+        entries = []
+        at = 0.0
+        for line in file:
+            gap_ms, method, route, query, status, request_bytes, response_bytes, duration_ms = json.loads(line)
+            at += gap_ms / 1000
+            entries.append(Entry(at, method, route, query or {}, status, request_bytes, response_bytes, duration_ms))
+    return header, entries
+
+
+def _mean(values: Iterable[float | None]) -> float | None:
+    known = [value for value in values if value is not None]
+    return sum(known) / len(known) if known else None
+
+
+def _format(value: float | None, width: int) -> str:
+    return f"{value:>{width}.0f}" if value is not None else f"{'-':>{width}}"
+
+
+def print_shape(entries: list[Entry]) -> None:
+    groups: dict[str, list[Entry]] = defaultdict(list)
+    for entry in entries:
+        groups[f"{entry.method} {entry.route}"].append(entry)
+    print(f"{'route':<44} {'req':>7} {'share':>6} {'req B':>7} {'resp B':>8} {'ms':>7}")
+    for name, group in sorted(groups.items(), key=lambda item: len(item[1]), reverse=True):
+        print(
+            f"{name:<44} {len(group):>7} {len(group) / len(entries):>6.1%} "
+            f"{_format(_mean(e.request_bytes for e in group), 7)} "
+            f"{_format(_mean(e.response_bytes for e in group), 8)} "
+            f"{_format(_mean(e.duration_ms for e in group), 7)}"
+        )
+
+
+def record(args: argparse.Namespace) -> None:
+    entries, skipped = read_logs(args.logs)
+    if not args.keep_unmatched:
+        entries = [entry for entry in entries if entry.route != UNMATCHED]
+    if not entries:
+        raise SystemExit("no requests recognised in the logs")
+    write_recording(args.output, entries, args.logs)
+    duration = entries[-1].at - entries[0].at
+    print(
+        f"{len(entries)} requests over {duration:.0f}s ({len(entries) / max(duration, 1e-9):.1f} req/s), "
+        f"{skipped} lines skipped, written to {args.output}\n"
+    )
+    print_shape(entries)
+
+
+def _key(method: str, route: str) -> str:
+    return f"{method} {_PATH_PARAM.sub('{id}', route)}"
+
+
+# Конкретные запросы для шаблонов записи: пути и параметры - синтетические
+# идентификаторы, тела - из сценариев api_suite для того же маршрута
+class RequestFactory:
+    def __init__(self, dataset: Dataset) -> None:
+        self.rng = random.Random(dataset.seed)
+        equipment = dataset.clubs * dataset.equipment
+        self.counts = {
+            "club": dataset.clubs, "user": dataset.users, "drone": equipment, "camera": equipment,
+            "lens": equipment, "order": dataset.orders, "task": dataset.tasks,
+        }
+        self.scenarios: dict[str, Scenario] = {}
+        for scenario in scenarios(dataset) + extra_scenarios(dataset):
+            self.scenarios.setdefault(scenario.name.partition("?")[0], scenario)
+        self.calls: Counter[str] = Counter()
+
+    def synthetic_id(self, kind: str) -> str:
+        return str(make_id(kind, self.rng.randrange(max(self.counts[kind], 1))))
+
+    def query(self, recorded: dict[str, str]) -> dict[str, str]:
+        params = {}
+        for key, value in recorded.items():
+            if value != ID_PLACEHOLDER:
+                params[key] = value
+            elif key in _QUERY_KINDS:
+                params[key] = self.synthetic_id(_QUERY_KINDS[key])
+        return params
+
+    def build(self, entry: Entry) -> tuple[str, dict[str, Any]] | None:
+        key = _key(entry.method, entry.route)
+        scenario = self.scenarios.get(key)
+        if scenario is not None:
+            index = self.calls[key]
+            self.calls[key] += 1
+            try:
+                request = scenario.request(index)
+            except StopIteration:
+                # Сценарий исчерпал подходящие записи, например новые заказы для заданий
+                return None
+            if entry.method == "GET":
+                request["params"] = {**request.get("params", {}), **self.query(entry.query)}
+            return scenario.role, request
+        if entry.method not in ("GET", "DELETE"):
+            # Тело запроса на запись без сценария не построить
+            return None
+        kind = _PATH_KINDS.get(entry.route.strip("/").split("/")[0])
+        if kind is None and _PATH_PARAM.search(entry.route):
+            return None
+        path = _PATH_PARAM.sub(lambda _: self.synthetic_id(kind), entry.route)
+        return "admin", {"method": entry.method, "url": path, "params": self.query(entry.query)}
+
+
+async def replay_entries(client: httpx.AsyncClient, entries: list[Entry], factory: RequestFactory,
+                         headers: dict[str, dict[str, str]], speedup: float, concurrency: int) -> dict[str, Any]:
+    latencies: dict[str, list[float]] = defaultdict(list)
+    client_errors: Counter[str] = Counter()
+    server_errors: Counter[str] = Counter()
+    skipped: Counter[str] = Counter()
+    lags: list[float] = []
+    slots = asyncio.Semaphore(concurrency)
+    pending: set[asyncio.Task] = set()
+
+    async def send(name: str, role: str, request: dict[str, Any]) -> None:
+        try:
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request, headers=headers[role])
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 599
+            latencies[name].append(time.perf_counter() - started)
+            if status >= 500:
+                server_errors[name] += 1
+            elif status >= 400:
+                client_errors[name] += 1
+        finally:
+            slots.release()
+
+    first = entries[0].at
+    started = time.perf_counter()
+    for entry in entries:
+        name = f"{entry.method} {entry.route}"
+        built = factory.build(entry)
+        if built is None:
+            skipped[name] += 1
+            continue
+        due = started + (entry.at - first) / speedup
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await slots.acquire()
+        # Отставание от расписания: приложение или --concurrency не успевают за записью
+        lags.append(max(time.perf_counter() - due, 0.0))
+        task = asyncio.create_task(send(name, *built))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    await asyncio.gather(*pending)
+    return {
+        "wall": time.perf_counter() - started,
+        "latencies": latencies,
+        "client_errors": client_errors,
+        "server_errors": server_errors,
+        "skipped": skipped,
+        "lags": sorted(lags),
+    }
+
+
+def print_report(result: dict[str, Any], header: dict[str, Any], speedup: float) -> None:
+    latencies = result["latencies"]
+    sent = sum(len(values) for values in latencies.values())
+    print(
+        f"\n{sent} requests in {result['wall']:.1f}s ({sent / max(result['wall'], 1e-9):.1f} req/s), "
+        f"recorded {header['requests']} over {header['duration_s']:.0f}s at speedup {speedup:g}"
+    )
+    if result["lags"]:
+        lags = result["lags"]
+        print(f"schedule lag p50 {percentile(lags, 50) * 1000:.1f} ms, p99 {percentile(lags, 99) * 1000:.1f} ms, "
+              f"max {lags[-1] * 1000:.1f} ms")
+    columns = " ".join(f"{f'p{value}':>8}" for value in PERCENTILES)
+    print(f"\n{'route':<44} {'req':>7} {'4xx':>5} {'5xx':>5} {columns} {'max':>8}")
+    for name, values in sorted(latencies.items(), key=lambda item: len(item[1]), reverse=True):
+        ordered = sorted(values)
+        row = " ".join(f"{percentile(ordered, value) * 1000:>8.1f}" for value in PERCENTILES)
+        print(
+            f"{name:<44} {len(values):>7} {result['client_errors'][name]:>5} {result['server_errors'][name]:>5} "
+            f"{row} {ordered[-1] * 1000:>8.1f}"
+        )
+    for name, count in result["skipped"].most_common():
+        print(f"skipped {count} x {name}: no synthetic request for this route")
+
+
+async def replay_against(client: httpx.AsyncClient, args: argparse.Namespace, header: dict[str, Any],
+                         entries: list[Entry], dataset: Dataset) -> None:
+    async def token(email: str, password: str) -> str:
+        response = await client.post("/login/access-token", data={"username": email, "password": password})
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    headers = {
+        "anonymous": {},
+        "admin": {"Authorization": f"Bearer {await token(settings.FIRST_SUPERUSER, settings.FIRST_SUPERUSER_PASSWORD)}"},
+        "operator": {"Authorization": f"Bearer {await token('operator0@bench.example.com', PASSWORD)}"},
+    }
+    result = await replay_entries(
+        client, entries, RequestFactory(dataset), headers, args.speedup, args.concurrency,
+    )
+    print_report(result, header, args.speedup)
+
+
+async def replay_in_process(args: argparse.Namespace, header: dict[str, Any], entries: list[Entry],
+                            dataset: Dataset) -> None:
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            await replay_against(client, args, header, entries, dataset)
+    finally:
+        await app.router.shutdown()
+
+
+async def replay_remote(args: argparse.Namespace, header: dict[str, Any], entries: list[Entry],
+                        dataset: Dataset) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=None, limits=limits) as client:
+        await replay_against(client, args, header, entries, dataset)
+
+
+def replay(args: argparse.Namespace) -> None:
+    header, entries = read_recording(args.recording)
+    if args.limit:
+        entries = entries[:args.limit]
+    if not entries:
+        raise SystemExit("the recording is empty")
+    dataset = dataset_from(args)
+    if args.url:
+        asyncio.run(replay_remote(args, header, entries, dataset))
+        return
+
+    cleanup: Callable[[], None] = lambda: None
+    if args.db == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(prefix="vkr-replay-"), "replay.db")
+        url = f"sqlite:///{path}"
+        cleanup = lambda: os.remove(path)
+    elif args.db == "postgres":
+        url, cleanup = create_postgres_database()
+    else:
+        url = args.db
+    settings.DATABASE_URL = url
+    settings.RUN_DB_INIT_ON_STARTUP = False
+    # Предупреждения о медленных запросах и N+1 на каждый запрос заглушили бы отчёт
+    settings.SQL_SLOW_QUERY_MS = 0
+    settings.SQL_N_PLUS_ONE_THRESHOLD = 0
+    try:
+        if not args.reuse:
+            generate(get_engine(), dataset)
+        asyncio.run(replay_in_process(args, header, entries, dataset))
+    finally:
+        get_engine().dispose()
+        cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="extract the traffic shape from access logs")
+    record_parser.add_argument("logs", nargs="+", help="access log files, .gz is read transparently")
+    record_parser.add_argument("--output", required=True, help="recording file, gzip JSON lines")
+    record_parser.add_argument("--keep-unmatched", action="store_true", help="keep requests outside the API routes")
+    record_parser.set_defaults(handler=record)
+
+    replay_parser = commands.add_parser("replay", help="replay a recording and report latency per route")
+    replay_parser.add_argument("recording")
+    replay_parser.add_argument("--speedup", type=float, default=1.0, help="divide recorded intervals by this")
+    replay_parser.add_argument("--concurrency", type=int, default=16, help="maximum requests in flight")
+    replay_parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    replay_parser.add_argument("--url", help="running instance seeded by benchmarks.datagen with the same options")
+    replay_parser.add_argument("--db", default="sqlite", help="sqlite, postgres or a database URL when --url is not set")
+    replay_parser.add_argument("--reuse", action="store_true", help="skip seeding, the URL database is already filled")
+    add_arguments(replay_parser)
+    replay_parser.set_defaults(handler=replay)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
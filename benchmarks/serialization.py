@@ -0,0 +1,162 @@
+"""Сериализация списка заданий: модели pydantic с json против кодировщиков строк с orjson.
+
+Строит в памяти --tasks строк выборки заданий (FlightTask, Order, User, Route,
+Drone, Camera, Lens, Club) без базы и сериализует их четырьмя способами:
+
+    pydantic + json    - прежний путь: FlightTaskResponse собирается по полям,
+                         FastAPI выгружает модель в JSON-совместимые объекты и
+                         JSONResponse кодирует их json из стандартной библиотеки
+    pydantic + orjson  - те же модели, но ответ по умолчанию ORJSONResponse
+    rows + orjson      - app.core.serialization.flight_task и orjson.dumps
+    projection + orjson - кортежи колонок serialization.FLIGHT_TASK, как их
+                         возвращает выборка crud.get_all_flight_tasks, собранные
+                         Projection.build_all
+
+Печатает лучшее время из --repeat прогонов и размер ответа, проверяет, что все
+способы дают одинаковый JSON.
+
+    python -m benchmarks.serialization --tasks 10000 --repeat 5
+"""
+import argparse
+import json
+import time
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any, List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.core import serialization
+from app.models import Camera, Club, Drone, FlightTask, Lens, Order, Route, User
+from app.schemas import (
+    CameraResponse, DroneResponse, FlightTaskResponse, LensResponse, OrderResponse, RoutePoint, RouteResponse,
+    UserPublic,
+)
+from benchmarks.datagen import Dataset, rows
+
+
+def flight_task_rows(count: int, waypoints: int) -> list[tuple]:
+    dataset = Dataset(orders=count, task_ratio=1.0, waypoints=waypoints)
+    produced = {table.name: list(produce()) for table, produce in rows(dataset, datetime.now()).items()}
+    by_id = {
+        name: {row["id"]: model(**row) for row in produced[name]}
+        for name, model in [
+            ("club", Club), ("user", User), ("drone", Drone), ("camera", Camera), ("lens", Lens),
+            ("order", Order), ("route", Route),
+        ]
+    }
+    result = []
+    for row in produced["flight_task"]:
+        order = by_id["order"][row["order_id"]]
+        result.append((
+            FlightTask(**row), order, by_id["user"][row["operator_id"]], by_id["route"][row["route_id"]],
+            by_id["drone"][row["drone_id"]], by_id["camera"][row["camera_id"]], by_id["lens"][row["lens_id"]],
+            by_id["club"][order.club_id],
+        ))
+    return result
+
+
+# Сборка ответа, как её делали обработчики app/api/routes/flight_tasks.py до кодировщиков строк
+def legacy_response(task, order, operator, route, drone, camera, lens, club) -> FlightTaskResponse:
+    return FlightTaskResponse(
+        id=task.id,
+        order=OrderResponse(
+            id=order.id, first_name=order.first_name, last_name=order.last_name, email=order.email,
+            order_date=order.order_date, start_time=order.start_time, end_time=order.end_time,
+            club_id=order.club_id, status=order.status, club_name=club.name, club_address=club.address,
+        ),
+        operator=UserPublic(
+            id=operator.id, email=operator.email, username=operator.username, is_superuser=operator.is_superuser,
+        ),
+        route=RouteResponse(
+            id=route.id, club_id=route.club_id,
+            points=[RoutePoint(**point) for point in json.loads(route.points)],
+        ),
+        drone=DroneResponse(id=drone.id, model=drone.model, club_id=drone.club_id, battery_charge=drone.battery_charge),
+        camera=CameraResponse(
+            id=camera.id, model=camera.model, width_px=camera.width_px, height_px=camera.height_px,
+            fps=camera.fps, club_id=camera.club_id,
+        ),
+        lens=LensResponse(
+            id=lens.id, model=lens.model, min_focal_length=lens.min_focal_length,
+            max_focal_length=lens.max_focal_length, zoom_ratio=lens.zoom_ratio, club_id=lens.club_id,
+        ),
+    )
+
+
+_adapter = TypeAdapter(List[FlightTaskResponse])
+
+
+def pydantic_json(data: list[tuple]) -> bytes:
+    content = _adapter.dump_python([legacy_response(*row) for row in data], mode="json")
+    # Так кодирует starlette.responses.JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def pydantic_orjson(data: list[tuple]) -> bytes:
+    content = _adapter.dump_python([legacy_response(*row) for row in data], mode="json")
+    return orjson.dumps(content)
+
+
+def rows_orjson(data: list[tuple]) -> bytes:
+    return orjson.dumps([serialization.flight_task(*row) for row in data])
+
+
+# Те же строки в виде кортежей колонок проекции - так их отдаёт select(*FLIGHT_TASK.columns)
+def projection_rows(data: list[tuple]) -> list[tuple]:
+    columns = [column for part in serialization.FLIGHT_TASK.parts for column in part.fields.values()]
+    result = []
+    for row in data:
+        by_model = {type(item): item for item in row}
+        result.append(tuple(getattr(by_model[column.class_], column.key) for column in columns))
+    return result
+
+
+def projection_orjson(data: list[tuple]) -> bytes:
+    return orjson.dumps(serialization.FLIGHT_TASK.build_all(data))
+
+
+def best_of(repeat: int, encode: Callable[[list[tuple]], bytes], data: list[tuple]) -> tuple[float, bytes]:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode(data)
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--waypoints", type=int, default=20, help="points per route")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = flight_task_rows(args.tasks, args.waypoints)
+    projected = projection_rows(data)
+    results: dict[str, Any] = {}
+    for name, encode, source in [
+        ("pydantic + json", pydantic_json, data),
+        ("pydantic + orjson", pydantic_orjson, data),
+        ("rows + orjson", rows_orjson, data),
+        ("projection + orjson", projection_orjson, projected),
+    ]:
+        results[name] = best_of(args.repeat, encode, source)
+
+    baseline = results["pydantic + json"][0]
+    expected = json.loads(results["pydantic + json"][1])
+    print(f"{len(data)} flight tasks, {args.waypoints} points per route, best of {args.repeat}\n")
+    print(f"{'encoder':<20} {'total ms':>9} {'us/task':>8} {'MiB':>7} {'speedup':>8}")
+    for name, (seconds, body) in results.items():
+        if json.loads(body) != expected:
+            raise SystemExit(f"{name} produced different JSON")
+        print(
+            f"{name:<20} {seconds * 1000:>9.1f} {seconds / len(data) * 1e6:>8.1f} "
+            f"{len(body) / 2**20:>7.2f} {baseline / seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Время холодного старта API по фазам: импорт, БД, первый запрос.
+
+Запускает --runs отдельных процессов; каждый импортирует app.main, выполняет
+обработчики startup (обращения к БД из настроек) и отправляет первый
+авторизованный запрос к --path через ASGI без сетевого сервера. Печатает
+медианы фаз и полное время процесса; код возврата 1, если медиана полного
+времени больше --budget секунд. --imports N добавляет N самых медленных
+модулей по python -X importtime.
+
+Схема должна быть создана заранее: python -m app.core.migrations
+
+    python -m benchmarks.startup_time --runs 5 --budget 2.5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ["import", "db", "first_request", "total"]
+
+
+def child(path: str) -> None:
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    import httpx
+    from datetime import timedelta
+    from sqlmodel import Session, select
+
+    from app.core import security
+    from app.core.config import settings
+    from app.core.db import get_engine
+    from app.models import User
+
+    async def run() -> dict[str, float]:
+        db_started = time.perf_counter()
+        await app.router.startup()
+        db_done = time.perf_counter()
+        try:
+            # Токен выпускается вне замера: вход с bcrypt измеряется отдельно
+            with Session(get_engine()) as session:
+                user_id = session.exec(select(User.id).where(User.email == settings.FIRST_SUPERUSER)).one()
+            token = security.create_access_token(user_id, timedelta(minutes=5))
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+                request_started = time.perf_counter()
+                response = await client.get(path, headers={"Authorization": f"Bearer {token}"})
+                request_done = time.perf_counter()
+            response.raise_for_status()
+        finally:
+            await app.router.shutdown()
+        return {
+            "import": imported - started,
+            "db": db_done - db_started,
+            "first_request": request_done - request_started,
+        }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def import_profile(limit: int) -> list[tuple[float, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative) / 1e6, name.strip()))
+    # Пакеты верхнего уровня: их суммарное время уже включает вложенные импорты
+    top_level = [(seconds, name) for seconds, name in modules if "." not in name]
+    return sorted(top_level, reverse=True)[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.5, help="seconds for the median total")
+    parser.add_argument("--path", default="/orders/statuses")
+    parser.add_argument("--imports", type=int, default=0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.path)
+        return
+
+    runs = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup_time", "--child", "--path", args.path],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        phases = json.loads(output.strip().splitlines()[-1])
+        phases["total"] = time.perf_counter() - started
+        runs.append(phases)
+
+    print(f"{'phase':>14} {'median, s':>10} {'max, s':>8}")
+    for phase in PHASES:
+        values = [run[phase] for run in runs]
+        print(f"{phase:>14} {statistics.median(values):>10.3f} {max(values):>8.3f}")
+
+    if args.imports:
+        print(f"\n{'import, s':>10}  module")
+        for seconds, name in import_profile(args.imports):
+            print(f"{seconds:>10.3f}  {name}")
+
+    total = statistics.median(run["total"] for run in runs)
+    verdict = "within" if total <= args.budget else "over"
+    print(f"\ncold start {total:.3f}s, {verdict} budget {args.budget:.3f}s")
+    sys.exit(0 if total <= args.budget else 1)
+
+
+if __name__ == "__main__":
+    main()
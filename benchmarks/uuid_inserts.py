@@ -0,0 +1,98 @@
+"""Скорость вставки и размер индекса первичного ключа: uuid4 против UUIDv7.
+
+В базе из настроек (POSTGRES_*) создаёт по таблице на каждую версию UUID и
+заливает в них --rows строк пачками COPY по --batch. Каждые --every строк
+печатает скорость вставки на последнем отрезке и размер индекса первичного
+ключа. Со случайными uuid4 вставка идёт в случайные страницы индекса: когда он
+перестаёт помещаться в shared_buffers, скорость падает, а страницы после
+расщеплений заполнены наполовину. Таблицы удаляются в конце, если не указан --keep.
+
+    python -m benchmarks.uuid_inserts --rows 10000000
+"""
+import argparse
+import io
+import time
+import uuid
+from collections.abc import Callable
+from uuid import UUID
+
+from app.core.db import get_engine
+from app.core.ids import uuid7
+
+GENERATORS: dict[str, Callable[[], UUID]] = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+def mb(size: int) -> float:
+    return size / 2 ** 20
+
+
+def run(connection, version: str, rows: int, batch: int, every: int) -> tuple[float, int]:
+    table = f"uuid_bench_{version}"
+    generate = GENERATORS[version]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(
+            f"CREATE TABLE {table} (id uuid PRIMARY KEY, created_at timestamp NOT NULL DEFAULT now(), payload text)"
+        )
+    connection.commit()
+
+    print(f"\n{version}")
+    print(f"{'rows':>12} {'rows/s':>10} {'index, MB':>10} {'table, MB':>10}")
+    inserted = 0
+    spent = 0.0
+    interval_rows = 0
+    interval_spent = 0.0
+    while inserted < rows:
+        size = min(batch, rows - inserted)
+        # Генерация ключей вне замера: сравнивается работа базы, а не Python
+        buffer = io.StringIO("".join(f"{generate()}\tpayload {inserted + index}\n" for index in range(size)))
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} (id, payload) FROM STDIN", buffer)
+        connection.commit()
+        elapsed = time.perf_counter() - started
+        inserted += size
+        spent += elapsed
+        interval_rows += size
+        interval_spent += elapsed
+        if interval_rows >= every or inserted == rows:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_relation_size(%s), pg_relation_size(%s)", (f"{table}_pkey", table)
+                )
+                index_size, table_size = cursor.fetchone()
+            print(f"{inserted:>12} {interval_rows / interval_spent:>10.0f} {mb(index_size):>10.1f} {mb(table_size):>10.1f}")
+            interval_rows = 0
+            interval_spent = 0.0
+    return spent, index_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--every", type=int, default=1_000_000)
+    parser.add_argument("--versions", nargs="+", choices=list(GENERATORS), default=list(GENERATORS))
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark tables")
+    args = parser.parse_args()
+
+    connection = get_engine().raw_connection()
+    results = {}
+    try:
+        for version in args.versions:
+            results[version] = run(connection, version, args.rows, args.batch, args.every)
+    finally:
+        if not args.keep:
+            with connection.cursor() as cursor:
+                for version in args.versions:
+                    cursor.execute(f"DROP TABLE IF EXISTS uuid_bench_{version}")
+            connection.commit()
+        connection.close()
+
+    print(f"\n{'version':>8} {'rows/s':>10} {'index, MB':>10}")
+    for version, (spent, index_size) in results.items():
+        print(f"{version:>8} {args.rows / spent:>10.0f} {mb(index_size):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
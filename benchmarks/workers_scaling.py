@@ -0,0 +1,136 @@
+"""Пропускная способность API в зависимости от числа воркеров gunicorn.
+
+Для каждого значения --workers запускает gunicorn с gunicorn.conf.py на базе
+из настроек (POSTGRES_*), получает токен первого суперпользователя и в течение
+--duration секунд нагружает --path из --clients процессов по --concurrency
+одновременных запросов в каждом. Печатает RPS, задержки и ускорение
+относительно первого значения. Нагрузку лучше подавать с отдельной машины
+или ограничить ядра сервера, иначе клиенты конкурируют с воркерами.
+
+    python -m benchmarks.workers_scaling --workers 1 4 8 --path /orders/all
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import secrets
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.core.config import settings
+
+
+def start_server(workers: int, port: int, secret_key: str) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}", SECRET_KEY=secret_key)
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        try:
+            httpx.get(f"{base_url}/docs", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not start in time")
+
+
+def login(base_url: str) -> str:
+    response = httpx.post(
+        f"{base_url}/login/access-token",
+        data={"username": settings.FIRST_SUPERUSER, "password": settings.FIRST_SUPERUSER_PASSWORD},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def drive(url: str, token: str, concurrency: int, duration: float) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=30) as client:
+        async def loop() -> None:
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(args: tuple[str, str, int, float]) -> tuple[list[float], int]:
+    return asyncio.run(drive(*args))
+
+
+def measure(url: str, token: str, clients: int, concurrency: int, duration: float) -> tuple[list[float], int]:
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.map(client_process, [(url, token, concurrency, duration)] * clients)
+    latencies = [latency for result in results for latency in result[0]]
+    return latencies, sum(result[1] for result in results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--path", default="/orders/all")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    # Один ключ на все запуски, чтобы проверить и выдачу, и приём токена разными воркерами
+    secret_key = os.environ.get("SECRET_KEY") or secrets.token_urlsafe(32)
+    baseline = None
+    print(f"{'workers':>8} {'requests':>9} {'errors':>7} {'rps':>9} {'p50, ms':>8} {'p99, ms':>8} {'speedup':>8}")
+    for workers in args.workers:
+        server = start_server(workers, args.port, secret_key)
+        try:
+            wait_ready(base_url, server)
+            token = login(base_url)
+            measure(base_url + args.path, token, args.clients, args.concurrency, args.warmup)
+            latencies, errors = measure(base_url + args.path, token, args.clients, args.concurrency, args.duration)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+
+        rps = len(latencies) / args.duration
+        baseline = baseline or rps
+        if latencies:
+            p50 = statistics.median(latencies) * 1000
+            p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else p50
+        else:
+            p50 = p99 = 0.0
+        print(f"{workers:>8} {len(latencies):>9} {errors:>7} {rps:>9.1f} {p50:>8.1f} {p99:>8.1f} "
+              f"{rps / baseline if baseline else 0:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
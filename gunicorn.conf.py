@@ -0,0 +1,40 @@
+import logging
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+graceful_timeout = 30
+keepalive = 5
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def on_starting(server):
+    # Окружение задаётся до импорта приложения: воркеры получают те же настройки,
+    # что и мастер, независимо от того, форкнуты они или перезапущены.
+    # Пул bcrypt есть в каждом воркере: делим ядра между ними
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(multiprocessing.cpu_count() // server.cfg.workers, 1)))
+
+    from app.core.config import settings
+
+    if "SECRET_KEY" not in settings.model_fields_set and not settings.SIGNING_KEYS:
+        logger.warning("SECRET_KEY is not configured, tokens will not survive a restart of the master")
+    os.environ["SECRET_KEY"] = settings.SECRET_KEY
+
+    # Подготовка БД, если она включена, выполняется один раз здесь, а не в каждом воркере
+    run_db_init = settings.RUN_DB_INIT_ON_STARTUP
+    os.environ["RUN_DB_INIT_ON_STARTUP"] = "false"
+    settings.RUN_DB_INIT_ON_STARTUP = False
+    if run_db_init:
+        from app.core import migrations
+        from app.core.db import get_engine
+        from app.core.security import hash_pool
+
+        migrations.setup_database()
+        # Соединения мастера и его пул bcrypt (создан при заведении суперпользователя)
+        # не должны достаться воркерам после fork: поток управления пулом в
+        # дочернем процессе не существует, и первый же хеш пароля зависнет
+        get_engine().dispose()
+        hash_pool.shutdown()